@@ -57,6 +57,70 @@ def cov():
     return 1
 
 
+@manager.command
+def bench_serializers(rows=10000):
+    """Compares AlchemyEncoder with the column serializers."""
+    from project.benchmarks import serializer_benchmark
+    for model, timings in serializer_benchmark.run(int(rows)).items():
+        print(model, timings)
+
+
+@manager.command
+def bench_search(database, rows=1000000):
+    """Times provision search on a synthetic table in a scratch database."""
+    from project.benchmarks import search_benchmark
+    for search, timings in search_benchmark.run(database, int(rows)).items():
+        print(search, timings)
+
+
+@manager.command
+def bench_blacklist(entries=1000000, database=None):
+    """Times token blacklist lookups with the Bloom filter, optionally against a scratch database."""
+    from project.benchmarks import blacklist_benchmark
+    for name, value in blacklist_benchmark.run(int(entries), database=database).items():
+        print(name, value)
+
+
+@manager.command
+def bench_executions(database, records=10000):
+    """Times the Nickel execution bulk insert on a scratch database."""
+    from project.benchmarks import execution_benchmark
+    for method, timings in execution_benchmark.run(database, int(records)).items():
+        print(method, timings)
+
+
+@manager.command
+def bench_login(base_url, email, password, concurrency=8, logins=80):
+    """Times concurrent logins and ping latency against a running server."""
+    from project.benchmarks import login_benchmark
+    for name, value in login_benchmark.run(base_url, email, password, int(concurrency), int(logins)).items():
+        print(name, value)
+
+
+@manager.command
+def bench_pool(database=None, threads=20, queries=5000, pool_size=5, max_overflow=10):
+    """Load tests the metered connection pool against a local MariaDB or a scratch SQLite file."""
+    from project.benchmarks import pool_benchmark
+    for name, value in pool_benchmark.run(database, int(threads), int(queries), int(pool_size),
+                                          int(max_overflow)).items():
+        print(name, value)
+
+
+@manager.command
+def bench_submit(base_url, sut_count=200, rounds=20):
+    """Times creating provisioning requests in three calls and in one against a running server."""
+    from project.benchmarks import submit_benchmark
+    for name, value in submit_benchmark.run(base_url, int(sut_count), int(rounds)).items():
+        print(name, value)
+
+
+@manager.command
+def prune_blacklist():
+    """Deletes blacklisted tokens whose expiry has passed."""
+    from project.server.models import BlacklistToken
+    print('pruned', BlacklistToken.prune_expired())
+
+
 @manager.command
 def create_db():
     db.create_all()
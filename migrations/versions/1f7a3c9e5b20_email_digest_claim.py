@@ -0,0 +1,24 @@
+"""claim timestamp on OAP_EMAIL_DIGEST_ITEM
+
+Revision ID: 1f7a3c9e5b20
+Revises: 6e2c9b4d7a18
+Create Date: 2026-10-18 09:12:31.406218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f7a3c9e5b20'
+down_revision = '6e2c9b4d7a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('OAP_EMAIL_DIGEST_ITEM', sa.Column('claimed_At', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('OAP_EMAIL_DIGEST_ITEM', 'claimed_At')
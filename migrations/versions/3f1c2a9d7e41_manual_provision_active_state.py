@@ -0,0 +1,38 @@
+"""derived active state and controller indexes on OAP_MANUAL_PROVISION
+
+Revision ID: 3f1c2a9d7e41
+Revises:
+Create Date: 2026-10-17 10:12:04.118233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7e41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('OAP_MANUAL_PROVISION',
+                  sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.execute("UPDATE OAP_MANUAL_PROVISION SET is_active = 1 "
+               "WHERE is_ifwi IN ('In Progress', 'Blocked') OR is_bios IN ('In Progress', 'Blocked') "
+               "OR is_os IN ('In Progress', 'Blocked') OR is_e2e IN ('In Progress', 'Blocked')")
+    op.create_index('ix_manual_provision_controller_active', 'OAP_MANUAL_PROVISION', ['controller', 'is_active'])
+    op.create_index('ix_manual_provision_controller_ifwi', 'OAP_MANUAL_PROVISION', ['controller', 'is_ifwi'])
+    op.create_index('ix_manual_provision_controller_bios', 'OAP_MANUAL_PROVISION', ['controller', 'is_bios'])
+    op.create_index('ix_manual_provision_controller_os', 'OAP_MANUAL_PROVISION', ['controller', 'is_os'])
+    op.create_index('ix_manual_provision_controller_e2e', 'OAP_MANUAL_PROVISION', ['controller', 'is_e2e'])
+
+
+def downgrade():
+    op.drop_index('ix_manual_provision_controller_e2e', table_name='OAP_MANUAL_PROVISION')
+    op.drop_index('ix_manual_provision_controller_os', table_name='OAP_MANUAL_PROVISION')
+    op.drop_index('ix_manual_provision_controller_bios', table_name='OAP_MANUAL_PROVISION')
+    op.drop_index('ix_manual_provision_controller_ifwi', table_name='OAP_MANUAL_PROVISION')
+    op.drop_index('ix_manual_provision_controller_active', table_name='OAP_MANUAL_PROVISION')
+    op.drop_column('OAP_MANUAL_PROVISION', 'is_active')
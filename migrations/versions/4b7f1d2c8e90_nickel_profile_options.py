@@ -0,0 +1,92 @@
+"""NICKEL_PROFILE_OPTION replaces the '#'-joined NICKEL_PROFILE option list columns
+
+Revision ID: 4b7f1d2c8e90
+Revises: 9c3e5b7a2d61
+Create Date: 2026-10-17 21:12:37.914420
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7f1d2c8e90'
+down_revision = '9c3e5b7a2d61'
+branch_labels = None
+depends_on = None
+
+# NICKEL_PROFILE column -> option_kind
+OPTION_COLUMNS = (
+    ('ifwi_flash_method_list', 'ifwi_flash_method'),
+    ('execution_mode_list', 'execution_mode'),
+    ('execution_type_list', 'execution_type'),
+    ('network_type_list', 'network_type'),
+    ('image_type_list', 'image_type'),
+    ('cycle_type_list', 'cycle_type'),
+    ('wake_mode_list', 'wake_mode'),
+    ('power_mode_list', 'power_mode'),
+    ('tws_version_list', 'tws_version'),
+)
+
+profile = sa.table('NICKEL_PROFILE', sa.column('profile_id', sa.Integer()),
+                   *[sa.column(name, sa.String()) for name, _ in OPTION_COLUMNS])
+option = sa.table('NICKEL_PROFILE_OPTION', sa.column('profile_id', sa.Integer()),
+                  sa.column('option_kind', sa.String()), sa.column('position', sa.Integer()),
+                  sa.column('value', sa.String()))
+
+
+def upgrade():
+    op.create_table('NICKEL_PROFILE_OPTION',
+                    sa.Column('profile_id', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('option_kind', sa.String(length=32), nullable=False),
+                    sa.Column('position', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('value', sa.String(length=255), nullable=False),
+                    sa.PrimaryKeyConstraint('profile_id', 'option_kind', 'position')
+                    )
+    op.create_index('ix_nickel_profile_option_value', 'NICKEL_PROFILE_OPTION',
+                    ['option_kind', 'value', 'profile_id'])
+    if context.is_offline_mode():
+        # a --sql script cannot read the lists, split them in SQL over MariaDB's sequence engine; the
+        # positions of empty values are skipped, the order is kept
+        for name, kind in OPTION_COLUMNS:
+            op.execute(
+                "INSERT INTO NICKEL_PROFILE_OPTION (profile_id, option_kind, position, value) "
+                "SELECT profile_id, '{kind}', seq, SUBSTRING_INDEX(SUBSTRING_INDEX({name}, '#', seq + 1), '#', -1) "
+                "FROM NICKEL_PROFILE JOIN seq_0_to_499 "
+                "ON seq <= LENGTH({name}) - LENGTH(REPLACE({name}, '#', '')) "
+                "WHERE SUBSTRING_INDEX(SUBSTRING_INDEX({name}, '#', seq + 1), '#', -1) != ''".format(
+                    name=name, kind=kind))
+    else:
+        connection = op.get_bind()
+        rows = []
+        for row in connection.execute(sa.select([profile])).fetchall():
+            for name, kind in OPTION_COLUMNS:
+                values = [value for value in (row[name] or '').split('#') if value]
+                rows.extend({'profile_id': row.profile_id, 'option_kind': kind, 'position': position,
+                             'value': value} for position, value in enumerate(values))
+        if rows:
+            op.bulk_insert(option, rows)
+    for name, _ in OPTION_COLUMNS:
+        op.drop_column('NICKEL_PROFILE', name)
+
+
+def downgrade():
+    for name, _ in OPTION_COLUMNS:
+        op.add_column('NICKEL_PROFILE', sa.Column(name, sa.String(length=500), nullable=True))
+    if context.is_offline_mode():
+        for name, kind in OPTION_COLUMNS:
+            op.execute(
+                "UPDATE NICKEL_PROFILE SET {name} = (SELECT GROUP_CONCAT(value ORDER BY position SEPARATOR '#') "
+                "FROM NICKEL_PROFILE_OPTION WHERE NICKEL_PROFILE_OPTION.profile_id = NICKEL_PROFILE.profile_id "
+                "AND option_kind = '{kind}')".format(name=name, kind=kind))
+    else:
+        connection = op.get_bind()
+        lists = {}
+        for row in connection.execute(sa.select([option]).order_by(
+                option.c.profile_id, option.c.option_kind, option.c.position)).fetchall():
+            lists.setdefault(row.profile_id, {}).setdefault(row.option_kind, []).append(row.value)
+        for profile_id, options in lists.items():
+            connection.execute(profile.update().where(profile.c.profile_id == profile_id).values(
+                **dict((name, '#'.join(options[kind])) for name, kind in OPTION_COLUMNS if kind in options)))
+    op.drop_index('ix_nickel_profile_option_value', table_name='NICKEL_PROFILE_OPTION')
+    op.drop_table('NICKEL_PROFILE_OPTION')
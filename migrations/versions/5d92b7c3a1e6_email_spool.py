@@ -0,0 +1,38 @@
+"""OAP_EMAIL_SPOOL for queued notification mails
+
+Revision ID: 5d92b7c3a1e6
+Revises: c47a9e1d05b8
+Create Date: 2026-10-17 17:48:10.551207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d92b7c3a1e6'
+down_revision = 'c47a9e1d05b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('OAP_EMAIL_SPOOL',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('sender', sa.String(length=255), nullable=False),
+                    sa.Column('recipients', sa.String(length=1000), nullable=False),
+                    sa.Column('message', sa.Text(), nullable=False),
+                    sa.Column('status', sa.String(length=20), nullable=False),
+                    sa.Column('attempts', sa.Integer(), nullable=False),
+                    sa.Column('next_attempt_At', sa.DateTime(), nullable=False),
+                    sa.Column('last_error', sa.String(length=500), nullable=True),
+                    sa.Column('create_At', sa.DateTime(), nullable=True),
+                    sa.Column('sent_At', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_email_spool_due', 'OAP_EMAIL_SPOOL', ['status', 'next_attempt_At'])
+
+
+def downgrade():
+    op.drop_index('ix_email_spool_due', table_name='OAP_EMAIL_SPOOL')
+    op.drop_table('OAP_EMAIL_SPOOL')
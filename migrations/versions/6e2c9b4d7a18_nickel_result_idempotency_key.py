@@ -0,0 +1,26 @@
+"""idempotency key on NICKEL_RESULT
+
+Revision ID: 6e2c9b4d7a18
+Revises: d81f4a6c2b95
+Create Date: 2026-10-17 23:20:44.102937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2c9b4d7a18'
+down_revision = 'd81f4a6c2b95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('NICKEL_RESULT', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index('ux_nickel_result_idempotency_key', 'NICKEL_RESULT', ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_nickel_result_idempotency_key', table_name='NICKEL_RESULT')
+    op.drop_column('NICKEL_RESULT', 'idempotency_key')
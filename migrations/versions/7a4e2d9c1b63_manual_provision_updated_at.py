@@ -0,0 +1,27 @@
+"""change timestamp on OAP_MANUAL_PROVISION for the active provision registry sync
+
+Revision ID: 7a4e2d9c1b63
+Revises: 1f7a3c9e5b20
+Create Date: 2026-10-18 10:04:52.731904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e2d9c1b63'
+down_revision = '1f7a3c9e5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('OAP_MANUAL_PROVISION', sa.Column('updated_At', sa.DateTime(), nullable=True))
+    op.execute('UPDATE OAP_MANUAL_PROVISION SET updated_At = create_At')
+    op.create_index('ix_manual_provision_updated_at', 'OAP_MANUAL_PROVISION', ['updated_At'])
+
+
+def downgrade():
+    op.drop_index('ix_manual_provision_updated_at', table_name='OAP_MANUAL_PROVISION')
+    op.drop_column('OAP_MANUAL_PROVISION', 'updated_At')
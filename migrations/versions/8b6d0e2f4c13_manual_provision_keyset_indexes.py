@@ -0,0 +1,28 @@
+"""keyset pagination indexes on OAP_MANUAL_PROVISION
+
+Revision ID: 8b6d0e2f4c13
+Revises: 3f1c2a9d7e41
+Create Date: 2026-10-17 14:37:51.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b6d0e2f4c13'
+down_revision = '3f1c2a9d7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_manual_provision_request_id', 'OAP_MANUAL_PROVISION', ['request_id', 'provision_id'])
+    op.create_index('ix_manual_provision_external_id', 'OAP_MANUAL_PROVISION', ['external_id', 'provision_id'])
+    op.create_index('ix_manual_provision_create_at', 'OAP_MANUAL_PROVISION', ['create_At', 'provision_id'])
+
+
+def downgrade():
+    op.drop_index('ix_manual_provision_create_at', table_name='OAP_MANUAL_PROVISION')
+    op.drop_index('ix_manual_provision_external_id', table_name='OAP_MANUAL_PROVISION')
+    op.drop_index('ix_manual_provision_request_id', table_name='OAP_MANUAL_PROVISION')
@@ -0,0 +1,67 @@
+"""store sha256 and expiry of blacklisted tokens instead of the token
+
+Revision ID: 9c3e5b7a2d61
+Revises: e2a8f61b9d34
+Create Date: 2026-10-17 19:41:02.370145
+
+"""
+import datetime
+import hashlib
+
+from alembic import context, op
+import jwt
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5b7a2d61'
+down_revision = 'e2a8f61b9d34'
+branch_labels = None
+depends_on = None
+
+
+def _expiry(token):
+    try:
+        return datetime.datetime.utcfromtimestamp(jwt.decode(token, verify=False)['exp'])
+    except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _backfill(connection):
+    blacklist = sa.table('blacklist_tokens', sa.column('id', sa.Integer()), sa.column('token', sa.String()),
+                         sa.column('token_hash', sa.String()), sa.column('expires_At', sa.DateTime()))
+    now = datetime.datetime.utcnow()
+    for row in connection.execute(sa.select([blacklist.c.id, blacklist.c.token])).fetchall():
+        expires_at = _expiry(row.token)
+        if expires_at is not None and expires_at < now:
+            # expired tokens are rejected by jwt.decode, no need to keep them
+            connection.execute(blacklist.delete().where(blacklist.c.id == row.id))
+            continue
+        connection.execute(blacklist.update().where(blacklist.c.id == row.id).values(
+            token_hash=hashlib.sha256(row.token.encode('utf-8')).hexdigest(), expires_At=expires_at))
+
+
+def upgrade():
+    op.add_column('blacklist_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    op.add_column('blacklist_tokens', sa.Column('expires_At', sa.DateTime(), nullable=True))
+    if context.is_offline_mode():
+        # no rows to read in a --sql script, hash in SQL and leave expires_At NULL, those rows are
+        # kept until deleted by hand
+        op.execute('UPDATE blacklist_tokens SET token_hash = SHA2(token, 256)')
+    else:
+        _backfill(op.get_bind())
+    op.alter_column('blacklist_tokens', 'token_hash', existing_type=sa.String(length=64), nullable=False)
+    op.create_index('ix_blacklist_tokens_token_hash', 'blacklist_tokens', ['token_hash'], unique=True)
+    op.create_index('ix_blacklist_tokens_expires_At', 'blacklist_tokens', ['expires_At'])
+    op.drop_column('blacklist_tokens', 'token')
+
+
+def downgrade():
+    # the tokens themselves are gone, the blacklist starts over empty
+    op.execute('DELETE FROM blacklist_tokens')
+    op.add_column('blacklist_tokens', sa.Column('token', sa.String(length=500), nullable=False))
+    op.create_unique_constraint('token', 'blacklist_tokens', ['token'])
+    op.drop_index('ix_blacklist_tokens_expires_At', table_name='blacklist_tokens')
+    op.drop_index('ix_blacklist_tokens_token_hash', table_name='blacklist_tokens')
+    op.drop_column('blacklist_tokens', 'expires_At')
+    op.drop_column('blacklist_tokens', 'token_hash')
@@ -0,0 +1,30 @@
+"""filter indexes on NICKEL_PROFILE
+
+Revision ID: a3d5c8e17f42
+Revises: 4b7f1d2c8e90
+Create Date: 2026-10-17 22:05:12.648301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d5c8e17f42'
+down_revision = '4b7f1d2c8e90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_nickel_profile_owner', 'NICKEL_PROFILE', ['owner', 'profile_id'])
+    op.create_index('ix_nickel_profile_group_name', 'NICKEL_PROFILE', ['group_name', 'profile_id'])
+    op.create_index('ix_nickel_profile_controller', 'NICKEL_PROFILE', ['controller', 'profile_id'])
+    op.create_index('ix_nickel_profile_tws_version', 'NICKEL_PROFILE', ['tws_version', 'profile_id'])
+
+
+def downgrade():
+    op.drop_index('ix_nickel_profile_tws_version', table_name='NICKEL_PROFILE')
+    op.drop_index('ix_nickel_profile_controller', table_name='NICKEL_PROFILE')
+    op.drop_index('ix_nickel_profile_group_name', table_name='NICKEL_PROFILE')
+    op.drop_index('ix_nickel_profile_owner', table_name='NICKEL_PROFILE')
@@ -0,0 +1,25 @@
+"""FULLTEXT search index on OAP_MANUAL_PROVISION
+
+Revision ID: c47a9e1d05b8
+Revises: 8b6d0e2f4c13
+Create Date: 2026-10-17 16:05:22.730914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a9e1d05b8'
+down_revision = '8b6d0e2f4c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ft_manual_provision_search', 'OAP_MANUAL_PROVISION', ['external_id', 'controller', 'sut'],
+                    mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    op.drop_index('ft_manual_provision_search', table_name='OAP_MANUAL_PROVISION')
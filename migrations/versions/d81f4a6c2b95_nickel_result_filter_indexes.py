@@ -0,0 +1,37 @@
+"""filter and keyset pagination indexes on NICKEL_RESULT
+
+Revision ID: d81f4a6c2b95
+Revises: a3d5c8e17f42
+Create Date: 2026-10-17 22:48:30.517264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f4a6c2b95'
+down_revision = 'a3d5c8e17f42'
+branch_labels = None
+depends_on = None
+
+# index name -> leading filter column, every index ends with the (create_At, trigger_id) page order
+INDEXES = (
+    ('ix_nickel_result_profile_name', 'profile_name'),
+    ('ix_nickel_result_sut', 'sut'),
+    ('ix_nickel_result_controller', 'controller'),
+    ('ix_nickel_result_tws_version', 'tws_version'),
+    ('ix_nickel_result_status', 'result_status'),
+)
+
+
+def upgrade():
+    op.create_index('ix_nickel_result_create_at', 'NICKEL_RESULT', ['create_At', 'trigger_id'])
+    for name, column in INDEXES:
+        op.create_index(name, 'NICKEL_RESULT', [column, 'create_At', 'trigger_id'])
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='NICKEL_RESULT')
+    op.drop_index('ix_nickel_result_create_at', table_name='NICKEL_RESULT')
@@ -0,0 +1,38 @@
+"""OAP_EMAIL_DIGEST_ITEM for coalesced status notifications
+
+Revision ID: e2a8f61b9d34
+Revises: 5d92b7c3a1e6
+Create Date: 2026-10-17 18:32:44.108513
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8f61b9d34'
+down_revision = '5d92b7c3a1e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('OAP_EMAIL_DIGEST_ITEM',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('request_id', sa.Integer(), nullable=True),
+                    sa.Column('to_list', sa.String(length=256), nullable=True),
+                    sa.Column('user_fullname', sa.String(length=250), nullable=True),
+                    sa.Column('sut', sa.String(length=255), nullable=True),
+                    sa.Column('provision_type', sa.String(length=255), nullable=True),
+                    sa.Column('provision_status', sa.String(length=255), nullable=True),
+                    sa.Column('tws_link', sa.String(length=256), nullable=True),
+                    sa.Column('batch', sa.String(length=32), nullable=True),
+                    sa.Column('create_At', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_email_digest_item_request', 'OAP_EMAIL_DIGEST_ITEM', ['batch', 'request_id', 'create_At'])
+
+
+def downgrade():
+    op.drop_index('ix_email_digest_item_request', table_name='OAP_EMAIL_DIGEST_ITEM')
+    op.drop_table('OAP_EMAIL_DIGEST_ITEM')
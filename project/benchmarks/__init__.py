@@ -0,0 +1 @@
+# project/benchmarks/__init__.py
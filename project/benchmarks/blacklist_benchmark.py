@@ -0,0 +1,69 @@
+# project/benchmarks/blacklist_benchmark.py
+
+import datetime
+import hashlib
+import sys
+import time
+
+from sqlalchemy import bindparam, create_engine, func, select
+
+from project.server.auth.bloom import BloomFilter
+from project.server.models import BlacklistToken
+
+
+def _digest(i):
+    return hashlib.sha256('token-{}'.format(i).encode('utf-8')).hexdigest()
+
+
+def _per_lookup_us(lookup, keys):
+    started = time.perf_counter()
+    found = sum(1 for key in keys if lookup(key))
+    return round((time.perf_counter() - started) / len(keys) * 1e6, 3), found
+
+
+def _seed(engine, digests, chunk=10000):
+    table = BlacklistToken.__table__
+    table.create(engine, checkfirst=True)
+    existing = engine.execute(select([func.count()]).select_from(table)).scalar()
+    now = datetime.datetime.now()
+    expires = datetime.datetime.utcnow() + datetime.timedelta(minutes=45)
+    for offset in range(existing, len(digests), chunk):
+        engine.execute(table.insert(), [{'token_hash': digest, 'blacklisted_on': now, 'expires_At': expires}
+                                        for digest in digests[offset:offset + chunk]])
+
+
+def run(entries=1000000, lookups=100000, error_rate=0.001, database=None):
+    """
+    Times blacklist lookups with entries blacklisted tokens, for tokens that are (hits) and
+    are not (misses) on the blacklist. With database, a scratch database, the indexed
+    token_hash query every filter hit is confirmed with is timed as well.
+    :return: dict of measurement -> value, times in microseconds per lookup
+    """
+    digests = [_digest(i) for i in range(entries)]
+    hits = digests[::max(entries // lookups, 1)][:lookups]
+    misses = [_digest(-i - 1) for i in range(lookups)]
+
+    started = time.perf_counter()
+    bloom = BloomFilter(entries, error_rate)
+    for digest in digests:
+        bloom.add(digest)
+    results = {'bloom_build_ms': round((time.perf_counter() - started) * 1000, 1),
+               'bloom_bytes': bloom.nbytes, 'bloom_hashes': bloom.hashes}
+    results['bloom_miss_us'], false_positives = _per_lookup_us(bloom.__contains__, misses)
+    results['bloom_false_positive_rate'] = false_positives / len(misses)
+    results['bloom_hit_us'], _ = _per_lookup_us(bloom.__contains__, hits)
+
+    hashed = set(digests)
+    results['set_bytes'] = sys.getsizeof(hashed) + sum(sys.getsizeof(digest) for digest in digests)
+    results['set_miss_us'], _ = _per_lookup_us(hashed.__contains__, misses)
+
+    if database:
+        engine = create_engine(database)
+        _seed(engine, digests)
+        table = BlacklistToken.__table__
+        query = select([table.c.id]).where(table.c.token_hash == bindparam('digest'))
+        with engine.connect() as connection:
+            confirm = lambda digest: connection.execute(query, digest=digest).first() is not None
+            results['db_hit_us'], _ = _per_lookup_us(confirm, hits[:1000])
+            results['db_miss_us'], _ = _per_lookup_us(confirm, misses[:1000])
+    return results
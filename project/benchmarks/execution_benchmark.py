@@ -0,0 +1,44 @@
+# project/benchmarks/execution_benchmark.py
+
+import datetime
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from project.server.models import NickelExecution
+from project.server.oap.nickel.execution_ingest import insert_executions
+
+
+def _rows(records):
+    now = datetime.datetime.now()
+    return [{'profile_id': 1, 'executor': i, 'fanout_attr': 'attr', 'fanout_value': str(i), 'create_At': now}
+            for i in range(records)]
+
+
+def _timed(engine, insert):
+    session = Session(bind=engine)
+    started = time.perf_counter()
+    try:
+        insert(session)
+        session.commit()
+    finally:
+        session.close()
+    return round(time.perf_counter() - started, 3)
+
+
+def run(database, records=10000, chunk_sizes=(100, 1000, 5000)):
+    """
+    Times inserting records NICKEL_EXECUTION rows in one transaction into a scratch database,
+    one ORM object per row against insert_executions with each chunk size
+    :return: dict of method -> (seconds, records per second)
+    """
+    engine = create_engine(database)
+    NickelExecution.__table__.create(engine, checkfirst=True)
+    rows = _rows(records)
+    timings = {'orm_add_all': _timed(engine, lambda session: session.add_all(
+        [NickelExecution(**row) for row in rows]))}
+    for chunk_size in chunk_sizes:
+        timings['chunk_{}'.format(chunk_size)] = _timed(
+            engine, lambda session: insert_executions(rows, session=session, chunk_size=chunk_size))
+    return dict((name, (seconds, int(records / seconds))) for name, seconds in timings.items())
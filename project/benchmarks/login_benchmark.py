@@ -0,0 +1,63 @@
+# project/benchmarks/login_benchmark.py
+
+import threading
+import time
+
+import requests
+
+
+def _percentiles(samples):
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda share: round(samples[min(int(len(samples) * share), len(samples) - 1)] * 1000, 1)
+    return {'p50_ms': pick(0.5), 'p95_ms': pick(0.95), 'max_ms': pick(1.0)}
+
+
+def run(base_url, email, password, concurrency=8, logins=80, probe_interval=0.05):
+    """
+    Sends logins from concurrency threads to a running server while a probe thread keeps calling
+    / (ping), showing how much the bcrypt work delays the rest of the API
+    :return: dict with login latencies, status code counts and ping latencies under the load
+    """
+    statuses = {}
+    login_times = []
+    ping_times = []
+    lock = threading.Lock()
+    remaining = [logins]
+    done = threading.Event()
+
+    def login():
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            response = session.post(base_url + '/auth/login', json={'email': email, 'password': password})
+            with lock:
+                login_times.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def probe():
+        session = requests.Session()
+        while not done.is_set():
+            started = time.perf_counter()
+            session.get(base_url + '/')
+            ping_times.append(time.perf_counter() - started)
+            time.sleep(probe_interval)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=login) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+    return {'elapsed_s': round(elapsed, 2), 'statuses': statuses, 'login': _percentiles(login_times),
+            'ping': _percentiles(ping_times)}
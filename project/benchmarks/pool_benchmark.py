@@ -0,0 +1,61 @@
+# project/benchmarks/pool_benchmark.py
+
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.url import make_url
+
+from project.server.db_pool import configure_pool, pool_metrics
+
+
+def run(database=None, threads=20, queries=5000, pool_size=5, max_overflow=10, pool_timeout=10, pool_recycle=280,
+        pre_ping=True, query_seconds=0.002):
+    """
+    Runs queries short transactions from threads threads through the metered pool, the load of
+    one gunicorn worker serving threads concurrent requests
+    :param database: URL of a local MariaDB, a scratch SQLite file when None
+    :param query_seconds: time each transaction keeps its connection, simulating request work
+    :return: dict with throughput and the pool metrics
+    """
+    scratch = None
+    if database is None:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        scratch.close()
+        database = 'sqlite:///' + scratch.name
+    options = configure_pool({'SQLALCHEMY_POOL_PRE_PING': pre_ping}, {
+        'pool_size': pool_size, 'max_overflow': max_overflow, 'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle}, make_url(database).drivername)
+    engine = create_engine(database, **options)
+    remaining = [queries]
+    lock = threading.Lock()
+    errors = []
+
+    def work():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text('SELECT 1')).scalar()
+                    time.sleep(query_seconds)
+            except Exception as e:
+                errors.append(e)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    results = {'elapsed_s': round(elapsed, 2), 'queries_per_s': int(queries / elapsed), 'errors': len(errors)}
+    results.update(pool_metrics.stats(engine.pool))
+    engine.dispose()
+    if scratch is not None:
+        os.unlink(scratch.name)
+    return results
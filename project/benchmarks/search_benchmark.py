@@ -0,0 +1,69 @@
+# project/benchmarks/search_benchmark.py
+
+import datetime
+import time
+
+from sqlalchemy import create_engine, func, select, and_
+
+from project.server.models import ManualProvision
+from project.server.oap.provision_search import provision_search_filter
+
+DEFAULT_QUERIES = ('TWS-17', 'ADL 004242', 'user42', '98765', 'corp intel')
+
+
+def seed(engine, rows, chunk=10000):
+    """
+    Fills OAP_MANUAL_PROVISION of a scratch database with synthetic provisions up to rows
+    """
+    table = ManualProvision.__table__
+    table.create(engine, checkfirst=True)
+    existing = engine.execute(select([func.count()]).select_from(table)).scalar()
+    started = datetime.datetime(2021, 1, 1)
+    for offset in range(existing, rows, chunk):
+        engine.execute(table.insert(), [
+            {'controller': 'UST-AF2-TWS-{:02d}.gar.corp.intel.com'.format(i % 60),
+             'sut': '{}-{:06d}'.format(('ADL', 'RPL', 'MTL', 'TGL')[i % 4], i % 250000),
+             'is_ifwi': 'PASS', 'is_bios': 'PASS', 'is_os': 'FAIL' if i % 11 == 0 else 'PASS', 'is_e2e': 'NA',
+             'is_active': False, 'request_id': i // 8, 'user_id': i % 500, 'wwid': 11900000 + i % 500,
+             'external_id': 'user{}'.format(i % 500), 'email': 'user{}@intel.com'.format(i % 500),
+             'create_At': started + datetime.timedelta(minutes=i)}
+            for i in range(offset, min(offset + chunk, rows))])
+
+
+def _legacy_filter(table, search):
+    return and_(table.c.request_id.contains(search), table.c.external_id.contains(search),
+                table.c.create_At.contains(search), table.c.controller.contains(search),
+                table.c.sut.contains(search))
+
+
+def _timed(engine, statement, repeat):
+    best = None
+    matched = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        matched = len(engine.execute(statement).fetchall())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 2), matched
+
+
+def run(database, rows=1000000, queries=DEFAULT_QUERIES, per_page=10, repeat=5):
+    """
+    Times the first search page against the legacy AND of LIKEs on a synthetic table.
+    Use a scratch database, the table is created and filled there.
+    :return: dict of search -> timings in ms and matched rows
+    """
+    engine = create_engine(database)
+    seed(engine, rows)
+    table = ManualProvision.__table__
+    order = (table.c.request_id.desc(), table.c.provision_id.desc())
+    results = {}
+    for search in queries:
+        condition = provision_search_filter(search, engine.dialect.name, table)
+        search_ms, search_rows = _timed(
+            engine, select([table]).where(condition).order_by(*order).limit(per_page + 1), repeat)
+        legacy_ms, legacy_rows = _timed(
+            engine, select([table]).where(_legacy_filter(table, search)).order_by(*order).limit(per_page), repeat)
+        results[search] = {'search_ms': search_ms, 'search_rows': search_rows,
+                           'legacy_ms': legacy_ms, 'legacy_rows': legacy_rows}
+    return results
@@ -0,0 +1,48 @@
+# project/benchmarks/serializer_benchmark.py
+
+import json
+import time
+
+from flask import json as flask_json
+
+from project.server import app
+from project.server.models import AlchemyEncoder, Controller, ManualProvision, serializer_for
+
+
+def _sample_rows(model, rows):
+    if model is Controller:
+        return [Controller(controller_name='controller-{}'.format(i), group_id=i % 7, alias_name='alias-{}'.format(i))
+                for i in range(rows)]
+    return [ManualProvision(controller='controller-{}'.format(i % 40), sut='sut-{}'.format(i), is_ifwi='PASS',
+                            is_bios='In Progress', is_os='NA', request_id=i, user_id=1, wwid=11918760,
+                            external_id='user{}'.format(i % 50), email='user@intel.com')
+            for i in range(rows)]
+
+
+def _timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def run(rows=10000, repeat=3):
+    """
+    Compares the reflection based AlchemyEncoder round trip with the column serializers
+    :return: dict of model name -> timings in ms
+    """
+    results = {}
+    with app.app_context():
+        for model in (Controller, ManualProvision):
+            objs = _sample_rows(model, rows)
+            serializer = serializer_for(model)
+            encoder_ms = _timed(lambda: flask_json.dumps({'data': json.loads(json.dumps(objs, cls=AlchemyEncoder))}),
+                                repeat)
+            serializer_ms = _timed(lambda: flask_json.dumps({'data': serializer.to_list(objs)}), repeat)
+            results[model.__name__] = {'rows': rows, 'alchemy_encoder_ms': round(encoder_ms, 1),
+                                       'serializer_ms': round(serializer_ms, 1),
+                                       'speedup': round(encoder_ms / serializer_ms, 1)}
+    return results
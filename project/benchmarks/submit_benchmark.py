@@ -0,0 +1,42 @@
+# project/benchmarks/submit_benchmark.py
+
+import time
+
+import requests
+
+from project.benchmarks.login_benchmark import _percentiles
+
+
+def _provisions(suts, **shared):
+    return [dict(shared, controller='bench-controller', sut='bench-sut-{}'.format(i), is_os='In Progress',
+                 tws_result_os='http://os-url.com') for i in range(suts)]
+
+
+def _three_calls(session, base_url, suts):
+    session.post(base_url + '/oap/provision_master', json={'user_id': 1})
+    request_id = session.get(base_url + '/oap/provision_master').json()['data']['global_id']
+    return session.post(base_url + '/oap/provision', json=_provisions(suts, user_id=1, request_id=request_id))
+
+
+def _one_call(session, base_url, suts):
+    return session.post(base_url + '/oap/provision/submit', json={'user_id': 1, 'provisions': _provisions(suts)})
+
+
+def run(base_url, suts=200, submissions=20):
+    """
+    Times creating submissions provisioning requests of suts SUTs against a running server, through
+    provision_master + read back + /oap/provision and through /oap/provision/submit
+    :return: dict of flow -> status code counts and latencies
+    """
+    timings = {}
+    for name, submit in (('three_calls', _three_calls), ('submit', _one_call)):
+        session = requests.Session()
+        statuses = {}
+        samples = []
+        for _ in range(submissions):
+            started = time.perf_counter()
+            response = submit(session, base_url, suts)
+            samples.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        timings[name] = {'statuses': statuses, 'latency': _percentiles(samples)}
+    return timings
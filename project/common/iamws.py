@@ -11,9 +11,12 @@
         [IAM WS-I API Contract](http://goto.intel.com/iamws)
 """
 
+import threading
+import time
 from collections import namedtuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 # endpoint for the internal development instance of the IAM WS
@@ -28,36 +31,80 @@ class Iamws(object):
     ENDP_TOKEN = '/token'
     ENDP_AUTHORIZATIONS = '/Authorizations'
 
-    def __init__(self, base_url=BASE_URL_IAMWS_INT_DEV):
+    def __init__(self, base_url=BASE_URL_IAMWS_INT_DEV, pool_size=10, timeout=(5, 30), token_refresh_margin=60):
+        """
+        :param pool_size: keep-alive connections kept open to the IAM WS
+        :param timeout: (connect, read) seconds for every call
+        :param token_refresh_margin: seconds before expires_in at which a cached access token is renewed
+        """
         self._base_url = base_url
+        self._timeout = timeout
+        self._token_refresh_margin = token_refresh_margin
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        # Setting 'verify=False' because otherwise the request fails on
+        # certificate verification:
+        # SSLError: [SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed
+        self._session.verify = False
+        self._token_lock = threading.Lock()
+        self._access_tokens = {}
 
     def get_windows_auth_endp(self):
         """ return the endpoint to redirect not yet authorized requests """
         return self._base_url + self.ENDP_WINDOWS_AUTH
 
-    def get_access_token(self, client_id, client_secret, scope='Token_WindowsAuth Authorization User_Read'):
-        """ get a token that can be used to retrieve user data or validate scope entitlements (authorizations) """
+    def get_access_token(self, client_id, client_secret, scope='Token_WindowsAuth Authorization User_Read',
+                         force_refresh=False):
+        """
+        get a token that can be used to retrieve user data or validate scope entitlements (authorizations).
+        The token is reused until token_refresh_margin seconds before it expires, when it runs out
+        only one caller requests a new one while the others wait for it.
+        """
+        key = (client_id, scope)
+        if not force_refresh:
+            cached = self._cached_access_token(key)
+            if cached is not None:
+                return cached
+        with self._token_lock:
+            if not force_refresh:
+                # another caller may have renewed it while this one waited
+                cached = self._cached_access_token(key)
+                if cached is not None:
+                    return cached
+            access_token = self.request_access_token(client_id, client_secret, scope)
+            if access_token.access_token is not None:
+                lifetime = max(float(access_token.expires_in or 0) - self._token_refresh_margin, 0)
+                self._access_tokens[key] = (access_token, time.monotonic() + lifetime)
+            return access_token
+
+    def _cached_access_token(self, key):
+        cached = self._access_tokens.get(key)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+        return None
+
+    def request_access_token(self, client_id, client_secret, scope='Token_WindowsAuth Authorization User_Read'):
+        """ request a new client credentials token from the IAM WS, bypassing the cache """
 
         payload = {
             'grant_type': 'client_credentials',
             'scope': scope
         }
 
-        # Setting 'verify=False' because otherwise the request fails on
-        # certificate verification:
-        # SSLError: [SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed
-        response = requests.post(
+        response = self._session.post(
             self._base_url + self.ENDP_TOKEN,
             auth=HTTPBasicAuth(client_id, client_secret),
             data=payload,
-            verify=False
+            timeout=self._timeout
         )
-        print('get_access_token response: ', response.text)
         if response.status_code == requests.codes.ok:
             response_obj = response.json()
             access_token = Access_token(response_obj['access_token'], response_obj['expires_in'], response.status_code,
                                         'OK')
         else:
+            print('get_access_token response: ', response.text)
             access_token = Access_token(None, 0, response.status_code, 'response.text:' + response.text)
         return access_token
 
@@ -70,19 +117,16 @@ class Iamws(object):
             'token': user_token
         }
 
-        # Setting 'verify=False' because otherwise the request fails on
-        # certificate verification:
-        # SSLError: [SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed
-        response = requests.post(
+        response = self._session.post(
             self._base_url + self.ENDP_WINDOWS_AUTH,
             headers=headers,
             json=payload,
-            verify=False
+            timeout=self._timeout
         )
         if response.status_code == requests.codes.ok:
             user_data = response.json()['IntelUserExtension']
         else:
-            user_data = {"response.status_code": response.status_code, "response.text": + response.text}
+            user_data = {"response.status_code": response.status_code, "response.text": response.text}
 
         return user_data
 
@@ -98,14 +142,11 @@ class Iamws(object):
             'schemas': ['urn:scim:schemas:extension:intelauthorization:1.0']
         }
 
-        # Setting 'verify=False' because otherwise the request fails on
-        # certificate verification:
-        # SSLError: [SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed
-        response = requests.post(
+        response = self._session.post(
             self._base_url + self.ENDP_AUTHORIZATIONS,
             headers=headers,
             json=payload,
-            verify=False
+            timeout=self._timeout
         )
 
         # print('verify_memberships response:\n', pp.pformat(response.text))
@@ -0,0 +1,173 @@
+"""background delivery of spooled notification mails"""
+import datetime
+import queue
+import smtplib
+import threading
+import time
+
+from project.logger.logger_util import get_logger_instance
+from project.server import app, db
+from project.server.models import EmailSpool
+
+
+class MailQueue:
+    """
+    Mails are written to the OAP_EMAIL_SPOOL table first and delivered by worker threads,
+    each keeping one SMTP connection open between mails. A row is claimed for
+    MAIL_SEND_LEASE seconds before it is sent, failed sends are retried with exponential
+    backoff and rows left behind by a restart are picked up by the periodic spool scan.
+    """
+
+    def __init__(self):
+        self.logger = get_logger_instance()
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._periodic_tasks = []
+
+    def add_periodic_task(self, task):
+        """
+        Runs task in the workers' app context once per MAIL_QUEUE_POLL_INTERVAL, before the spool scan
+        """
+        self._periodic_tasks.append(task)
+
+    def start(self):
+        """
+        Starts the worker threads of this process, safe to call more than once
+        """
+        if not app.config.get('MAIL_QUEUE_ENABLED', True):
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(app.config.get('MAIL_QUEUE_WORKERS', 2)):
+                worker = threading.Thread(target=self._run, name='mail-queue-{}'.format(index), daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def enqueue(self, sender, recipients, message, commit=True):
+        """
+        Spools a mail and wakes a worker
+        :param recipients: list of addresses
+        :param message: the full message as returned by MIMEMultipart.as_string()
+        :param commit: False leaves the row in the caller's transaction, the caller commits and
+            then passes the id to wake()
+        :return: id of the spooled row
+        """
+        spooled = EmailSpool(sender=sender, recipients=','.join(recipients), message=message)
+        db.session.add(spooled)
+        if not commit:
+            db.session.flush()
+            return spooled.id
+        db.session.commit()
+        self.wake([spooled.id])
+        return spooled.id
+
+    def wake(self, spool_ids):
+        """
+        Hands committed spool rows to the workers
+        """
+        self.start()
+        for spool_id in spool_ids:
+            self._pending.put(spool_id)
+
+    def _connect(self):
+        server = smtplib.SMTP(app.config.get('MAIL_SERVER'), app.config.get('MAIL_PORT', 25),
+                              timeout=app.config.get('MAIL_SMTP_TIMEOUT', 30))
+        self.logger.info("Server : {}".format(server))
+        return server
+
+    @staticmethod
+    def _close(server):
+        if server is not None:
+            try:
+                server.quit()
+            except smtplib.SMTPException:
+                server.close()
+            except OSError:
+                pass
+
+    def _claim(self, spool_id):
+        now = datetime.datetime.now()
+        lease = now + datetime.timedelta(seconds=app.config.get('MAIL_SEND_LEASE', 300))
+        claimed = EmailSpool.query.filter(EmailSpool.id == spool_id,
+                                          EmailSpool.status.in_(('queued', 'sending')),
+                                          EmailSpool.next_attempt_At <= now).update(
+            {'status': 'sending', 'next_attempt_At': lease}, synchronize_session=False)
+        db.session.commit()
+        return EmailSpool.query.get(spool_id) if claimed else None
+
+    def _due(self):
+        return [row.id for row in EmailSpool.query.filter(
+            EmailSpool.status.in_(('queued', 'sending')),
+            EmailSpool.next_attempt_At <= datetime.datetime.now()).with_entities(EmailSpool.id).limit(100)]
+
+    def _send(self, server, spooled):
+        if server is None:
+            server = self._connect()
+        try:
+            server.sendmail(spooled.sender, spooled.recipients.split(','), spooled.message)
+        except smtplib.SMTPServerDisconnected:
+            # the relay dropped the idle connection, reconnect once
+            self._close(server)
+            server = self._connect()
+            server.sendmail(spooled.sender, spooled.recipients.split(','), spooled.message)
+        return server
+
+    def _deliver(self, server, spool_id):
+        spooled = self._claim(spool_id)
+        if spooled is None:
+            return server
+        try:
+            server = self._send(server, spooled)
+            spooled.status = 'sent'
+            spooled.sent_At = datetime.datetime.now()
+            spooled.last_error = None
+            self.logger.info("Email sent successfully..")
+        except (smtplib.SMTPException, OSError) as e:
+            self._close(server)
+            server = None
+            spooled.attempts += 1
+            spooled.last_error = str(e)[:500]
+            if spooled.attempts >= app.config.get('MAIL_MAX_ATTEMPTS', 5):
+                spooled.status = 'failed'
+                self.logger.error("Giving up on spooled email {}: {}".format(spool_id, e))
+            else:
+                delay = min(app.config.get('MAIL_RETRY_BACKOFF', 30) * 2 ** (spooled.attempts - 1),
+                            app.config.get('MAIL_RETRY_BACKOFF_MAX', 3600))
+                spooled.status = 'queued'
+                spooled.next_attempt_At = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+                self.logger.warning("Spooled email {} failed, retry in {}s: {}".format(spool_id, delay, e))
+        db.session.commit()
+        return server
+
+    def _run(self):
+        server = None
+        last_scan = time.monotonic()
+        while True:
+            interval = app.config.get('MAIL_QUEUE_POLL_INTERVAL', 30)
+            try:
+                spool_ids = [self._pending.get(timeout=interval)]
+            except queue.Empty:
+                # idle: hang up on the relay
+                self._close(server)
+                server = None
+                spool_ids = []
+            with app.app_context():
+                try:
+                    if time.monotonic() - last_scan >= interval:
+                        # look for retries and mail spooled before a restart
+                        last_scan = time.monotonic()
+                        for task in self._periodic_tasks:
+                            task()
+                        spool_ids += self._due()
+                    for spool_id in spool_ids:
+                        server = self._deliver(server, spool_id)
+                except Exception as e:
+                    self.logger.error("Mail queue worker error: {}".format(e))
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+
+mail_queue = MailQueue()
@@ -1,8 +1,15 @@
+import datetime
 import smtplib
+import uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from sqlalchemy import func
+
 from project.logger.logger_util import get_logger_instance
+from project.notification.mail_queue import mail_queue
+from project.server import app, db
+from project.server.models import EmailDigestItem
 
 
 class EmailNotifier:
@@ -29,19 +36,26 @@ class EmailNotifier:
         self.oap_sut = kwargs.get('oap_sut')
         self.oap_provision_status = kwargs.get('oap_provision_status')
 
-        self.server = smtplib.SMTP('ecsmtp.pdx.intel.com')
-        self.logger.info("Server : {}".format(self.server))
         self.email_footer = "\n\nBest Regards, \nOneAutomationPortal Team"
 
-    def send_email(self):
+    def send_email(self, commit=True):
         """
-        Send email via smtp server
+        Send email via smtp server, or hand it to the mail queue when MAIL_QUEUE_ENABLED
+        :param commit: passed to MailQueue.enqueue
+        :return: id of the spooled row when queued
         """
-        self.logger.info("Sending Email..")
         self.msg['To'] = self.to_list + ',' + self.admin
         print("Recipient List: ", self.msg['To'])
-        self.server.sendmail(self.msg['From'], self.msg['To'].split(','), self.msg.as_string())
-        self.server.quit()
+        recipients = [address for address in self.msg['To'].split(',') if address]
+        if app.config.get('MAIL_QUEUE_ENABLED', True):
+            spool_id = mail_queue.enqueue(self.msg['From'], recipients, self.msg.as_string(), commit=commit)
+            self.logger.info("Email queued as {}..".format(spool_id))
+            return spool_id
+        self.logger.info("Sending Email..")
+        server = smtplib.SMTP(app.config.get('MAIL_SERVER'), app.config.get('MAIL_PORT', 25))
+        self.logger.info("Server : {}".format(server))
+        server.sendmail(self.msg['From'], recipients, self.msg.as_string())
+        server.quit()
         self.logger.info("Email sent successfully..")
 
     def set_subject(self):
@@ -76,11 +90,128 @@ class EmailNotifier:
         self.message += self.email_footer
         self.msg.attach(MIMEText(self.message, 'plain'))
 
+    def set_body_status_digest(self, items):
+        """
+        one message for every status transition of a request
+        :param items: EmailDigestItem rows of the request, oldest first
+        """
+        self.msg['Subject'] = '[OAP] Request {} - {} status update(s)'.format(self.oap_req_id, len(items))
+
+        self.message = "OAP Manual Provisioning Trigger with Request ID -{} ,\n".format(
+            self.oap_req_id)
+        self.message += "\nRequest Triggered By - {}\n".format(self.oap_user_fullname)
+        for item in items:
+            self.message += "\nOn system {} for {} has been moved to {} state.\n".format(
+                item.sut, item.provision_type, item.provision_status)
+            self.message += "Tws Result Link - {}\n".format(item.tws_link)
+        self.message += "\n\nFor Any Queries or Suggestion , Please connect with us at oneautomationportalteam@intel.com.\n"
+        self.message += self.email_footer
+        self.msg.attach(MIMEText(self.message, 'plain'))
+
+    def add_to_status_digest(self, commit=True):
+        """
+        Keeps the transition for the request digest sent MAIL_DIGEST_WINDOW seconds after its first one
+        :param commit: False leaves the item in the caller's transaction
+        """
+        db.session.add(EmailDigestItem(request_id=self.oap_req_id,
+                                       to_list=self.to_list,
+                                       user_fullname=self.oap_user_fullname,
+                                       sut=self.oap_sut,
+                                       provision_type=self.oap_provision_type,
+                                       provision_status=self.oap_provision_status,
+                                       tws_link=self.oap_tws_link))
+        if commit:
+            db.session.commit()
+        self.logger.info("Status of {} added to digest of request {}..".format(self.oap_sut, self.oap_req_id))
+
+    @staticmethod
+    def digest_enabled():
+        return app.config.get('MAIL_QUEUE_ENABLED', True) and app.config.get('MAIL_DIGEST_WINDOW', 0) > 0
+
     def trigger_email_notification(self):
         if self.notification_type == 'new_user':
             self.set_subject()
             self.set_body()
             self.send_email()
         elif self.notification_type == 'trigger_status':
-            self.set_body_status_notification()
-            self.send_email()
+            if EmailNotifier.digest_enabled():
+                self.add_to_status_digest()
+            else:
+                self.set_body_status_notification()
+                self.send_email()
+
+    @staticmethod
+    def trigger_status_notifications(notifiers):
+        """
+        Digests or spools the 'trigger_status' notifications of a bulk update with one commit
+        :param notifiers: list of EmailNotifier
+        """
+        spool_ids = []
+        for notifier in notifiers:
+            if EmailNotifier.digest_enabled():
+                notifier.add_to_status_digest(commit=False)
+            else:
+                notifier.set_body_status_notification()
+                spool_ids.append(notifier.send_email(commit=False))
+        db.session.commit()
+        spool_ids = [spool_id for spool_id in spool_ids if spool_id is not None]
+        if spool_ids:
+            mail_queue.wake(spool_ids)
+
+
+def flush_status_digests():
+    """
+    Mails one digest per request whose first pending transition is older than MAIL_DIGEST_WINDOW.
+    Items are claimed for MAIL_SEND_LEASE seconds; the delete of a request's items and all of its
+    spooled digests commit together, a failure releases the claim and the next flush retries.
+    """
+    now = datetime.datetime.now()
+    cutoff = now - datetime.timedelta(seconds=app.config.get('MAIL_DIGEST_WINDOW', 0))
+    unclaimed = EmailDigestItem.batch.is_(None) | (EmailDigestItem.claimed_At < now - datetime.timedelta(
+        seconds=app.config.get('MAIL_SEND_LEASE', 300)))
+    due = db.session.query(EmailDigestItem.request_id).filter(unclaimed).group_by(
+        EmailDigestItem.request_id).having(func.min(EmailDigestItem.create_At) <= cutoff).all()
+    for (request_id,) in due:
+        # claim the request's items so a concurrent worker does not mail them too
+        batch = uuid.uuid4().hex
+        claimed = EmailDigestItem.query.filter(EmailDigestItem.request_id == request_id, unclaimed).update(
+            {'batch': batch, 'claimed_At': now}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            continue
+        try:
+            spool_ids = _mail_status_digest(request_id, batch)
+        except Exception as e:
+            db.session.rollback()
+            EmailDigestItem.query.filter_by(batch=batch).update({'batch': None, 'claimed_At': None},
+                                                                synchronize_session=False)
+            db.session.commit()
+            get_logger_instance().error("Status digest of request {} failed, retrying on the next flush: {}".format(
+                request_id, e))
+            continue
+        mail_queue.wake(spool_ids)
+
+
+def _mail_status_digest(request_id, batch):
+    """
+    Spools the digests of the claimed batch and deletes its items in one transaction
+    :return: ids of the spooled rows
+    """
+    items = EmailDigestItem.query.filter_by(batch=batch).order_by(EmailDigestItem.id).all()
+    by_recipients = {}
+    for item in items:
+        by_recipients.setdefault(item.to_list, []).append(item)
+    spool_ids = []
+    for to_list, recipient_items in by_recipients.items():
+        notifier = EmailNotifier(oap_req_id=request_id,
+                                 to_list=to_list,
+                                 oap_user_fullname=recipient_items[0].user_fullname,
+                                 notification_type='status_digest')
+        notifier.set_body_status_digest(recipient_items)
+        spool_ids.append(notifier.send_email(commit=False))
+    EmailDigestItem.query.filter_by(batch=batch).delete(synchronize_session=False)
+    db.session.commit()
+    return spool_ids
+
+
+mail_queue.add_periodic_task(flush_status_digests)
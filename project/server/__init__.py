@@ -3,10 +3,9 @@
 import os
 import socket
 
-from flask import Flask
+from flask import Flask, request
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 
 app = Flask(__name__)
 
@@ -19,7 +18,8 @@ app_settings = os.getenv(
 app.config.from_object(app_settings)
 
 bcrypt = Bcrypt(app)
-db = SQLAlchemy(app=app)
+from project.server.db_pool import PooledSQLAlchemy
+db = PooledSQLAlchemy(app=app)
 from project.server.auth.views import auth_blueprint
 from project.server.oap.oapviews import oap_blueprint
 from project.server.auth.flask_sso import SSO_APP
@@ -28,6 +28,10 @@ app.register_blueprint(auth_blueprint)
 app.register_blueprint(oap_blueprint)
 app.register_blueprint(SSO_APP)
 app.register_blueprint(oap_nickel_blueprint)
+from project.notification.mail_queue import mail_queue
+app.before_first_request(mail_queue.start)
+from project.server.db_routing import route_reads
+app.before_request(lambda: route_reads(db, request, app.config))
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 if __name__ == "__main__":
     """Start the application Server."""
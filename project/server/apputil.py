@@ -1,3 +1,4 @@
+from project.server.auth.token_cache import auth_tokens
 from project.server.models import User, ManualProvision, NickelProfile
 
 
@@ -14,8 +15,11 @@ class AppUtil:
                 if auth_token:
                     resp = User.decode_auth_token(auth_token)
                     if not isinstance(resp, str):
+                        if auth_tokens.user_verified(auth_token):
+                            return True
                         user = User.query.filter_by(user_id=resp).first()
                         if user:
+                            auth_tokens.mark_user_verified(auth_token)
                             return True
                         else:
                             return False
@@ -0,0 +1,40 @@
+# project/server/auth/bloom.py
+
+import math
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter over sha256 hex digests. A miss is definite, a hit has to be
+    confirmed, with a false positive rate of about error_rate while at most capacity keys are added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(int(capacity), 1)
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest):
+        # double hashing over two 64 bit slices of the digest
+        first = int(digest[:16], 16)
+        second = int(digest[16:32], 16) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest):
+        bits = self._bits
+        for position in self._positions(digest):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
@@ -9,6 +9,8 @@ from dotenv import load_dotenv
 from flask import redirect, request, session, url_for, Blueprint, make_response, jsonify
 
 from project.common import iamws
+from project.server import app
+from project.server.auth.sso_resolver import SsoResolver
 
 # Load environmental variables
 env_path = Path.cwd() / ".env"
@@ -25,21 +27,48 @@ SYS_PWD = os.environ.get('SYS_PWD', '')
 requests.packages.urllib3.disable_warnings()
 
 # this is a service that we instantiate for use across the whole app
-iamws_service = iamws.Iamws(BASE_URL_IAMWS_INT_DEV)
+iamws_service = iamws.Iamws(BASE_URL_IAMWS_INT_DEV,
+                            pool_size=app.config.get('IAMWS_POOL_SIZE', 10),
+                            timeout=(app.config.get('IAMWS_CONNECT_TIMEOUT', 5),
+                                     app.config.get('IAMWS_READ_TIMEOUT', 30)),
+                            token_refresh_margin=app.config.get('IAMWS_TOKEN_REFRESH_MARGIN', 60))
+
+# AD groups checked for every logged user
+SSO_MEMBERSHIPS = [
+    {
+        "name": "CN=O365Prog-Group creation,OU=Managed,OU=Groups,DC=amr,DC=corp,DC=intel,DC=com",
+        "type": "CORPAD",
+    },
+    {
+        "name": "CN=CCG Cloud Admin,OU=Managed,OU=Groups,DC=amr,DC=corp,DC=intel,DC=com",
+        "type": "CORPAD",
+    }
+]
+
+sso_resolver = SsoResolver(iamws_service, SYS_APP, SYS_PWD, SSO_MEMBERSHIPS)
 
 SSO_APP = Blueprint('authsso', __name__, url_prefix='/authsso')
 
 
+def sso_response_body(resolution):
+    body = {'user_data': session.get('user_data'), 'memberships': session.get('memberships')}
+    if app.config.get('SSO_RESPONSE_TIMINGS', False):
+        body['timings'] = resolution['timings']
+    return body
+
+
 @SSO_APP.route('/user', methods=['GET', 'POST'])
 def getUserDetails():
     post_data = request.get_json()
     client_token = post_data.get('token')
-    print(client_token)
-    access_token_response = iamws_service.get_access_token(SYS_APP, SYS_PWD)
-    access_token = access_token_response.access_token
-    print(access_token)
+    resolution = sso_resolver.resolve(client_token)
+    if resolution['access_token'].access_token is None:
+        response = jsonify({'message': 'The generic user managing this App did not get an IAM access token.'
+                                       'Please call for support.'})
+        return make_response(response
+                             ), 500
     # Add Validation
-    user_data = iamws_service.get_user_data(client_token, access_token)
+    user_data = resolution['user_data']
     print('user_data:\n', pp.pformat(user_data))
 
     #
@@ -74,18 +103,7 @@ def getUserDetails():
         return make_response(response
                              ), 500
 
-    memberships = [
-        {
-            "name": "CN=O365Prog-Group creation,OU=Managed,OU=Groups,DC=amr,DC=corp,DC=intel,DC=com",
-            "type": "CORPAD",
-        },
-        {
-            "name": "CN=CCG Cloud Admin,OU=Managed,OU=Groups,DC=amr,DC=corp,DC=intel,DC=com",
-            "type": "CORPAD",
-        }
-    ]
-
-    user_memberships = iamws_service.verify_memberships(user_id, access_token, memberships)
+    user_memberships = resolution['memberships']
     print('User Memberships : ', user_memberships)
     session['user_data'] = user_data
     session['memberships'] = user_memberships
@@ -94,7 +112,7 @@ def getUserDetails():
     print('session membership :\n', session['memberships'])
 
     # return redirect(url_for('auth.index', _external=True))
-    response = jsonify({'user_data': session.get('user_data'), 'memberships': session.get('memberships')})
+    response = jsonify(sso_response_body(resolution))
     response.headers.add("Access-Control-Allow-Origin", "*")
     return make_response(response
                          ), 200
@@ -145,10 +163,9 @@ def sso():
     # (scope='Token_WindowsAuth Authorization')
     # indicating that we want to use the bearer token to authenticate a user and to
     # check for his/her Authorizations
-    access_token_response = iamws_service.get_access_token(SYS_APP, SYS_PWD)
-    access_token = access_token_response.access_token
-    print('access_token:', access_token)
-    expires_in = access_token_response.expires_in
+    resolution = sso_resolver.resolve(user_token)
+    access_token = resolution['access_token'].access_token
+    expires_in = resolution['access_token'].expires_in
     print('expires_in:', expires_in)
 
     if access_token is None:
@@ -160,9 +177,9 @@ def sso():
         print('access_token:', access_token)  # this will have more detailed information
         return redirect(url_for('authsso.index', _external=True))
 
-    # if all went well so far, we can now use the access_token
+    # if all went well so far, the access_token was used
     # to retrieve descriptive data for the user sending us http requests
-    user_data = iamws_service.get_user_data(user_token, access_token)
+    user_data = resolution['user_data']
     print('user_data:\n', pp.pformat(user_data))
 
     #
@@ -189,18 +206,7 @@ def sso():
         print('user_data:', user_data)  # this will have more detailed information
         return redirect(url_for('authsso.index', _external=True))
 
-    memberships = [
-        {
-            "name": "CN=O365Prog-Group creation,OU=Managed,OU=Groups,DC=amr,DC=corp,DC=intel,DC=com",
-            "type": "CORPAD",
-        },
-        {
-            "name": "CN=CCG Cloud Admin,OU=Managed,OU=Groups,DC=amr,DC=corp,DC=intel,DC=com",
-            "type": "CORPAD",
-        }
-    ]
-
-    user_memberships = iamws_service.verify_memberships(user_id, access_token, memberships)
+    user_memberships = resolution['memberships']
     print('User Memberships : ', user_memberships)
     session['user_data'] = user_data
     session['memberships'] = user_memberships
@@ -209,7 +215,7 @@ def sso():
     print('session membership :\n', session['memberships'])
 
     # return redirect(url_for('auth.index', _external=True))
-    response = jsonify({'user_data': session.get('user_data'), 'memberships': session.get('memberships')})
+    response = jsonify(sso_response_body(resolution))
     response.headers.add("Access-Control-Allow-Origin", "*")
     return make_response(response
                          ), 200
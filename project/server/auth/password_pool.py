@@ -0,0 +1,161 @@
+# project/server/auth/password_pool.py
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask_bcrypt import Bcrypt
+
+from project.server import app
+
+try:
+    import fcntl
+except ImportError:
+    # no flock outside POSIX, slots are only shared by the threads of this process there
+    fcntl = None
+
+_bcrypt = Bcrypt()
+
+
+def hash_rounds(pw_hash):
+    """
+    :return: the cost factor of a bcrypt hash ('$2b$13$...' -> 13), None when it is not one
+    """
+    if isinstance(pw_hash, bytes):
+        pw_hash = pw_hash.decode('utf-8')
+    try:
+        return int(pw_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordPoolBusy(Exception):
+    """ Every hashing slot and queue place is taken, the caller should answer 429 """
+
+
+class Slots:
+    """
+    count non-blocking slots shared by every process of the host, one flock()ed file per slot.
+    The kernel drops the lock of a process that dies, so a crashed worker never leaks its slot.
+    """
+
+    def __init__(self, directory, name, count):
+        self._paths = [os.path.join(directory, '{}-{}.lock'.format(name, index)) for index in range(count)]
+        self._local = threading.BoundedSemaphore(count) if fcntl is None else None
+
+    def try_acquire(self):
+        """
+        :return: handle for release, None when every slot is taken
+        """
+        if self._local is not None:
+            return True if self._local.acquire(blocking=False) else None
+        for path in self._paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError:
+                os.close(fd)
+        return None
+
+    def release(self, handle):
+        if self._local is not None:
+            self._local.release()
+            return
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        os.close(handle)
+
+
+class PasswordHasher:
+    """
+    Admission control for bcrypt. At most PASSWORD_HASH_SLOTS hashes run at once across all
+    gunicorn workers of the host and PASSWORD_HASH_QUEUE more wait up to PASSWORD_HASH_WAIT
+    seconds for a slot, so password work never ties up more than slots + queue workers and
+    every other request keeps the remaining ones. Past that, PasswordPoolBusy is raised at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = None
+        self._queue = None
+        self.rejected = 0
+
+    def _init_slots(self):
+        with self._lock:
+            if self._slots is None:
+                directory = app.config.get('PASSWORD_HASH_LOCK_DIR') or os.path.join(
+                    tempfile.gettempdir(), 'oap-password-slots')
+                os.makedirs(directory, exist_ok=True)
+                self._queue = Slots(directory, 'queue', app.config.get('PASSWORD_HASH_QUEUE', 1))
+                self._slots = Slots(directory, 'slot', app.config.get('PASSWORD_HASH_SLOTS', 2))
+
+    @contextmanager
+    def slot(self):
+        """
+        Holds a hashing slot for the duration of the with block
+        :raises PasswordPoolBusy: when no slot frees up in time
+        """
+        if self._slots is None:
+            self._init_slots()
+        handle = self._slots.try_acquire()
+        if handle is None:
+            handle = self._wait_for_slot()
+        try:
+            yield
+        finally:
+            self._slots.release(handle)
+
+    def _wait_for_slot(self):
+        place = self._queue.try_acquire()
+        if place is None:
+            self._reject()
+        try:
+            deadline = time.monotonic() + app.config.get('PASSWORD_HASH_WAIT', 2)
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                handle = self._slots.try_acquire()
+                if handle is not None:
+                    return handle
+        finally:
+            self._queue.release(place)
+        self._reject()
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise PasswordPoolBusy()
+
+    def generate(self, password):
+        """
+        :return: bcrypt hash of password at BCRYPT_LOG_ROUNDS, as str
+        """
+        with self.slot():
+            return _bcrypt.generate_password_hash(password, app.config.get('BCRYPT_LOG_ROUNDS')).decode()
+
+    def verify(self, pw_hash, password):
+        """
+        Checks password and, when its hash was made with another BCRYPT_LOG_ROUNDS, hashes it
+        again at the configured cost in the same slot
+        :return: (matches, new hash to store or None)
+        """
+        rounds = app.config.get('BCRYPT_LOG_ROUNDS')
+        with self.slot():
+            if not _bcrypt.check_password_hash(pw_hash, password):
+                return False, None
+            if hash_rounds(pw_hash) == rounds:
+                return True, None
+            return True, _bcrypt.generate_password_hash(password, rounds).decode()
+
+    def change(self, pw_hash, password, new_password):
+        """
+        :return: hash of new_password, None when password does not match pw_hash
+        """
+        with self.slot():
+            if not _bcrypt.check_password_hash(pw_hash, password):
+                return None
+            return _bcrypt.generate_password_hash(new_password, app.config.get('BCRYPT_LOG_ROUNDS')).decode()
+
+
+password_hasher = PasswordHasher()
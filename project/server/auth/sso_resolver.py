@@ -0,0 +1,137 @@
+# project/server/auth/sso_resolver.py
+
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from project.logger.logger_util import get_logger_instance
+from project.server import app
+
+
+class TTLCache:
+    """
+    Small thread safe cache whose entries expire ttl seconds after they were stored,
+    expired entries stay readable with their age so callers can serve them while refreshing
+    """
+    max_entries = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        """
+        :return: (value, age in seconds) or (None, None)
+        """
+        with self._lock:
+            hit = self._entries.get(key)
+        if hit is None:
+            return None, None
+        return hit[1], time.monotonic() - hit[0]
+
+    def put(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic(), value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SsoResolver:
+    """
+    Resolves an IAM user token to the user data and AD group memberships of the user.
+    The access token comes from the Iamws cache, user data is kept per user token for
+    SSO_USER_DATA_TTL seconds and membership results per user for SSO_MEMBERSHIP_TTL seconds.
+    Memberships older than that but younger than SSO_MEMBERSHIP_STALE_TTL are returned at once
+    while a background thread verifies them again, so they never delay a login.
+    """
+
+    def __init__(self, iamws_service, client_id, client_secret, memberships):
+        self.logger = get_logger_instance()
+        self._iamws = iamws_service
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._memberships = memberships
+        self._user_data = TTLCache()
+        self._verifications = TTLCache()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=app.config.get('SSO_REFRESH_WORKERS', 2),
+                                            thread_name_prefix='sso-refresh')
+
+    @staticmethod
+    def _timed(timings, stage, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 3)
+
+    def resolve(self, user_token):
+        """
+        :return: dict with access_token, user_data, memberships and timings, the per stage
+            milliseconds. user_data and memberships are None when an earlier stage failed.
+        """
+        started = time.perf_counter()
+        timings = {}
+        result = {'access_token': None, 'user_data': None, 'memberships': None, 'timings': timings}
+        access_token = self._timed(timings, 'access_token_ms', self._iamws.get_access_token,
+                                   self._client_id, self._client_secret)
+        result['access_token'] = access_token
+        if access_token.access_token is not None:
+            user_data = self._timed(timings, 'user_data_ms', self.user_data, user_token, access_token.access_token)
+            result['user_data'] = user_data
+            user_id = user_data.get('id') if user_data.get('displayName') is not None else None
+            if user_id is not None:
+                result['memberships'] = self._timed(timings, 'memberships_ms', self.memberships, user_id,
+                                                    access_token.access_token)
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self.logger.info("SSO resolution timings: {}".format(timings))
+        return result
+
+    def user_data(self, user_token, access_token):
+        key = hashlib.sha256(str(user_token).encode('utf-8')).hexdigest()
+        cached, age = self._user_data.get(key)
+        if cached is not None and age <= app.config.get('SSO_USER_DATA_TTL', 300):
+            return cached
+        user_data = self._iamws.get_user_data(user_token, access_token)
+        if user_data.get('id') is not None:
+            self._user_data.put(key, user_data)
+        return user_data
+
+    def memberships(self, user_id, access_token):
+        cached, age = self._verifications.get(user_id)
+        if cached is not None:
+            if age <= app.config.get('SSO_MEMBERSHIP_TTL', 60):
+                return cached
+            if age <= app.config.get('SSO_MEMBERSHIP_STALE_TTL', 180):
+                self._refresh_in_background(user_id, access_token)
+                return cached
+        return self._verify(user_id, access_token)
+
+    def _verify(self, user_id, access_token):
+        verifications = self._iamws.verify_memberships(user_id, access_token, self._memberships)
+        if isinstance(verifications, list):
+            self._verifications.put(user_id, verifications)
+        return verifications
+
+    def _refresh_in_background(self, user_id, access_token):
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+
+        def refresh():
+            try:
+                self._verify(user_id, access_token)
+            except Exception as e:
+                self.logger.warning("Membership refresh for {} failed: {}".format(user_id, e))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(user_id)
+
+        self._executor.submit(refresh)
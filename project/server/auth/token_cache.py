@@ -0,0 +1,178 @@
+# project/server/auth/token_cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from project.server import app
+from project.server.auth.bloom import BloomFilter
+
+
+def _token_key(auth_token):
+    return auth_token.decode('utf-8') if isinstance(auth_token, bytes) else str(auth_token)
+
+
+def token_hash(auth_token):
+    """
+    :return: sha256 hex digest the blacklist stores instead of the token
+    """
+    return hashlib.sha256(_token_key(auth_token).encode('utf-8')).hexdigest()
+
+
+class AuthTokenCache:
+    """
+    Bounded LRU of verified auth tokens -> user_id, every entry expires with the token's exp claim
+    so a cached token is never accepted for longer than jwt.decode would accept it
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, auth_token):
+        """
+        :return: user_id of a verified, unexpired token, None otherwise
+        """
+        key = _token_key(auth_token)
+        with self._lock:
+            hit = self._tokens.get(key)
+            if hit is None or hit[1] <= time.time():
+                if hit is not None:
+                    del self._tokens[key]
+                self.misses += 1
+                return None
+            self._tokens.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def put(self, auth_token, user_id, exp):
+        """
+        :param exp: the token's exp claim, seconds since the epoch
+        """
+        with self._lock:
+            self._tokens[_token_key(auth_token)] = [user_id, exp, False]
+            while len(self._tokens) > app.config.get('AUTH_TOKEN_CACHE_SIZE', 10000):
+                self._tokens.popitem(last=False)
+
+    def user_verified(self, auth_token):
+        """
+        :return: True when the token's user was already found in OAP_USERS
+        """
+        with self._lock:
+            hit = self._tokens.get(_token_key(auth_token))
+            return hit is not None and hit[2]
+
+    def mark_user_verified(self, auth_token):
+        with self._lock:
+            hit = self._tokens.get(_token_key(auth_token))
+            if hit is not None:
+                hit[2] = True
+
+    def discard(self, auth_token):
+        with self._lock:
+            self._tokens.pop(_token_key(auth_token), None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._tokens)}
+
+
+class TokenBlacklist:
+    """
+    Bloom filter over the token hashes in blacklist_tokens, so tokens that were never logged out
+    are answered without a query. Filter hits are confirmed against the table. Logouts handled
+    by this process are added directly, the ones handled by other gunicorn workers are read
+    back every AUTH_BLACKLIST_REFRESH seconds and expired rows are pruned once per
+    AUTH_BLACKLIST_PRUNE_INTERVAL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(1)
+        self._confirmed = set()
+        self._last_id = 0
+        self._loaded_at = None
+        self._pruned_at = None
+        self.lookups = 0
+        self.filter_hits = 0
+        self.false_positives = 0
+
+    def reload(self):
+        """
+        Prunes expired rows and rebuilds the filter from the remaining ones
+        """
+        from project.server.models import BlacklistToken
+        BlacklistToken.prune_expired()
+        rows = BlacklistToken.query.with_entities(BlacklistToken.id, BlacklistToken.token_hash).all()
+        bloom = BloomFilter(max(app.config.get('AUTH_BLACKLIST_BLOOM_CAPACITY', 1000000), 2 * len(rows)),
+                            app.config.get('AUTH_BLACKLIST_BLOOM_ERROR', 0.001))
+        for row in rows:
+            bloom.add(row.token_hash)
+        with self._lock:
+            self._filter = bloom
+            self._confirmed = set()
+            self._last_id = max([row.id for row in rows] or [0])
+            self._loaded_at = self._pruned_at = time.monotonic()
+
+    def refresh(self):
+        """
+        Adds the tokens blacklisted since the last load, reading AUTH_BLACKLIST_ID_OVERLAP ids back,
+        rebuilds once the prune interval passed or the filter is over capacity
+        """
+        from project.server.models import BlacklistToken
+        if (time.monotonic() - self._pruned_at > app.config.get('AUTH_BLACKLIST_PRUNE_INTERVAL', 3600)
+                or self._filter.count > self._filter.capacity):
+            self.reload()
+            return
+        rows = BlacklistToken.query.filter(
+            BlacklistToken.id > self._last_id - app.config.get('AUTH_BLACKLIST_ID_OVERLAP', 1000)).with_entities(
+            BlacklistToken.id, BlacklistToken.token_hash).all()
+        with self._lock:
+            for row in rows:
+                # the overlap reads rows again, count each token once
+                if row.token_hash not in self._filter:
+                    self._filter.add(row.token_hash)
+            self._last_id = max([row.id for row in rows] + [self._last_id])
+            self._loaded_at = time.monotonic()
+
+    def add(self, auth_token):
+        digest = token_hash(auth_token)
+        with self._lock:
+            self._filter.add(digest)
+            self._confirmed.add(digest)
+
+    def __contains__(self, auth_token):
+        if self._loaded_at is None:
+            self.reload()
+        elif time.monotonic() - self._loaded_at > app.config.get('AUTH_BLACKLIST_REFRESH', 30):
+            self.refresh()
+        digest = token_hash(auth_token)
+        with self._lock:
+            self.lookups += 1
+            if digest not in self._filter:
+                return False
+            self.filter_hits += 1
+            if digest in self._confirmed:
+                return True
+        from project.server.models import BlacklistToken
+        blacklisted = BlacklistToken.query.filter_by(token_hash=digest).with_entities(
+            BlacklistToken.id).first() is not None
+        with self._lock:
+            if blacklisted:
+                self._confirmed.add(digest)
+            else:
+                self.false_positives += 1
+        return blacklisted
+
+    def stats(self):
+        with self._lock:
+            return {'lookups': self.lookups, 'filter_hits': self.filter_hits,
+                    'false_positives': self.false_positives, 'entries': self._filter.count,
+                    'filter_bytes': self._filter.nbytes}
+
+
+auth_tokens = AuthTokenCache()
+token_blacklist = TokenBlacklist()
@@ -3,11 +3,24 @@
 from flask import Blueprint, request, make_response, jsonify
 from flask.views import MethodView
 
+from project.logger.logger_util import get_logger_instance
 from project.notification.oap_email_notofier import EmailNotifier
-from project.server import db, bcrypt, app
+from project.server import db, app
+from project.server.auth.password_pool import password_hasher, PasswordPoolBusy
+from project.server.auth.token_cache import auth_tokens, token_blacklist
 from project.server.models import User, BlacklistToken, OAPUsersRole
 
 
+def password_busy_response():
+    responseObject = {
+        'status': 'fail',
+        'message': 'Too many password checks in progress. Please try again.'
+    }
+    response = make_response(jsonify(responseObject))
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+
 class UserRole(MethodView):
     def post(self):
         post_data = request.get_json()
@@ -65,10 +78,10 @@ class UpdateUserPassword(MethodView):
         n_password = params['new_password'].encode('utf-8')
         try:
             user = User.query.filter_by(email=username).first()
-            if user and bcrypt.check_password_hash(user.user_password.encode('utf-8'), c_password):
-                user.user_password = bcrypt.generate_password_hash(
-                    n_password, app.config.get('BCRYPT_LOG_ROUNDS')
-                ).decode()
+            new_hash = password_hasher.change(user.user_password.encode('utf-8'), c_password,
+                                              n_password) if user else None
+            if new_hash:
+                user.user_password = new_hash
                 db.session.commit()
                 db.session.close()
                 responseObject = {
@@ -84,6 +97,8 @@ class UpdateUserPassword(MethodView):
                 return make_response(jsonify(responseObject)), 201
 
 
+        except PasswordPoolBusy:
+            return password_busy_response()
         except Exception as e:
             responseObject = {
                 'status': 'fail',
@@ -127,6 +142,8 @@ class RegisterAPI(MethodView):
                     'auth_token': auth_token.decode()
                 }
                 return make_response(jsonify(responseObject)), 201
+            except PasswordPoolBusy:
+                return password_busy_response()
             except Exception as e:
                 responseObject = {
                     'status': 'fail',
@@ -166,7 +183,11 @@ class LoginAPI(MethodView):
             user = User.query.filter_by(
                 email=post_data.get('email')
             ).first()
-            if user and bcrypt.check_password_hash(user.user_password, post_data.get('password')):
+            matches, rehashed = password_hasher.verify(user.user_password, post_data.get('password')) \
+                if user else (False, None)
+            if matches:
+                if rehashed:
+                    self.store_rehash(user, rehashed)
                 auth_token = user.encode_auth_token(user.user_id)
                 if auth_token:
                     responseObject = {
@@ -181,6 +202,8 @@ class LoginAPI(MethodView):
                     'message': 'User does not exist.'
                 }
                 return make_response(jsonify(responseObject)), 404
+        except PasswordPoolBusy:
+            return password_busy_response()
         except Exception as e:
             print(e)
             responseObject = {
@@ -189,6 +212,20 @@ class LoginAPI(MethodView):
             }
             return make_response(jsonify(responseObject)), 500
 
+    @staticmethod
+    def store_rehash(user, rehashed):
+        """
+        Stores the password hash made at the current BCRYPT_LOG_ROUNDS, the login goes on if it fails
+        """
+        # read before the rollback expires the user
+        user_id = user.user_id
+        try:
+            user.user_password = rehashed
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            get_logger_instance().error("Storing the rehashed password of user {} failed: {}".format(user_id, e))
+
 
 class UserAPI(MethodView):
     """
@@ -260,6 +297,8 @@ class LogoutAPI(MethodView):
                     # insert the token
                     db.session.add(blacklist_token)
                     db.session.commit()
+                    token_blacklist.add(auth_token)
+                    auth_tokens.discard(auth_token)
                     responseObject = {
                         'status': 'success',
                         'message': 'Successfully logged out.'
@@ -286,6 +325,13 @@ class LogoutAPI(MethodView):
 
 
 auth_blueprint = Blueprint('auth', __name__)
+
+
+@auth_blueprint.before_app_first_request
+def load_token_blacklist():
+    token_blacklist.reload()
+
+
 # define the API resources
 registration_view = RegisterAPI.as_view('register_api')
 login_view = LoginAPI.as_view('login_api')
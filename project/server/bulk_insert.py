@@ -0,0 +1,40 @@
+# project/server/bulk_insert.py
+
+from sqlalchemy import text
+
+from project.server import db
+
+
+def _auto_increment_step(connection):
+    """
+    @@auto_increment_increment of the connection, read once per pooled connection. Galera sets it
+    to the cluster size (wsrep_auto_increment_control), a plain server to 1.
+    """
+    info = connection.connection.info
+    if 'auto_increment_increment' not in info:
+        info['auto_increment_increment'] = int(connection.execute(
+            text('SELECT @@auto_increment_increment')).scalar())
+    return info['auto_increment_increment']
+
+
+def insert_rows(table, rows, session=None):
+    """
+    Inserts rows with one INSERT inside the session's transaction and returns their primary keys.
+    A single row takes the key the INSERT reports. A multi-row INSERT reserves all of its values in
+    one allocation, so its keys are spaced by @@auto_increment_increment from the first one on
+    MariaDB (cursor lastrowid) and consecutive up to the last one on SQLite.
+    :param table: Table with an autoincrement integer primary key
+    :param rows: non empty list of dicts with the same keys
+    :param session: db.session when None
+    :return: list of primary keys, in the order of rows
+    """
+    session = db.session if session is None else session
+    if len(rows) == 1:
+        return [session.execute(table.insert().values(rows[0])).inserted_primary_key[0]]
+    statement = table.insert().values(rows)
+    last_row_id = session.execute(statement).lastrowid
+    connection = session.connection(clause=statement)
+    if connection.dialect.name != 'mysql':
+        return list(range(last_row_id - len(rows) + 1, last_row_id + 1))
+    step = _auto_increment_step(connection)
+    return list(range(last_row_id, last_row_id + len(rows) * step, step))
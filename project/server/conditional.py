@@ -0,0 +1,33 @@
+# project/server/conditional.py
+
+import hashlib
+
+from flask import request, json
+
+from project.server import app
+
+
+def conditional_response(build_payload):
+    """
+    Returns the listing built by build_payload with a content hash ETag, or an empty 304 when
+    the request's If-None-Match already holds it. The listing is built on every request, so a
+    write handled by any gunicorn worker shows on the next GET.
+    :param build_payload: callable returning the responseObject dict
+    :return: (response, status)
+    """
+    body = json.dumps(build_payload())
+    return etag_response(body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+
+
+def etag_response(body, etag):
+    """
+    :param body: serialized JSON payload
+    :return: (response, 200) carrying body, or an empty (response, 304) when If-None-Match holds etag
+    """
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response, 304
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response, 200
@@ -14,7 +14,96 @@ class BaseConfig:
     SECRET_KEY = 'my_precious'
     DEBUG = False
     BCRYPT_LOG_ROUNDS = 13
+    # concurrent bcrypt hashes per host, hashes waiting up to PASSWORD_HASH_WAIT seconds for one
+    # before a 429, and the directory of the slot lock files (the temp directory when None)
+    PASSWORD_HASH_SLOTS = 2
+    PASSWORD_HASH_QUEUE = 1
+    PASSWORD_HASH_WAIT = 2
+    PASSWORD_HASH_LOCK_DIR = None
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # connections kept and opened beyond them per gunicorn worker, seconds a request waits for one,
+    # seconds before a connection is replaced (under the load balancer's idle cutoff) and a
+    # liveness check of every connection taken from the pool
+    SQLALCHEMY_POOL_SIZE = 5
+    SQLALCHEMY_MAX_OVERFLOW = 10
+    SQLALCHEMY_POOL_TIMEOUT = 10
+    SQLALCHEMY_POOL_RECYCLE = 280
+    SQLALCHEMY_POOL_PRE_PING = True
+    # replica URIs are added to SQLALCHEMY_BINDS and their keys listed in SQLALCHEMY_READ_BINDS; GETs of
+    # the listed read-only endpoints then read from a random replica, unless sent with X-Read-Primary
+    SQLALCHEMY_BINDS = {}
+    SQLALCHEMY_READ_BINDS = ()
+    SQLALCHEMY_REPLICA_ENDPOINTS = (
+        'oap.provision_view', 'oap.provision_search_view', 'oap.provision_export_view',
+        'oap_nickel.nickel_profile_view', 'oap_nickel.nickel_profile_project_mapping_view',
+        'oap_nickel.nickel_result_view', 'oap_nickel.nickel_result_summary_view'
+    )
+    # seconds before the in-memory active provision registry is reloaded from the database, seconds
+    # between reads of the rows other workers changed and how far back those reads reach
+    ACTIVE_PROVISION_REGISTRY_TTL = 300
+    ACTIVE_PROVISION_SYNC_INTERVAL = 1
+    ACTIVE_PROVISION_SYNC_OVERLAP = 5
+    # seconds an optional total returned with cursor pages is reused
+    PAGINATION_COUNT_TTL = 60
+    # largest per_page of a cursor paged provision listing
+    PROVISION_PAGE_MAX = 500
+    # rows fetched per query while streaming the provision history export
+    EXPORT_BATCH_SIZE = 1000
+    # largest list accepted by the bulk provision status PATCH
+    PROVISION_BULK_STATUS_MAX = 500
+    # most request ids one POST to /oap/provision_master may allocate
+    PROVISION_ID_BLOCK_MAX = 500
+    # most SUTs one POST to /oap/provision/submit may provision
+    PROVISION_SUBMIT_MAX = 500
+    # verified auth tokens kept per process, and seconds between reads of other workers' logouts:
+    # a token logged out on one worker is still accepted by the others for up to that long
+    AUTH_TOKEN_CACHE_SIZE = 10000
+    AUTH_BLACKLIST_REFRESH = 5
+    # ids below the highest one read that every refresh reads again: rows committed late by another
+    # writer or Galera node, with an id under one already seen, are still picked up
+    AUTH_BLACKLIST_ID_OVERLAP = 1000
+    # blacklist Bloom filter sizing, and seconds between deletes of expired blacklist rows
+    AUTH_BLACKLIST_BLOOM_CAPACITY = 1000000
+    AUTH_BLACKLIST_BLOOM_ERROR = 0.001
+    AUTH_BLACKLIST_PRUNE_INTERVAL = 3600
+    # keep-alive connections and (connect, read) timeouts in seconds for the IAM WS client,
+    # its access token is renewed this many seconds before it expires
+    IAMWS_POOL_SIZE = 10
+    IAMWS_CONNECT_TIMEOUT = 5
+    IAMWS_READ_TIMEOUT = 30
+    IAMWS_TOKEN_REFRESH_MARGIN = 60
+    # seconds IAM user data is reused per user token and membership results per user, memberships
+    # up to SSO_MEMBERSHIP_STALE_TTL old are served while refreshed in the background. Memberships
+    # grant admin rights, a removed member keeps them for SSO_MEMBERSHIP_STALE_TTL at most.
+    SSO_USER_DATA_TTL = 300
+    SSO_MEMBERSHIP_TTL = 60
+    SSO_MEMBERSHIP_STALE_TTL = 180
+    SSO_REFRESH_WORKERS = 2
+    # per stage resolution timings are always logged, and added to /authsso responses when True
+    SSO_RESPONSE_TIMINGS = False
+    # seconds before a worker reloads its Nickel profile cache to see other workers' writes
+    NICKEL_PROFILE_CACHE_TTL = 300
+    # largest per_page of a filtered Nickel profile listing
+    NICKEL_PROFILE_PAGE_MAX = 500
+    # largest list accepted by the Nickel execution POST, and rows per multi-row INSERT
+    NICKEL_EXECUTION_BULK_MAX = 10000
+    NICKEL_EXECUTION_INSERT_CHUNK = 1000
+    # largest per_page of a filtered Nickel result listing, and days a summary covers without since
+    NICKEL_RESULT_PAGE_MAX = 1000
+    NICKEL_RESULT_SUMMARY_DAYS = 30
+    MAIL_SERVER = 'ecsmtp.pdx.intel.com'
+    MAIL_PORT = 25
+    # deliver notification mails from the OAP_EMAIL_SPOOL table on background workers
+    MAIL_QUEUE_ENABLED = True
+    MAIL_QUEUE_WORKERS = 2
+    MAIL_QUEUE_POLL_INTERVAL = 30
+    MAIL_SMTP_TIMEOUT = 30
+    MAIL_SEND_LEASE = 300
+    MAIL_MAX_ATTEMPTS = 5
+    MAIL_RETRY_BACKOFF = 30
+    MAIL_RETRY_BACKOFF_MAX = 3600
+    # seconds status transitions of one request are collected into a single digest mail, 0 mails each one
+    MAIL_DIGEST_WINDOW = 120
 
 
 class DevelopmentConfig(BaseConfig):
@@ -0,0 +1,137 @@
+# project/server/db_pool.py
+
+import os
+import threading
+import time
+from collections import deque
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from project.server.db_routing import RoutingSession
+
+
+class PoolMetrics:
+    """
+    Checkout waits and connection churn of the pools of this process. The wait covers queueing
+    for a free connection and opening a new one, the two ways a request stalls on the pool.
+    """
+    samples = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=self.samples)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.fork_resets = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._waits.append(seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self, pool=None):
+        """
+        :param pool: engine pool whose current occupancy is added
+        """
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {'pid': os.getpid(), 'checkouts': self.checkouts, 'timeouts': self.timeouts,
+                     'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                     'wait_p95_ms': round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else 0,
+                     'wait_max_ms': round(self.wait_max * 1000, 3), 'connects': self.connects,
+                     'closes': self.closes, 'invalidations': self.invalidations, 'fork_resets': self.fork_resets}
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                         overflow=pool.overflow())
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """ QueuePool timing every checkout into pool_metrics """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super(MeteredQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+@event.listens_for(MeteredQueuePool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+    pool_metrics.count('connects')
+
+
+@event.listens_for(MeteredQueuePool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    # a connection opened before gunicorn forked this worker shares its socket with the master
+    # and the other workers, drop it without closing and let the pool open a fresh one
+    if connection_record.info.get('pid') != os.getpid():
+        pool_metrics.count('fork_resets')
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError('Connection record belongs to pid {}, attempting to check out in '
+                                     'pid {}'.format(connection_record.info.get('pid'), os.getpid()))
+
+
+@event.listens_for(MeteredQueuePool, 'close')
+def _on_close(dbapi_connection, connection_record):
+    pool_metrics.count('closes')
+
+
+@event.listens_for(MeteredQueuePool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.count('invalidations')
+
+
+def configure_pool(config, options, drivername):
+    """
+    Completes create_engine options with the metered pool and SQLALCHEMY_POOL_PRE_PING, keeping
+    the StaticPool of in-memory SQLite
+    :param options: create_engine keyword arguments, pool sizes already applied
+    :param drivername: drivername of the database URL
+    """
+    if options.get('poolclass') is StaticPool:
+        return options
+    if drivername.startswith('sqlite'):
+        # pooled SQLite connections move between threads, one thread at a time
+        options.setdefault('connect_args', {})['check_same_thread'] = False
+    options['poolclass'] = MeteredQueuePool
+    options['pool_pre_ping'] = config.get('SQLALCHEMY_POOL_PRE_PING', True)
+    return options
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """
+    SQLAlchemy extension whose engines use MeteredQueuePool with the SQLALCHEMY_POOL_* settings
+    for every database, SQLite files included, and check connections before handing them out.
+    Sessions are RoutingSession so read-only requests can be served by a replica bind.
+    """
+
+    def create_session(self, options):
+        return RoutingSession(self, **options)
+
+    def apply_driver_hacks(self, app, info, options):
+        super(PooledSQLAlchemy, self).apply_driver_hacks(app, info, options)
+        configure_pool(app.config, options, info.drivername)
@@ -0,0 +1,49 @@
+# project/server/db_routing.py
+
+import random
+
+from flask_sqlalchemy import SignallingSession, get_state
+from sqlalchemy.sql.dml import UpdateBase
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends the reads of a request to a replica bind once read_from() picked one.
+    Flushes, INSERT/UPDATE/DELETE statements and models with their own bind_key stay where
+    SignallingSession puts them, so an endpoint that writes still writes to the primary.
+    """
+
+    def __init__(self, db, **options):
+        self.read_bind = None
+        super(RoutingSession, self).__init__(db, **options)
+
+    def read_from(self, bind):
+        """
+        :param bind: key of SQLALCHEMY_BINDS serving the reads of this session, None for the primary
+        """
+        self.read_bind = bind
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.read_bind is None or self._flushing or isinstance(clause, UpdateBase):
+            return super(RoutingSession, self).get_bind(mapper, clause)
+        if mapper is not None and getattr(mapper.mapped_table, 'info', {}).get('bind_key') is not None:
+            return super(RoutingSession, self).get_bind(mapper, clause)
+        return get_state(self.app).db.get_engine(self.app, bind=self.read_bind)
+
+
+def route_reads(db, request, config):
+    """
+    before_request hook: GET and HEAD requests of SQLALCHEMY_REPLICA_ENDPOINTS read from a random
+    SQLALCHEMY_READ_BINDS replica, every other request and any request sent with X-Read-Primary
+    reads from the primary
+    :param db: PooledSQLAlchemy instance
+    :param request: current request
+    :param config: application config
+    """
+    binds = config.get('SQLALCHEMY_READ_BINDS') or ()
+    bind = None
+    if binds and request.method in ('GET', 'HEAD') and 'X-Read-Primary' not in request.headers \
+            and request.endpoint in (config.get('SQLALCHEMY_REPLICA_ENDPOINTS') or ()):
+        bind = random.choice(binds)
+    # the scoped session outlives the request when a test or job keeps the app context pushed
+    db.session().read_from(bind)
@@ -2,10 +2,13 @@
 
 import datetime
 import json
+from operator import attrgetter
 
 import jwt
 
-from project.server import app, db, bcrypt
+from project.server import app, db
+from project.server.auth.password_pool import password_hasher
+from project.server.auth.token_cache import auth_tokens, token_blacklist, token_hash
 
 
 class OAPUsersRole(db.Model):
@@ -26,6 +29,15 @@ class OAPUsersRole(db.Model):
 
 class NickelResult(db.Model):
     __tablename__ = "NICKEL_RESULT"
+    __table_args__ = (
+        db.Index('ix_nickel_result_create_at', 'create_At', 'trigger_id'),
+        db.Index('ix_nickel_result_profile_name', 'profile_name', 'create_At', 'trigger_id'),
+        db.Index('ix_nickel_result_sut', 'sut', 'create_At', 'trigger_id'),
+        db.Index('ix_nickel_result_controller', 'controller', 'create_At', 'trigger_id'),
+        db.Index('ix_nickel_result_tws_version', 'tws_version', 'create_At', 'trigger_id'),
+        db.Index('ix_nickel_result_status', 'result_status', 'create_At', 'trigger_id'),
+        db.Index('ux_nickel_result_idempotency_key', 'idempotency_key', unique=True),
+    )
     trigger_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     profile_name = db.Column(db.String(255))
     executor = db.Column(db.String(255))
@@ -36,6 +48,8 @@ class NickelResult(db.Model):
     result_link = db.Column(db.String(255))
     controller = db.Column(db.String(255))
     create_At = db.Column(db.DateTime)
+    # set by executors that may retry the POST, NULLs do not collide in the unique index
+    idempotency_key = db.Column(db.String(64))
 
     def __init__(self, **kwargs):
         self.trigger_id = kwargs.get('trigger_id')
@@ -48,6 +62,7 @@ class NickelResult(db.Model):
         self.result_link = kwargs.get('result_link')
         self.create_At = kwargs.get('create_At')
         self.controller = kwargs.get('controller')
+        self.idempotency_key = kwargs.get('idempotency_key')
 
 
 class NickelExecution(db.Model):
@@ -99,6 +114,12 @@ class NickelProjectProfile_Map(db.Model):
 
 class NickelProfile(db.Model):
     __tablename__ = "NICKEL_PROFILE"
+    __table_args__ = (
+        db.Index('ix_nickel_profile_owner', 'owner', 'profile_id'),
+        db.Index('ix_nickel_profile_group_name', 'group_name', 'profile_id'),
+        db.Index('ix_nickel_profile_controller', 'controller', 'profile_id'),
+        db.Index('ix_nickel_profile_tws_version', 'tws_version', 'profile_id'),
+    )
     profile_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     profile_name = db.Column(db.String(255))
     owner = db.Column(db.Integer, nullable=False)
@@ -133,15 +154,6 @@ class NickelProfile(db.Model):
     owner_name = db.Column(db.String(250))
     sx_cycling_count = db.Column(db.String(250))
     create_At = db.Column(db.DateTime)
-    ifwi_flash_method_list = db.Column(db.String(500))
-    execution_mode_list = db.Column(db.String(500))
-    execution_type_list = db.Column(db.String(500))
-    network_type_list = db.Column(db.String(500))
-    image_type_list = db.Column(db.String(500))
-    cycle_type_list = db.Column(db.String(500))
-    wake_mode_list = db.Column(db.String(500))
-    power_mode_list = db.Column(db.String(500))
-    tws_version_list = db.Column(db.String(500))
     System_Provisioning = db.Column(db.String(250))
     FirmwareSKU = db.Column(db.String(250))
     tws_version = db.Column(db.String(250))
@@ -188,15 +200,6 @@ class NickelProfile(db.Model):
         self.create_At = kwargs.get('create_At')
         self.sx_cycling_count = kwargs.get('sx_cycling_count')
 
-        self.ifwi_flash_method_list = kwargs.get('ifwi_flash_method_list')
-        self.execution_mode_list = kwargs.get('execution_mode_list')
-        self.execution_type_list = kwargs.get('execution_type_list')
-        self.network_type_list = kwargs.get('network_type_list')
-        self.image_type_list = kwargs.get('image_type_list')
-        self.cycle_type_list = kwargs.get('cycle_type_list')
-        self.wake_mode_list = kwargs.get('wake_mode_list')
-        self.power_mode_list = kwargs.get('power_mode_list')
-        self.tws_version_list = kwargs.get('tws_version_list')
         self.System_Provisioning = kwargs.get('System_Provisioning')
         self.FirmwareSKU = kwargs.get('FirmwareSKU')
         self.tws_version = kwargs.get('tws_version')
@@ -208,6 +211,85 @@ class NickelProfile(db.Model):
         self.jarvis_pwd = kwargs.get('jarvis_pwd')
 
 
+# (request/response key, option_kind, NickelProfile attribute holding the selected option)
+NICKEL_PROFILE_OPTION_KINDS = (
+    ('ifwi_flash_method_list', 'ifwi_flash_method', 'flashing_method'),
+    ('execution_mode_list', 'execution_mode', 'execution_mode'),
+    ('execution_type_list', 'execution_type', 'execution_type'),
+    ('network_type_list', 'network_type', 'network_type'),
+    ('image_type_list', 'image_type', 'imaging_type'),
+    ('cycle_type_list', 'cycle_type', 'sx_cycle_type'),
+    ('wake_mode_list', 'wake_mode', 'sx_wake_mode'),
+    ('power_mode_list', 'power_mode', 'power_mode'),
+    ('tws_version_list', 'tws_version', 'tws_version'),
+)
+
+
+class NickelProfileOption(db.Model):
+    """ One entry of a NickelProfile option list, in list order """
+    __tablename__ = "NICKEL_PROFILE_OPTION"
+    __table_args__ = (
+        db.Index('ix_nickel_profile_option_value', 'option_kind', 'value', 'profile_id'),
+    )
+    profile_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    option_kind = db.Column(db.String(32), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    value = db.Column(db.String(255), nullable=False)
+
+    @staticmethod
+    def parse(values):
+        """
+        :param values: list of options, or the legacy '#'-joined string
+        :return: list of options
+        """
+        if values is None:
+            return []
+        if isinstance(values, str):
+            return [value for value in values.split('#') if value]
+        return [str(value) for value in values]
+
+    @staticmethod
+    def replace(profile_id, options):
+        """
+        Replaces whole option lists of a profile, kinds missing from options are kept
+        :param options: dict of option_kind -> list of values
+        """
+        if not options:
+            return
+        NickelProfileOption.query.filter(NickelProfileOption.profile_id == profile_id,
+                                         NickelProfileOption.option_kind.in_(list(options))).delete(
+            synchronize_session=False)
+        db.session.bulk_insert_mappings(NickelProfileOption, [
+            {'profile_id': profile_id, 'option_kind': kind, 'position': position, 'value': value}
+            for kind, values in options.items() for position, value in enumerate(values)])
+
+    @staticmethod
+    def for_profiles(profile_ids=None, option_kinds=None):
+        """
+        :param profile_ids: profiles to read, None for all
+        :param option_kinds: option kinds to read, None for all
+        :return: dict of profile_id -> dict of option_kind -> list of values
+        """
+        query = NickelProfileOption.query.with_entities(
+            NickelProfileOption.profile_id, NickelProfileOption.option_kind, NickelProfileOption.value)
+        if profile_ids is not None:
+            query = query.filter(NickelProfileOption.profile_id.in_(list(profile_ids)))
+        if option_kinds is not None:
+            query = query.filter(NickelProfileOption.option_kind.in_(list(option_kinds)))
+        options = {}
+        for row in query.order_by(NickelProfileOption.profile_id, NickelProfileOption.option_kind,
+                                  NickelProfileOption.position):
+            options.setdefault(row.profile_id, {}).setdefault(row.option_kind, []).append(row.value)
+        return options
+
+    @staticmethod
+    def profiles_supporting(option_kind, value):
+        # served by ix_nickel_profile_option_value
+        return NickelProfileOption.query.filter(NickelProfileOption.option_kind == option_kind,
+                                                NickelProfileOption.value == value).with_entities(
+            NickelProfileOption.profile_id).distinct()
+
+
 class OapUserACL(db.Model):
     __tablename__ = "OAP_User_ACL"
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -302,6 +384,43 @@ class AlchemyEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
+class ModelSerializer:
+    """
+    Serializes instances of one model straight from its table columns,
+    the column list and attribute getter are resolved once per model
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = tuple(column.key for column in model.__table__.columns)
+        self._getter = attrgetter(*self.fields)
+
+    def to_dict(self, obj):
+        if obj is None:
+            return None
+        values = self._getter(obj)
+        if len(self.fields) == 1:
+            values = (values,)
+        return dict(zip(self.fields, values))
+
+    def to_list(self, objs):
+        return [self.to_dict(obj) for obj in objs]
+
+
+_serializers = {}
+
+
+def serializer_for(model):
+    """
+    :param model: db.Model subclass
+    :return: the shared ModelSerializer for the model
+    """
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers.setdefault(model, ModelSerializer(model))
+    return serializer
+
+
 class ManualProvisionMaster(db.Model):
     __tablename__ = "MANUAL_PROVISION_MASTER"
     global_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -311,8 +430,24 @@ class ManualProvisionMaster(db.Model):
         self.user_id = kwargs.get('user_id')
 
 
+# provision stage states that keep a SUT busy on its controller
+ACTIVE_PROVISION_STATES = ('In Progress', 'Blocked')
+
+
 class ManualProvision(db.Model):
     __tablename__ = "OAP_MANUAL_PROVISION"
+    __table_args__ = (
+        db.Index('ix_manual_provision_controller_active', 'controller', 'is_active'),
+        db.Index('ix_manual_provision_controller_ifwi', 'controller', 'is_ifwi'),
+        db.Index('ix_manual_provision_controller_bios', 'controller', 'is_bios'),
+        db.Index('ix_manual_provision_controller_os', 'controller', 'is_os'),
+        db.Index('ix_manual_provision_controller_e2e', 'controller', 'is_e2e'),
+        db.Index('ix_manual_provision_request_id', 'request_id', 'provision_id'),
+        db.Index('ix_manual_provision_external_id', 'external_id', 'provision_id'),
+        db.Index('ix_manual_provision_create_at', 'create_At', 'provision_id'),
+        db.Index('ix_manual_provision_updated_at', 'updated_At'),
+        db.Index('ft_manual_provision_search', 'external_id', 'controller', 'sut', mysql_prefix='FULLTEXT'),
+    )
     provision_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     controller = db.Column(db.String(255))
     sut = db.Column(db.String(255))
@@ -340,6 +475,9 @@ class ManualProvision(db.Model):
     e2e_tws_result = db.Column(db.String(256))
     wifi_name = db.Column(db.String(255))
     wifi_password = db.Column(db.String(45))
+    is_active = db.Column(db.Boolean, nullable=False, default=False)
+    # set by every INSERT and UPDATE, ORM or Core, other workers' registries sync from it
+    updated_At = db.Column(db.DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
 
     def __init__(self, **kwargs):
         self.controller = kwargs.get('controller')
@@ -368,6 +506,80 @@ class ManualProvision(db.Model):
         self.e2e_tws_result = kwargs.get('e2e_tws_result')
         self.wifi_name = kwargs.get('wifi_name')
         self.wifi_password = kwargs.get('wifi_password')
+        self.refresh_active_state()
+
+    @staticmethod
+    def active_state(statuses):
+        """
+        :param statuses: the stage statuses is_ifwi, is_bios, is_os and is_e2e of a row
+        :return: boolean is_active of the row
+        """
+        return any(status in ACTIVE_PROVISION_STATES for status in statuses)
+
+    def refresh_active_state(self):
+        """
+        Derives is_active from the stage statuses, call after changing any of them
+        :return: boolean
+        """
+        self.is_active = ManualProvision.active_state((self.is_ifwi, self.is_bios, self.is_os, self.is_e2e))
+        return self.is_active
+
+
+class EmailSpool(db.Model):
+    """ Outbound mail waiting for, or done with, delivery by the mail queue workers """
+    __tablename__ = "OAP_EMAIL_SPOOL"
+    __table_args__ = (
+        db.Index('ix_email_spool_due', 'status', 'next_attempt_At'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    sender = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.String(1000), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_At = db.Column(db.DateTime, nullable=False)
+    last_error = db.Column(db.String(500))
+    create_At = db.Column(db.DateTime)
+    sent_At = db.Column(db.DateTime)
+
+    def __init__(self, **kwargs):
+        self.sender = kwargs.get('sender')
+        self.recipients = kwargs.get('recipients')
+        self.message = kwargs.get('message')
+        self.status = 'queued'
+        self.attempts = 0
+        self.create_At = datetime.datetime.now()
+        self.next_attempt_At = self.create_At
+
+
+class EmailDigestItem(db.Model):
+    """ Provision status transition waiting to be mailed in its request's digest """
+    __tablename__ = "OAP_EMAIL_DIGEST_ITEM"
+    __table_args__ = (
+        db.Index('ix_email_digest_item_request', 'batch', 'request_id', 'create_At'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    request_id = db.Column(db.Integer)
+    to_list = db.Column(db.String(256))
+    user_fullname = db.Column(db.String(250))
+    sut = db.Column(db.String(255))
+    provision_type = db.Column(db.String(255))
+    provision_status = db.Column(db.String(255))
+    tws_link = db.Column(db.String(256))
+    batch = db.Column(db.String(32))
+    # a claim older than MAIL_SEND_LEASE belongs to a flush that died, the items are mailed again
+    claimed_At = db.Column(db.DateTime)
+    create_At = db.Column(db.DateTime)
+
+    def __init__(self, **kwargs):
+        self.request_id = kwargs.get('request_id')
+        self.to_list = kwargs.get('to_list')
+        self.user_fullname = kwargs.get('user_fullname')
+        self.sut = kwargs.get('sut')
+        self.provision_type = kwargs.get('provision_type')
+        self.provision_status = kwargs.get('provision_status')
+        self.tws_link = kwargs.get('tws_link')
+        self.create_At = datetime.datetime.now()
 
 
 class User(db.Model):
@@ -391,9 +603,7 @@ class User(db.Model):
         self.user_name = user_name
         self.user_group = user_group
         self.email = email
-        self.user_password = bcrypt.generate_password_hash(
-            user_password, app.config.get('BCRYPT_LOG_ROUNDS')
-        ).decode()
+        self.user_password = password_hasher.generate(user_password)
         self.create_At = datetime.datetime.now()
         self.first_name = first_name
         self.last_name = last_name
@@ -422,16 +632,21 @@ class User(db.Model):
     @staticmethod
     def decode_auth_token(auth_token):
         """
-        Decodes the auth token
+        Decodes the auth token, verified tokens are served from auth_tokens until they expire
         :param auth_token:
         :return: integer|string
         """
+        user_id = auth_tokens.get(auth_token)
+        if user_id is not None:
+            if auth_token in token_blacklist:
+                return 'Token blacklisted. Please log in again.'
+            return user_id
         try:
             payload = jwt.decode(auth_token, app.config.get('SECRET_KEY'))
-            is_blacklisted_token = BlacklistToken.check_blacklist(auth_token)
-            if is_blacklisted_token:
+            if auth_token in token_blacklist:
                 return 'Token blacklisted. Please log in again.'
             else:
+                auth_tokens.put(auth_token, payload['sub'], payload['exp'])
                 return payload['sub']
         except jwt.ExpiredSignatureError:
             return 'Signature expired. Please log in again.'
@@ -441,26 +656,51 @@ class User(db.Model):
 
 class BlacklistToken(db.Model):
     """
-    Token Model for storing JWT tokens
+    Token Model for storing the sha256 of logged out JWT tokens until they expire
     """
     __tablename__ = 'blacklist_tokens'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    token = db.Column(db.String(500), unique=True, nullable=False)
+    token_hash = db.Column(db.String(64), index=True, unique=True, nullable=False)
     blacklisted_on = db.Column(db.DateTime, nullable=False)
+    expires_At = db.Column(db.DateTime, index=True)
 
     def __init__(self, token):
-        self.token = token
+        self.token_hash = token_hash(token)
         self.blacklisted_on = datetime.datetime.now()
+        self.expires_At = BlacklistToken.token_expiry(token)
 
     def __repr__(self):
-        return '<id: token: {}'.format(self.token)
+        return '<id: token_hash: {}'.format(self.token_hash)
+
+    @staticmethod
+    def token_expiry(auth_token):
+        """
+        :return: the exp claim as a naive UTC datetime, None when the token has none
+        """
+        try:
+            payload = jwt.decode(auth_token, verify=False)
+            return datetime.datetime.utcfromtimestamp(payload['exp'])
+        except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+            return None
 
     @staticmethod
     def check_blacklist(auth_token):
         # check whether auth token has been blacklisted
-        res = BlacklistToken.query.filter_by(token=str(auth_token)).first()
+        res = BlacklistToken.query.filter_by(token_hash=token_hash(auth_token)).first()
         if res:
             return True
         else:
             return False
+
+    @staticmethod
+    def prune_expired():
+        """
+        Deletes the rows of tokens that jwt.decode rejects as expired anyway, in a transaction of its
+        own so the request that triggers it does not commit its pending changes
+        :return: number of rows deleted
+        """
+        table = BlacklistToken.__table__
+        with db.engine.begin() as connection:
+            return connection.execute(table.delete().where(
+                table.c.expires_At < datetime.datetime.utcnow())).rowcount
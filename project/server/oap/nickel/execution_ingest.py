@@ -0,0 +1,62 @@
+# project/server/oap/nickel/execution_ingest.py
+
+import datetime
+
+from project.server import app
+from project.server.bulk_insert import insert_rows
+from project.server.models import NickelExecution, NickelProfile
+
+EXECUTION_STRING_FIELDS = ('fanout_attr', 'fanout_value')
+
+
+def validate_executions(records):
+    """
+    :param records: list of dicts with profile_id, executor, fanout_attr and fanout_value
+    :return: (rows ready for NICKEL_EXECUTION, errors) where errors holds one
+        {'index', 'message'} per rejected record
+    """
+    rows = []
+    errors = []
+    now = datetime.datetime.now()
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({'index': index, 'message': 'record must be an object.'})
+            continue
+        try:
+            row = {'profile_id': int(record.get('profile_id')), 'executor': int(record.get('executor')),
+                   'create_At': now}
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'message': 'profile_id and executor must be numeric.'})
+            continue
+        for name in EXECUTION_STRING_FIELDS:
+            value = record.get(name)
+            if value is not None and (not isinstance(value, str) or len(value) > 255):
+                errors.append({'index': index, 'message': '{} must be a string of at most 255 characters.'.format(
+                    name)})
+                break
+            row[name] = value
+        else:
+            rows.append((index, row))
+    profile_ids = set(row['profile_id'] for _, row in rows)
+    if profile_ids:
+        known = set(profile.profile_id for profile in NickelProfile.query.filter(
+            NickelProfile.profile_id.in_(profile_ids)).with_entities(NickelProfile.profile_id))
+        for index, row in rows:
+            if row['profile_id'] not in known:
+                errors.append({'index': index, 'message': 'profile {} does not exist.'.format(row['profile_id'])})
+    errors.sort(key=lambda error: error['index'])
+    return [row for _, row in rows], errors
+
+
+def insert_executions(rows, session=None, chunk_size=None):
+    """
+    Inserts rows with one multi-row INSERT per NICKEL_EXECUTION_INSERT_CHUNK rows, inside the
+    session's transaction, each chunk's ids come from its INSERT, see insert_rows
+    :param session: db.session when None
+    :return: list of execution_id, in the order of rows
+    """
+    chunk_size = chunk_size or app.config.get('NICKEL_EXECUTION_INSERT_CHUNK', 1000)
+    execution_ids = []
+    for offset in range(0, len(rows), chunk_size):
+        execution_ids.extend(insert_rows(NickelExecution.__table__, rows[offset:offset + chunk_size], session))
+    return execution_ids
@@ -4,24 +4,40 @@ import datetime
 
 from flask import request, make_response, jsonify, Blueprint
 from flask.views import MethodView
-from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
-from project.server import db
-from project.server.models import NickelProfile, NickelProject, NickelProjectProfile_Map, NickelResult
+from project.server import app, db
+from project.server.conditional import conditional_response, etag_response
+from project.server.models import NickelProfile, NickelProject, NickelProjectProfile_Map, NickelResult, \
+    NickelProfileOption, NICKEL_PROFILE_OPTION_KINDS
+from project.server.oap.nickel.execution_ingest import validate_executions, insert_executions
+from project.server.oap.nickel.profile_cache import nickel_profiles
+from project.server.oap.nickel.profile_query import PROFILE_QUERY_ARGS, PROFILE_SECRET_FIELDS, profile_page
+from project.server.oap.nickel.result_query import RESULT_QUERY_ARGS, result_row, result_page, result_summary
+
+
+def _as_text(value):
+    # the request may send numbers for the string columns
+    return None if value is None else str(value)
 
 
 class NickelResultAPI(MethodView):
+    # fields a retry must repeat unchanged, result_status is left out as PATCH moves it on
+    idempotent_fields = ('profile_name', 'executor', 'owner_name', 'tws_version', 'sut', 'controller',
+                         'result_link')
+
     def patch(self):
         post_data = request.get_json()
         try:
             trigger_id = int(post_data.get('trigger_id'))
             status = post_data.get('status')
-            updated = db.session.query(NickelResult).filter(
-                text("trigger_id=:id")).params(
-                id=trigger_id).first()
-            if updated and updated.result_status != status:
-                updated.result_status = status
-                db.session.commit()
+            # one conditional UPDATE, rowcount tells whether the status changed
+            updated = NickelResult.query.filter(
+                NickelResult.trigger_id == trigger_id,
+                NickelResult.result_status.is_distinct_from(status)).update(
+                {NickelResult.result_status: status}, synchronize_session=False)
+            db.session.commit()
+            if updated:
                 responseObject = {
                     'status': 'success',
                     'message': 'Successfully Updated.',
@@ -39,6 +55,7 @@ class NickelResultAPI(MethodView):
                 return make_response(jsonify(responseObject)), 200
 
         except Exception as e:
+            db.session.rollback()
             responseObject = {
                 'status': 'fail',
                 'message': 'Unable to Update Result.'
@@ -46,7 +63,19 @@ class NickelResultAPI(MethodView):
             return make_response(jsonify(responseObject)), 500
 
     def post(self):
+        """
+        Records a result. A retry carrying the same Idempotency-Key header (or idempotency_key
+        field) as an earlier call returns that call's trigger_id instead of adding a row, a call
+        reusing the key for a different result is answered with 409.
+        """
         post_data = request.get_json()
+        idempotency_key = request.headers.get('Idempotency-Key') or post_data.get('idempotency_key')
+        if idempotency_key is not None and not 0 < len(str(idempotency_key)) <= 64:
+            responseObject = {
+                'status': 'fail',
+                'message': 'idempotency_key must be 1 to 64 characters.'
+            }
+            return make_response(jsonify(responseObject)), 400
         nickel_result = NickelResult(
             profile_name=post_data.get('profile_name'),
             executor=post_data.get('executor'),
@@ -56,6 +85,7 @@ class NickelResultAPI(MethodView):
             result_status=post_data.get('result_status'),
             controller=post_data.get('controller'),
             result_link=post_data.get('result_link'),
+            idempotency_key=str(idempotency_key) if idempotency_key is not None else None,
             create_At=datetime.datetime.now()
         )
         try:
@@ -63,10 +93,36 @@ class NickelResultAPI(MethodView):
             db.session.commit()
             responseObject = {
                 'status': 'success',
-                'message': 'Successfully Added Nickel Result.'
+                'message': 'Successfully Added Nickel Result.',
+                'trigger_id': nickel_result.trigger_id
             }
             return make_response(jsonify(responseObject)), 201
+        except IntegrityError as e:
+            # the unique idempotency key is taken, the first call already stored this result
+            db.session.rollback()
+            existing = NickelResult.query.filter_by(idempotency_key=nickel_result.idempotency_key).first() \
+                if nickel_result.idempotency_key is not None else None
+            if existing is None:
+                responseObject = {
+                    'status': 'Fail',
+                    'message': 'Error While Nickel Execution Result.'
+                }
+                return make_response(jsonify(responseObject)), 500
+            if any(_as_text(getattr(existing, name)) != _as_text(getattr(nickel_result, name))
+                   for name in self.idempotent_fields):
+                responseObject = {
+                    'status': 'fail',
+                    'message': 'idempotency_key was already used for a different result.'
+                }
+                return make_response(jsonify(responseObject)), 409
+            responseObject = {
+                'status': 'success',
+                'message': 'Nickel Result already added.',
+                'trigger_id': existing.trigger_id
+            }
+            return make_response(jsonify(responseObject)), 200
         except Exception as e:
+            db.session.rollback()
             responseObject = {
                 'status': 'Fail',
                 'message': 'Error While Nickel Execution Result.'
@@ -74,16 +130,30 @@ class NickelResultAPI(MethodView):
             return make_response(jsonify(responseObject)), 500
 
     def get(self):
+        """
+        The whole result history, or with any of RESULT_QUERY_ARGS one keyset page of the
+        matching results, newest first, e.g. ?sut=sut-01&status=FAIL&since=2026-10-01
+        """
         try:
+            if any(name in request.args for name in RESULT_QUERY_ARGS):
+                try:
+                    results, next_cursor = result_page(request.args)
+                except ValueError as e:
+                    responseObject = {
+                        'status': 'fail',
+                        'message': str(e)
+                    }
+                    return make_response(jsonify(responseObject)), 400
+                responseObject = {
+                    'status': 'success',
+                    'data': results,
+                    'next_cursor': next_cursor
+                }
+                return make_response(jsonify(responseObject)), 200
             projects = NickelResult.query.all()
             results = []
             for p in projects:
-                results.append(
-                    {'profile_name': p.profile_name, 'result_link': p.result_link, 'executor': p.executor,
-                     'owner_name': p.owner_name,'tws_version': p.tws_version,
-                     'sut': p.sut, 'result_status': p.result_status, 'controller': p.controller,
-                     'create_At': p.create_At,
-                     'trigger_id': p.trigger_id})
+                results.append(result_row(p))
             responseObject = {
                 'status': 'success',
                 'data': results
@@ -98,6 +168,33 @@ class NickelResultAPI(MethodView):
             return make_response(jsonify(responseObject)), 500
 
 
+class NickelResultSummaryAPI(MethodView):
+    def get(self):
+        """
+        PASS/FAIL counts per group_by dimensions (profile_name, sut, controller, tws_version, day),
+        taking the same filters as the result listing
+        """
+        try:
+            summary = result_summary(request.args)
+        except ValueError as e:
+            responseObject = {
+                'status': 'fail',
+                'message': str(e)
+            }
+            return make_response(jsonify(responseObject)), 400
+        except Exception as e:
+            responseObject = {
+                'status': 'fail',
+                'message': 'Unable to summarize results.'
+            }
+            return make_response(jsonify(responseObject)), 500
+        responseObject = {
+            'status': 'success',
+            'data': summary
+        }
+        return make_response(jsonify(responseObject)), 200
+
+
 class NickelProjectAPI(MethodView):
     def post(self):
         post_data = request.get_json()
@@ -129,18 +226,21 @@ class NickelProjectAPI(MethodView):
         }
         return make_response(jsonify(responseObject)), 200
 
+    @staticmethod
+    def listing():
+        projects = NickelProject.query.all()
+        results = []
+        for p in projects:
+            results.append({'project_id': p.project_id, 'project_name': p.project_name, 'creator': p.creator,
+                            'create_at': p.create_At})
+        return {
+            'status': 'success',
+            'data': results
+        }
+
     def get(self):
         try:
-            projects = NickelProject.query.all()
-            results = []
-            for p in projects:
-                results.append({'project_id': p.project_id, 'project_name': p.project_name, 'creator': p.creator,
-                                'create_at': p.create_At})
-            responseObject = {
-                'status': 'success',
-                'data': results
-            }
-            return make_response(jsonify(responseObject)), 200
+            return conditional_response(NickelProjectAPI.listing)
         except Exception as e:
             responseObject = {
                 'status': 'fail',
@@ -157,6 +257,7 @@ class NickelProjectAPI(MethodView):
             try:
                 project.delete()
                 db.session.commit()
+                nickel_profiles.invalidate_mappings()
                 responseObject = {
                     'status': 'success',
                     'message': 'project  delete success'
@@ -192,6 +293,7 @@ class NickelProjectProfileMapAPI(MethodView):
             try:
                 db.session.add(new_map)
                 db.session.commit()
+                nickel_profiles.invalidate_mappings()
                 responseObject = {
                     'status': 'success',
                     'message': 'Successfully Added Mapping.'
@@ -211,44 +313,7 @@ class NickelProjectProfileMapAPI(MethodView):
 
     def get(self):
         try:
-            results = []
-            for p, data, project in db.session.query(NickelProjectProfile_Map, NickelProfile, NickelProject).filter(
-                    NickelProjectProfile_Map.profile_id == NickelProfile.profile_id,
-                    NickelProjectProfile_Map.project_id == NickelProject.project_id).all():
-                results.append(
-                    {'profile_name': data.profile_name, 'profile_desc': data.profile_desc,
-                     'build_number': data.build_number, 'choco_source': data.choco_source,
-                     'share_path': data.share_path, 'share_uname': data.share_uname,
-                     'share_pwd': data.share_pwd, 'kit_name': data.kit_name, 'ifwi_bin': data.ifwi_bin,
-                     'wim_name': data.wim_name, 'flashing_method': data.flashing_method,
-                     'execution_mode': data.execution_mode, 'execution_type': data.execution_type,
-                     'network_type': data.network_type, 'imaging_type': data.imaging_type,
-                     'sx_cycle_type': data.sx_cycle_type, 'sx_continue_on_fail': data.sx_continue_on_fail,
-                     'sx_debug_arg': data.sx_debug_arg, 'sx_sleep_time': data.sx_sleep_time,
-                     'sx_wake_mode': data.sx_wake_mode, 'sx_wake_time': data.sx_wake_time,
-                     'ict_result_path': data.ict_result_path, 'tws_no_wait': data.tws_no_wait,
-                     'wrapper_fanout': data.wrapper_fanout, 'power_mode': data.power_mode,
-                     'isct_version': data.isct_version, 'execution_dir': data.execution_dir,
-                     'install_dir': data.install_dir, 'group_name': data.group_name,
-                     'owner_name': data.owner_name, 'wwid': data.owner, 'profile_id': data.profile_id,
-                     'create_at': data.create_At, 'sx_cycling_count': data.sx_cycling_count,
-                     'controller': data.controller, 'fanout_attr': data.fanout_attr,
-                     'wimager_version': data.wimager_version,
-                     'fanout_value': data.fanout_value, 'jarvis_pwd': data.jarvis_pwd,
-                     'ifwi_flash_method_list': data.ifwi_flash_method_list,
-                     'execution_mode_list': data.execution_mode_list,
-                     'execution_type_list': data.execution_type_list,
-                     'network_type_list': data.network_type_list,
-                     'image_type_list': data.image_type_list, 'cycle_type_list': data.cycle_type_list,
-                     'wake_mode_list': data.wake_mode_list, 'power_mode_list': data.power_mode_list,
-                     'tws_version_list': data.tws_version_list,
-                     'project_id': p.project_id, 'project_name': project.project_name})
-
-            responseObject = {
-                'status': 'success',
-                'data': results
-            }
-            return make_response(jsonify(responseObject)), 200
+            return etag_response(*nickel_profiles.mappings())
         except Exception as e:
             responseObject = {
                 'status': 'fail',
@@ -266,6 +331,7 @@ class NickelProjectProfileMapAPI(MethodView):
             try:
                 mapping.delete()
                 db.session.commit()
+                nickel_profiles.invalidate_mappings()
                 responseObject = {
                     'status': 'success',
                     'message': 'Mapping  delete success'
@@ -285,16 +351,6 @@ class NickelProjectProfileMapAPI(MethodView):
 
 
 class NickelProfileAPI(MethodView):
-    @staticmethod
-    def prepare_list_data(list_data):
-        res = None
-        for val in list_data:
-            if res is None:
-                res = val
-            else:
-                res = res + "#" + val
-        return res
-
     def post(self):
         post_data = request.get_json()
         operation_type = request.args['type']
@@ -333,86 +389,20 @@ class NickelProfileAPI(MethodView):
                                 jarvis_pwd=post_data.get('jarvis_pwd')
                                 )
         # list add
-        flash_method_list = post_data.get('ifwi_flash_method_list')
-        execution_mode_list = post_data.get('execution_mode_list')
-        execution_type_list = post_data.get('execution_type_list')
-        network_type_list = post_data.get('network_type_list')
-        image_type_list = post_data.get('image_type_list')
-        cycle_type_list = post_data.get('cycle_type_list')
-        wake_mode_list = post_data.get('wake_mode_list')
-        power_mode_list = post_data.get('power_mode_list')
-        tws_version_list = post_data.get('tws_version_list')
-        if flash_method_list is not None and len(flash_method_list) > 0:
-            if operation_type == 'new':
-                profile.flashing_method = flash_method_list[0]
-            else:
-                profile.flashing_method = post_data.get('flashing_method')
-            profile.ifwi_flash_method_list = NickelProfileAPI.prepare_list_data(
-                flash_method_list) if operation_type == 'new' else flash_method_list
-
-        if execution_mode_list is not None and len(execution_mode_list) > 0:
-            if operation_type == 'new':
-                profile.execution_mode = execution_mode_list[0]
-            else:
-                profile.execution_mode = post_data.get('execution_mode')
-
-            profile.execution_mode_list = NickelProfileAPI.prepare_list_data(
-                execution_mode_list) if operation_type == 'new' else execution_mode_list
-        if execution_type_list is not None and len(execution_type_list) > 0:
-            if operation_type == 'new':
-                profile.execution_type = execution_type_list[0]
-            else:
-                profile.execution_type = post_data.get('execution_type')
-            profile.execution_type_list = NickelProfileAPI.prepare_list_data(
-                execution_type_list) if operation_type == 'new' else execution_type_list
-        if network_type_list is not None and len(network_type_list) > 0:
-            if operation_type == 'new':
-                profile.network_type = network_type_list[0]
-            else:
-                profile.network_type = post_data.get('network_type')
-
-            profile.network_type_list = NickelProfileAPI.prepare_list_data(
-                network_type_list) if operation_type == 'new' else network_type_list
-        if image_type_list is not None and len(image_type_list) > 0:
-            if operation_type == 'new':
-                profile.imaging_type = image_type_list[0]
-            else:
-                profile.imaging_type = post_data.get('imaging_type')
-            profile.image_type_list = NickelProfileAPI.prepare_list_data(
-                image_type_list) if operation_type == 'new' else image_type_list
-        if cycle_type_list is not None and len(cycle_type_list) > 0:
-            if operation_type == 'new':
-                profile.sx_cycle_type = cycle_type_list[0]
-            else:
-                profile.sx_cycle_type = post_data.get('sx_cycle_type')
-            profile.cycle_type_list = NickelProfileAPI.prepare_list_data(
-                cycle_type_list) if operation_type == 'new' else cycle_type_list
-        if wake_mode_list is not None and len(wake_mode_list) > 0:
-            if operation_type == 'new':
-                profile.sx_wake_mode = wake_mode_list[0]
-            else:
-                profile.sx_wake_mode = post_data.get('sx_wake_mode')
-            profile.wake_mode_list = NickelProfileAPI.prepare_list_data(
-                wake_mode_list) if operation_type == 'new' else wake_mode_list
-        if power_mode_list is not None and len(power_mode_list) > 0:
-            if operation_type == 'new':
-                profile.power_mode = power_mode_list[0]
-            else:
-                profile.power_mode = post_data.get('power_mode')
-            profile.power_mode_list = NickelProfileAPI.prepare_list_data(
-                power_mode_list) if operation_type == 'new' else power_mode_list
-
-        if tws_version_list is not None and len(tws_version_list) > 0:
-            if operation_type == 'new':
-                profile.tws_version = tws_version_list[0]
-            else:
-                profile.tws_version = post_data.get('tws_version')
-            profile.tws_version_list = NickelProfileAPI.prepare_list_data(
-                tws_version_list) if operation_type == 'new' else tws_version_list
+        options = {}
+        for list_key, option_kind, selected_attribute in NICKEL_PROFILE_OPTION_KINDS:
+            values = NickelProfileOption.parse(post_data.get(list_key))
+            if len(values) > 0:
+                setattr(profile, selected_attribute,
+                        values[0] if operation_type == 'new' else post_data.get(selected_attribute))
+                options[option_kind] = values
 
         try:
             db.session.add(profile)
+            db.session.flush()
+            NickelProfileOption.replace(profile.profile_id, options)
             db.session.commit()
+            nickel_profiles.refresh(profile.profile_id)
             responseObject = {
                 'status': 'success',
                 'message': 'Successfully Added Profile.'
@@ -436,7 +426,6 @@ class NickelProfileAPI(MethodView):
             profile.choco_source = post_data.get('choco_source')
             profile.share_path = post_data.get('share_path')
             profile.share_uname = post_data.get('share_uname')
-            profile.share_pwd = post_data.get('share_pwd')
             profile.kit_name = post_data.get('kit_name')
             profile.ifwi_bin = post_data.get('ifwi_bin')
             # profile.flashing_method = post_data.get('flashing_method')
@@ -467,57 +456,23 @@ class NickelProfileAPI(MethodView):
             profile.fanout_attr = post_data.get('fanout_attr')
             profile.wimager_version = post_data.get('wimager_version')
             profile.fanout_value = post_data.get('fanout_value')
-            profile.jarvis_pwd = post_data.get('jarvis_pwd')
+            # the listings leave the secrets out, a profile read and PATCHed back keeps the stored ones
+            for key in PROFILE_SECRET_FIELDS:
+                if key in post_data:
+                    setattr(profile, key, post_data.get(key))
 
             # list add
-            flash_method_list = post_data.get('ifwi_flash_method_list')
-            execution_mode_list = post_data.get('execution_mode_list')
-            execution_type_list = post_data.get('execution_type_list')
-            network_type_list = post_data.get('network_type_list')
-            image_type_list = post_data.get('image_type_list')
-            cycle_type_list = post_data.get('cycle_type_list')
-            wake_mode_list = post_data.get('wake_mode_list')
-            power_mode_list = post_data.get('power_mode_list')
-            tws_version_list = post_data.get('tws_version_list')
-            if flash_method_list is not None and len(flash_method_list) > 0:
-                profile.flashing_method = flash_method_list[0]
-                profile.ifwi_flash_method_list = NickelProfileAPI.prepare_list_data(flash_method_list)
-
-            if execution_mode_list is not None and len(execution_mode_list) > 0:
-                profile.execution_mode = execution_mode_list[0]
-                profile.execution_mode_list = NickelProfileAPI.prepare_list_data(execution_mode_list)
-
-            if execution_type_list is not None and len(execution_type_list) > 0:
-                profile.execution_type = execution_type_list[0]
-                profile.execution_type_list = NickelProfileAPI.prepare_list_data(execution_type_list)
-
-            if network_type_list is not None and len(network_type_list) > 0:
-                profile.network_type = network_type_list[0]
-                profile.network_type_list = NickelProfileAPI.prepare_list_data(network_type_list)
-
-            if image_type_list is not None and len(image_type_list) > 0:
-                profile.imaging_type = image_type_list[0]
-                profile.image_type_list = NickelProfileAPI.prepare_list_data(image_type_list)
-
-            if cycle_type_list is not None and len(cycle_type_list) > 0:
-                profile.sx_cycle_type = cycle_type_list[0]
-                profile.cycle_type_list = NickelProfileAPI.prepare_list_data(cycle_type_list)
-
-            if wake_mode_list is not None and len(wake_mode_list) > 0:
-                profile.sx_wake_mode = wake_mode_list[0]
-                profile.wake_mode_list = NickelProfileAPI.prepare_list_data(wake_mode_list)
-
-            if power_mode_list is not None and len(power_mode_list) > 0:
-                profile.power_mode = power_mode_list[0]
-                profile.power_mode_list = NickelProfileAPI.prepare_list_data(power_mode_list)
-
-            if tws_version_list is not None and len(tws_version_list) > 0:
-                profile.tws_version = tws_version_list[0]
-                profile.tws_version_list = NickelProfileAPI.prepare_list_data(tws_version_list)
-
+            options = {}
+            for list_key, option_kind, selected_attribute in NICKEL_PROFILE_OPTION_KINDS:
+                values = NickelProfileOption.parse(post_data.get(list_key))
+                if len(values) > 0:
+                    setattr(profile, selected_attribute, values[0])
+                    options[option_kind] = values
 
             try:
+                NickelProfileOption.replace(profile.profile_id, options)
                 db.session.commit()
+                nickel_profiles.refresh(profile.profile_id)
                 responseObject = {
                     'status': 'success',
                     'message': 'Successfully Updated Profile.'
@@ -536,43 +491,25 @@ class NickelProfileAPI(MethodView):
         return make_response(jsonify(responseObject)), 200
 
     def get(self):
+        """
+        Every profile from the profile cache, or with any of PROFILE_QUERY_ARGS one keyset page
+        of the matching profiles, e.g. ?owner=11918760&fields=profile_id,profile_name&per_page=20
+        """
         try:
-            results = []
-            for data in db.session.query(NickelProfile).all():
-                results.append({'profile_name': data.profile_name, 'profile_desc': data.profile_desc,
-                                'build_number': data.build_number, 'choco_source': data.choco_source,
-                                'share_path': data.share_path, 'share_uname': data.share_uname,
-                                'share_pwd': data.share_pwd, 'kit_name': data.kit_name, 'ifwi_bin': data.ifwi_bin,
-                                'wim_name': data.wim_name, 'flashing_method': data.flashing_method,
-                                'execution_mode': data.execution_mode, 'execution_type': data.execution_type,
-                                'network_type': data.network_type, 'imaging_type': data.imaging_type,
-                                'sx_cycle_type': data.sx_cycle_type, 'sx_continue_on_fail': data.sx_continue_on_fail,
-                                'sx_debug_arg': data.sx_debug_arg, 'sx_sleep_time': data.sx_sleep_time,
-                                'sx_wake_mode': data.sx_wake_mode, 'sx_wake_time': data.sx_wake_time,
-                                'ict_result_path': data.ict_result_path, 'tws_no_wait': data.tws_no_wait,
-                                'wrapper_fanout': data.wrapper_fanout, 'power_mode': data.power_mode,
-                                'isct_version': data.isct_version, 'execution_dir': data.execution_dir,
-                                'install_dir': data.install_dir, 'group_name': data.group_name,
-                                'owner_name': data.owner_name, 'wwid': data.owner, 'profile_id': data.profile_id,
-                                'create_at': data.create_At, 'sx_cycling_count': data.sx_cycling_count,
-
-                                'ifwi_flash_method_list': data.ifwi_flash_method_list,
-                                'execution_mode_list': data.execution_mode_list,
-                                'execution_type_list': data.execution_type_list,
-                                'network_type_list': data.network_type_list,
-                                'image_type_list': data.image_type_list, 'cycle_type_list': data.cycle_type_list,
-                                'wake_mode_list': data.wake_mode_list, 'power_mode_list': data.power_mode_list,
-                                'tws_version_list': data.tws_version_list,
-                                'system_provisioning': data.System_Provisioning, 'firmware_sku': data.FirmwareSKU,
-                                'tws_version': data.tws_version,
-                                'controller': data.controller, 'fanout_attr': data.fanout_attr,
-                                'wimager_version': data.wimager_version,
-                                'fanout_value': data.fanout_value, 'jarvis_pwd': data.jarvis_pwd
-                                })
-            db.session.commit()
+            if not any(name in request.args for name in PROFILE_QUERY_ARGS):
+                return etag_response(*nickel_profiles.listing())
+            try:
+                profiles, next_cursor = profile_page(request.args)
+            except ValueError as e:
+                responseObject = {
+                    'status': 'fail',
+                    'message': str(e)
+                }
+                return make_response(jsonify(responseObject)), 400
             responseObject = {
                 'status': 'success',
-                'profiles': results
+                'profiles': profiles,
+                'next_cursor': next_cursor
             }
             return make_response(jsonify(responseObject)), 200
         except Exception as e:
@@ -587,7 +524,9 @@ class NickelProfileAPI(MethodView):
         profile_id = data['profile_id']
         try:
             NickelProfile.query.filter_by(profile_id=profile_id).delete()
+            NickelProfileOption.query.filter_by(profile_id=profile_id).delete()
             db.session.commit()
+            nickel_profiles.discard(profile_id)
             responseObject = {
                 'status': 'success',
                 'message': 'profile delete success',
@@ -602,21 +541,70 @@ class NickelProfileAPI(MethodView):
             return make_response(jsonify(responseObject)), 500
 
 
+class NickelProfileOptionAPI(MethodView):
+    def get(self):
+        """
+        Profiles whose option list of the given kind holds value, e.g. ?kind=wake_mode&value=S3
+        """
+        option_kind = request.args.get('kind', '')
+        value = request.args.get('value')
+        kinds = dict((list_key, kind) for list_key, kind, _ in NICKEL_PROFILE_OPTION_KINDS)
+        option_kind = kinds.get(option_kind, option_kind)
+        if option_kind not in kinds.values() or not value:
+            responseObject = {
+                'status': 'fail',
+                'message': 'kind must be one of {} and value is required.'.format(', '.join(sorted(kinds.values())))
+            }
+            return make_response(jsonify(responseObject)), 400
+        try:
+            profile_ids = [row.profile_id for row in NickelProfileOption.profiles_supporting(option_kind, value)]
+            return etag_response(*nickel_profiles.listing(profile_ids))
+        except Exception as e:
+            responseObject = {
+                'status': 'fail',
+                'message': 'Error while Profile fetch'
+            }
+            return make_response(jsonify(responseObject)), 500
+
+
 class NickelExecution(MethodView):
     def post(self):
+        """
+        Records a list of executions, given as the body or as its 'executions' key, all or none
+        :return: execution_ids in the order of the records, or the errors of rejected records
+        """
         post_data = request.get_json()
+        records = post_data.get('executions') if isinstance(post_data, dict) else post_data
+        if not isinstance(records, list) or not records or \
+                len(records) > app.config.get('NICKEL_EXECUTION_BULK_MAX', 10000):
+            responseObject = {
+                'status': 'fail',
+                'message': 'executions must be a list of 1 to {} records.'.format(
+                    app.config.get('NICKEL_EXECUTION_BULK_MAX', 10000))
+            }
+            return make_response(jsonify(responseObject)), 400
         try:
-            db.session.add_all(post_data)
+            rows, errors = validate_executions(records)
+            if errors:
+                responseObject = {
+                    'status': 'fail',
+                    'message': '{} of {} executions are invalid.'.format(len(errors), len(records)),
+                    'errors': errors
+                }
+                return make_response(jsonify(responseObject)), 400
+            execution_ids = insert_executions(rows)
             db.session.commit()
             responseObject = {
                 'status': 'success',
-                'message': 'Successfully Added Nickel Execution.'
+                'message': 'Successfully Added Nickel Execution.',
+                'execution_ids': execution_ids
             }
             return make_response(jsonify(responseObject)), 201
-        except:
+        except Exception as e:
+            db.session.rollback()
             responseObject = {
                 'status': 'Fail',
-                'message': 'Could not save your profile.'
+                'message': 'Could not save the executions.'
             }
             return make_response(jsonify(responseObject)), 500
 
@@ -624,9 +612,11 @@ class NickelExecution(MethodView):
 oap_nickel_blueprint = Blueprint('oap_nickel', __name__)
 nickel_project_view = NickelProjectAPI.as_view('nickel_project_view')
 nickel_profile_view = NickelProfileAPI.as_view('nickel_profile_view')
+nickel_profile_option_view = NickelProfileOptionAPI.as_view('nickel_profile_option_view')
 nickel_profile_project_mapping_view = NickelProjectProfileMapAPI.as_view('nickel_profile_project_mapping_view')
 nickel_execution_view = NickelExecution.as_view('nickel_execution_view')
 nickel_result_view = NickelResultAPI.as_view('nickel_result_view')
+nickel_result_summary_view = NickelResultSummaryAPI.as_view('nickel_result_summary_view')
 oap_nickel_blueprint.add_url_rule(
     '/oap/nic/project',
     view_func=nickel_project_view,
@@ -642,6 +632,11 @@ oap_nickel_blueprint.add_url_rule(
     view_func=nickel_profile_view,
     methods=['GET', 'POST', 'PATCH', 'DELETE']
 )
+oap_nickel_blueprint.add_url_rule(
+    '/oap/nic/profile/options',
+    view_func=nickel_profile_option_view,
+    methods=['GET']
+)
 oap_nickel_blueprint.add_url_rule(
     '/oap/nic/execution',
     view_func=nickel_execution_view,
@@ -652,3 +647,8 @@ oap_nickel_blueprint.add_url_rule(
     view_func=nickel_result_view,
     methods=['GET', 'POST', 'PATCH']
 )
+oap_nickel_blueprint.add_url_rule(
+    '/oap/nic/result/summary',
+    view_func=nickel_result_summary_view,
+    methods=['GET']
+)
@@ -0,0 +1,193 @@
+# project/server/oap/nickel/profile_cache.py
+
+import hashlib
+import threading
+import time
+
+from flask import json
+
+from project.server import app, db
+from project.server.models import NickelProfile, NickelProject, NickelProjectProfile_Map, NickelProfileOption, \
+    NICKEL_PROFILE_OPTION_KINDS
+from project.server.oap.nickel.profile_query import PROFILE_COLUMNS, PROFILE_SECRET_FIELDS
+
+
+def profile_row(data):
+    """
+    :param data: NickelProfile
+    :return: dict of every PROFILE_COLUMNS key but the secrets, which the cached listings never carry
+    """
+    return dict((key, getattr(data, column.key)) for key, column in PROFILE_COLUMNS.items()
+                if key not in PROFILE_SECRET_FIELDS)
+
+
+# profile_row keys the project-profile map listing leaves out
+PROFILE_MAP_EXCLUDED = ('system_provisioning', 'firmware_sku', 'tws_version')
+
+
+def profile_map_row(row):
+    """
+    :param row: dict from profile_row
+    :return: the row as the project-profile map listing serves it
+    """
+    return dict((key, value) for key, value in row.items() if key not in PROFILE_MAP_EXCLUDED)
+
+
+def option_lists(options):
+    """
+    :param options: dict of option_kind -> list of values of one profile
+    :return: the '#'-joined *_list fields the Nickel UI reads, None for an empty list
+    """
+    return dict((list_key, '#'.join(options[option_kind]) if options.get(option_kind) else None)
+                for list_key, option_kind, _ in NICKEL_PROFILE_OPTION_KINDS)
+
+
+def _payload(key, fragments):
+    body = '{"' + key + '": [' + ', '.join(fragments) + '], "status": "success"}'
+    return body, hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+class NickelProfileCache:
+    """
+    Serialized NickelProfile rows keyed by profile_id, plus the assembled GET payloads of
+    /oap/nic/profile and /oap/nic/project-profile-map. Profile writes handled by this worker
+    refresh the single row at once, other workers' writes show up after the next full reload,
+    NICKEL_PROFILE_CACHE_TTL seconds at most.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = None
+        self._loaded_at = None
+        self._generation = 0
+        self._listing = None
+        self._mappings = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _fragments(profile, options):
+        row = profile_row(profile)
+        row.update(option_lists(options))
+        # the map payload serializes the map row once per mapping, with its project added
+        return json.dumps(row), profile_map_row(row)
+
+    def _is_stale(self):
+        return self._profiles is None or \
+            time.monotonic() - self._loaded_at > app.config.get('NICKEL_PROFILE_CACHE_TTL', 300)
+
+    def _read(self):
+        """
+        :return: dict of profile_id -> (listing json, map row) of every profile in the database
+        """
+        options = NickelProfileOption.for_profiles()
+        return dict((profile.profile_id, self._fragments(profile, options.get(profile.profile_id, {})))
+                    for profile in NickelProfile.query.order_by(NickelProfile.profile_id))
+
+    def reload(self):
+        """
+        Reads every profile from the database
+        """
+        with self._lock:
+            generation = self._generation
+        profiles = self._read()
+        with self._lock:
+            if generation == self._generation:
+                self._profiles = profiles
+                self._loaded_at = time.monotonic()
+                self._listing = self._mappings = None
+                self._generation += 1
+
+    def refresh(self, profile_id):
+        """
+        Re-reads one profile after it was added or changed, call after the commit
+        """
+        profile = NickelProfile.query.get(profile_id)
+        fragments = None
+        if profile is not None:
+            fragments = self._fragments(profile, NickelProfileOption.for_profiles([profile_id]).get(profile_id, {}))
+        with self._lock:
+            self._generation += 1
+            self._listing = self._mappings = None
+            if self._profiles is not None:
+                if fragments is None:
+                    self._profiles.pop(profile_id, None)
+                else:
+                    self._profiles[profile_id] = fragments
+
+    def discard(self, profile_id):
+        with self._lock:
+            self._generation += 1
+            self._listing = self._mappings = None
+            if self._profiles is not None:
+                self._profiles.pop(int(profile_id), None)
+
+    def invalidate_mappings(self):
+        """
+        Drops the project-profile map payload after a mapping or project change
+        """
+        with self._lock:
+            self._generation += 1
+            self._mappings = None
+
+    def _current(self, name):
+        # a write landing during the reload discards it, read again
+        for _ in range(3):
+            if not self._is_stale():
+                break
+            self.reload()
+        with self._lock:
+            payload = getattr(self, name) if name is not None else None
+            if payload is not None:
+                self.hits += 1
+                return payload, self._generation, None
+            self.misses += 1
+            if self._profiles is not None:
+                return None, self._generation, dict(self._profiles)
+        # every first load was overtaken by a write, serve this request from its own read, uncached
+        return None, None, self._read()
+
+    def _store(self, name, generation, payload):
+        with self._lock:
+            if generation == self._generation:
+                setattr(self, name, payload)
+
+    def listing(self, profile_ids=None):
+        """
+        :param profile_ids: only list these profiles, None for all of them
+        :return: (body, etag) of the profile listing
+        """
+        if profile_ids is not None:
+            _, _, profiles = self._current(None)
+            return _payload('profiles', [profiles[profile_id][0] for profile_id in sorted(profile_ids)
+                                         if profile_id in profiles])
+        payload, generation, profiles = self._current('_listing')
+        if payload is None:
+            payload = _payload('profiles', [profiles[profile_id][0] for profile_id in sorted(profiles)])
+            self._store('_listing', generation, payload)
+        return payload
+
+    def mappings(self):
+        """
+        :return: (body, etag) of the project-profile map listing
+        """
+        payload, generation, profiles = self._current('_mappings')
+        if payload is None:
+            rows = db.session.query(NickelProjectProfile_Map.project_id, NickelProjectProfile_Map.profile_id,
+                                    NickelProject.project_name).filter(
+                NickelProjectProfile_Map.project_id == NickelProject.project_id).order_by(
+                NickelProjectProfile_Map.project_id, NickelProjectProfile_Map.profile_id)
+            fragments = [json.dumps(dict(profiles[row.profile_id][1], project_id=row.project_id,
+                                         project_name=row.project_name))
+                         for row in rows if row.profile_id in profiles]
+            payload = _payload('data', fragments)
+            self._store('_mappings', generation, payload)
+        return payload
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'profiles': len(self._profiles) if self._profiles is not None else 0}
+
+
+nickel_profiles = NickelProfileCache()
@@ -0,0 +1,102 @@
+# project/server/oap/nickel/profile_query.py
+
+from project.server import app, db
+from project.server.models import NickelProfile, NickelProjectProfile_Map, NickelProfileOption, \
+    NICKEL_PROFILE_OPTION_KINDS
+from project.server.pagination import keyset_page
+
+# listing key -> NickelProfile attribute, the keys profile_row serializes
+PROFILE_COLUMNS = dict((key, getattr(NickelProfile, attribute)) for key, attribute in (
+    ('profile_id', 'profile_id'), ('profile_name', 'profile_name'), ('profile_desc', 'profile_desc'),
+    ('build_number', 'build_number'), ('choco_source', 'choco_source'), ('share_path', 'share_path'),
+    ('share_uname', 'share_uname'), ('share_pwd', 'share_pwd'), ('kit_name', 'kit_name'),
+    ('ifwi_bin', 'ifwi_bin'), ('wim_name', 'wim_name'), ('flashing_method', 'flashing_method'),
+    ('execution_mode', 'execution_mode'), ('execution_type', 'execution_type'),
+    ('network_type', 'network_type'), ('imaging_type', 'imaging_type'), ('sx_cycle_type', 'sx_cycle_type'),
+    ('sx_continue_on_fail', 'sx_continue_on_fail'), ('sx_debug_arg', 'sx_debug_arg'),
+    ('sx_sleep_time', 'sx_sleep_time'), ('sx_wake_mode', 'sx_wake_mode'), ('sx_wake_time', 'sx_wake_time'),
+    ('ict_result_path', 'ict_result_path'), ('tws_no_wait', 'tws_no_wait'),
+    ('wrapper_fanout', 'wrapper_fanout'), ('power_mode', 'power_mode'), ('isct_version', 'isct_version'),
+    ('execution_dir', 'execution_dir'), ('install_dir', 'install_dir'), ('group_name', 'group_name'),
+    ('owner_name', 'owner_name'), ('wwid', 'owner'), ('create_at', 'create_At'),
+    ('sx_cycling_count', 'sx_cycling_count'), ('system_provisioning', 'System_Provisioning'),
+    ('firmware_sku', 'FirmwareSKU'), ('tws_version', 'tws_version'), ('controller', 'controller'),
+    ('fanout_attr', 'fanout_attr'), ('wimager_version', 'wimager_version'), ('fanout_value', 'fanout_value'),
+    ('jarvis_pwd', 'jarvis_pwd')))
+# *_list key -> option_kind, read from NICKEL_PROFILE_OPTION
+PROFILE_OPTION_FIELDS = dict((list_key, option_kind) for list_key, option_kind, _ in NICKEL_PROFILE_OPTION_KINDS)
+# only returned by a filtered listing when fields= asks for them
+PROFILE_SECRET_FIELDS = ('share_pwd', 'jarvis_pwd')
+# query arguments that select the SQL listing instead of the cached full one
+PROFILE_QUERY_ARGS = ('owner', 'group_name', 'controller', 'tws_version', 'project', 'fields', 'cursor',
+                      'per_page', 'order')
+
+
+def profile_fields(fields):
+    """
+    :param fields: comma separated listing keys, empty for every key but the secrets
+    :return: list of listing keys
+    :raises ValueError: on an unknown key
+    """
+    if not fields:
+        return [key for key in list(PROFILE_COLUMNS) + list(PROFILE_OPTION_FIELDS) if key not in PROFILE_SECRET_FIELDS]
+    keys = [key.strip() for key in fields.split(',') if key.strip()]
+    unknown = [key for key in keys if key not in PROFILE_COLUMNS and key not in PROFILE_OPTION_FIELDS]
+    if unknown:
+        raise ValueError('Unknown fields: {}.'.format(', '.join(unknown)))
+    return keys
+
+
+def profile_query_filter(query, args):
+    """
+    Applies the owner, group_name, controller, tws_version and project (project_id) filters of args
+    :raises ValueError: on a non numeric owner or project
+    """
+    for name in ('group_name', 'controller', 'tws_version'):
+        if args.get(name):
+            query = query.filter(PROFILE_COLUMNS[name] == args.get(name))
+    try:
+        if args.get('owner'):
+            query = query.filter(NickelProfile.owner == int(args.get('owner')))
+        if args.get('project'):
+            # served by the (project_id, profile_id) primary key of the mapping table
+            query = query.join(NickelProjectProfile_Map, NickelProjectProfile_Map.profile_id ==
+                               NickelProfile.profile_id).filter(
+                NickelProjectProfile_Map.project_id == int(args.get('project')))
+    except ValueError:
+        raise ValueError('owner and project must be numeric.')
+    return query
+
+
+def profile_page(args):
+    """
+    One keyset page of the filtered profile listing, ordered by profile_id and selecting only
+    the columns behind the requested fields
+    :param args: request arguments, see PROFILE_QUERY_ARGS
+    :return: (rows as dicts, next_cursor)
+    :raises ValueError: on invalid arguments or cursor
+    """
+    keys = profile_fields(args.get('fields'))
+    columns = [PROFILE_COLUMNS[key].label(key) for key in keys if key in PROFILE_COLUMNS and key != 'profile_id']
+    try:
+        per_page = min(int(args.get('per_page', 50)), app.config.get('NICKEL_PROFILE_PAGE_MAX', 500))
+    except ValueError:
+        raise ValueError('per_page must be numeric.')
+    query = profile_query_filter(db.session.query(NickelProfile.profile_id, *columns), args)
+    rows, next_cursor = keyset_page(query, NickelProfile.profile_id, NickelProfile.profile_id, max(per_page, 1),
+                                    args.get('cursor'), descending=args.get('order') == 'desc')
+    option_keys = [key for key in keys if key in PROFILE_OPTION_FIELDS]
+    options = {}
+    if option_keys and rows:
+        options = NickelProfileOption.for_profiles([row.profile_id for row in rows],
+                                                   [PROFILE_OPTION_FIELDS[key] for key in option_keys])
+    profiles = []
+    for row in rows:
+        profile = row._asdict()
+        if 'profile_id' not in keys:
+            del profile['profile_id']
+        for key in option_keys:
+            values = options.get(row.profile_id, {}).get(PROFILE_OPTION_FIELDS[key])
+            profile[key] = '#'.join(values) if values else None
+        profiles.append(profile)
+    return profiles, next_cursor
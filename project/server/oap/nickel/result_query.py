@@ -0,0 +1,106 @@
+# project/server/oap/nickel/result_query.py
+
+import datetime
+
+from sqlalchemy import func, case
+
+from project.server import app, db
+from project.server.models import NickelResult
+from project.server.pagination import keyset_page
+
+# query argument -> filtered column, each leads one of the NICKEL_RESULT indexes
+RESULT_FILTERS = {
+    'profile_name': NickelResult.profile_name,
+    'sut': NickelResult.sut,
+    'controller': NickelResult.controller,
+    'tws_version': NickelResult.tws_version,
+    'status': NickelResult.result_status,
+}
+# query arguments that select the paged listing instead of the full history
+RESULT_QUERY_ARGS = tuple(RESULT_FILTERS) + ('since', 'until', 'cursor', 'per_page')
+# summary dimensions, day buckets create_At by calendar date
+RESULT_SUMMARY_DIMENSIONS = {
+    'profile_name': NickelResult.profile_name,
+    'sut': NickelResult.sut,
+    'controller': NickelResult.controller,
+    'tws_version': NickelResult.tws_version,
+    'day': func.date(NickelResult.create_At),
+}
+
+
+def result_row(p):
+    return {'profile_name': p.profile_name, 'result_link': p.result_link, 'executor': p.executor,
+            'owner_name': p.owner_name, 'tws_version': p.tws_version,
+            'sut': p.sut, 'result_status': p.result_status, 'controller': p.controller,
+            'create_At': p.create_At,
+            'trigger_id': p.trigger_id}
+
+
+def _moment(value, name):
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('{} must be an ISO 8601 date or time.'.format(name))
+
+
+def result_filter(query, args, since=None):
+    """
+    Applies the column filters and the since/until create_At window of args
+    :param since: lower bound used when args has no since
+    :raises ValueError: on a malformed since or until
+    """
+    for name, column in RESULT_FILTERS.items():
+        if args.get(name):
+            query = query.filter(column == args.get(name))
+    since = _moment(args.get('since'), 'since') if args.get('since') else since
+    if since is not None:
+        query = query.filter(NickelResult.create_At >= since)
+    if args.get('until'):
+        query = query.filter(NickelResult.create_At < _moment(args.get('until'), 'until'))
+    return query
+
+
+def result_page(args):
+    """
+    One keyset page of the filtered result history, newest first
+    :return: (rows as dicts, next_cursor)
+    :raises ValueError: on invalid arguments or cursor
+    """
+    try:
+        per_page = min(int(args.get('per_page', 100)), app.config.get('NICKEL_RESULT_PAGE_MAX', 1000))
+    except ValueError:
+        raise ValueError('per_page must be numeric.')
+    items, next_cursor = keyset_page(result_filter(NickelResult.query, args), NickelResult.create_At,
+                                     NickelResult.trigger_id, max(per_page, 1), args.get('cursor'))
+    return [result_row(p) for p in items], next_cursor
+
+
+def result_summary(args):
+    """
+    PASS/FAIL counts of the filtered results grouped by the group_by dimensions, by default
+    profile_name, sut and day over the last NICKEL_RESULT_SUMMARY_DAYS days
+    :return: list of dicts with the dimensions plus total, pass, fail and other
+    :raises ValueError: on an unknown dimension or invalid arguments
+    """
+    dimensions = [name.strip() for name in (args.get('group_by') or 'profile_name,sut,day').split(',')
+                  if name.strip()]
+    unknown = [name for name in dimensions if name not in RESULT_SUMMARY_DIMENSIONS]
+    if unknown or not dimensions:
+        raise ValueError('group_by must be a list of {}.'.format(', '.join(sorted(RESULT_SUMMARY_DIMENSIONS))))
+    since = datetime.datetime.now() - datetime.timedelta(days=app.config.get('NICKEL_RESULT_SUMMARY_DAYS', 30))
+    groups = [RESULT_SUMMARY_DIMENSIONS[name].label(name) for name in dimensions]
+    query = db.session.query(
+        *groups,
+        func.count(NickelResult.trigger_id).label('total'),
+        func.sum(case([(NickelResult.result_status == 'PASS', 1)], else_=0)).label('passed'),
+        func.sum(case([(NickelResult.result_status == 'FAIL', 1)], else_=0)).label('failed'))
+    query = result_filter(query, args, since).group_by(*groups).order_by(*groups)
+    summary = []
+    for row in query:
+        entry = dict((name, getattr(row, name)) for name in dimensions)
+        if isinstance(entry.get('day'), datetime.date):
+            entry['day'] = entry['day'].isoformat()
+        entry['total'], entry['pass'], entry['fail'] = int(row.total), int(row.passed or 0), int(row.failed or 0)
+        entry['other'] = entry['total'] - entry['pass'] - entry['fail']
+        summary.append(entry)
+    return summary
@@ -1,15 +1,78 @@
 # project/server/oap/opaviews.py
 
-import json
+import csv
+import io
 
-from flask import Blueprint, request, make_response, jsonify
+from flask import Blueprint, request, make_response, jsonify, json, Response, stream_with_context
 from flask.views import MethodView
-from sqlalchemy import text
 
+from project.logger.logger_util import get_logger_instance
 from project.notification.oap_email_notofier import EmailNotifier
-from project.server import db
+from project.server import app, db
 from project.server.apputil import AppUtil
-from project.server.models import Controller, AlchemyEncoder, Platform, ManualProvisionMaster, ManualProvision, User
+from project.server.conditional import conditional_response
+from project.server.db_pool import pool_metrics
+from project.server.pagination import keyset_page, count_cache
+from project.server.models import Controller, Platform, ManualProvisionMaster, ManualProvision, User, serializer_for
+from project.server.oap.provision_registry import ActiveProvisionRegistry, active_provisions
+from project.server.oap.provision_search import provision_search_filter
+from project.server.oap.provision_status import PROVISION_STAGES, stage_update_guard, apply_status_updates
+from project.server.oap.provision_submit import validate_submission, submit_provisions
+from project.server.oap.request_ids import allocate_request_ids
+
+
+def provision_result_row(m):
+    return {'provision_id': m.provision_id, 'controller': m.controller, 'sut': m.sut, 'is_ifwi': m.is_ifwi,
+            'tws_result_ifwi': m.tws_result_ifwi, 'is_bios': m.is_bios,
+            'tws_result_bios': m.tws_result_bios,
+            'is_os': m.is_os, 'tws_result_os': m.tws_result_os, 'request_id': m.request_id,
+            'user_id': m.user_id,
+            'create_At': m.create_At, 'location_type': m.location_type, 'wwid': m.wwid,
+            'external_id': m.external_id, 'email': m.email,
+            'kit_name': m.kit, 'ifwi_bin': m.ifwi,
+            'wifi_name': m.wifi_name,
+            'wifi_password': m.wifi_password,
+            'share_path': m.share_path,
+            'share_uid': m.share_uid,
+            'share_pwd': m.share_pwd,
+            'wim_name': m.wim_name, 'bios_file': m.bios_file, 'e2e_tws_result': m.e2e_tws_result,
+            'is_e2e': m.is_e2e}
+
+
+PROVISION_CURSOR_SORTS = {
+    'request_id': ManualProvision.request_id,
+    'external_id': ManualProvision.external_id,
+    'create_At': ManualProvision.create_At
+}
+
+
+def provision_cursor_page(query, sort_name, sort_order, per_page, cursor, with_total, count_key):
+    """
+    Keyset paged provision listing, cost does not grow with the page depth
+    :param count_key: cache key for the optional total, identifies the filters applied to query
+    """
+    sort_column = PROVISION_CURSOR_SORTS.get(sort_name, ManualProvision.request_id)
+    try:
+        try:
+            per_page = min(int(per_page or 10), app.config.get('PROVISION_PAGE_MAX', 500))
+        except (TypeError, ValueError):
+            raise ValueError('per_page must be numeric.')
+        items, next_cursor = keyset_page(query, sort_column, ManualProvision.provision_id, max(per_page, 1),
+                                         cursor, descending=sort_order != 'asc')
+    except ValueError as e:
+        responseObject = {
+            'status': 'fail',
+            'message': str(e)
+        }
+        return make_response(jsonify(responseObject)), 400
+    responseObject = {
+        'status': 'success',
+        'data': [provision_result_row(m) for m in items],
+        'next_cursor': next_cursor
+    }
+    if with_total:
+        responseObject['total'] = count_cache.count(count_key, query)
+    return make_response(jsonify(responseObject)), 200
 
 
 class SUTStatusForControllerAPI(MethodView):
@@ -17,27 +80,10 @@ class SUTStatusForControllerAPI(MethodView):
         data = request.args
         controller = data['controller']
         try:
-            results = db.session.query(ManualProvision).filter((ManualProvision.is_ifwi == 'In Progress') |
-                                                               (ManualProvision.is_ifwi == 'Blocked') |
-                                                               (ManualProvision.is_bios == 'In Progress') |
-                                                               (ManualProvision.is_bios == 'Blocked') |
-                                                               (ManualProvision.is_os == 'In Progress') |
-                                                               (ManualProvision.is_e2e == 'In Progress') |
-                                                               (ManualProvision.is_e2e == 'Blocked') |
-                                                               (ManualProvision.is_os == 'Blocked')).all()
-            print(type(results))
-            list_data = []
-            filter_results = []
-            for _val in results:
-                if _val.controller == controller:
-                    filter_results.append({'controller': _val.controller, 'sut': _val.sut, 'ifwi_status': _val.is_ifwi
-                                              , 'bios_status': _val.is_bios, 'os_status': _val.is_os, 'e2e_status': _val.is_e2e})
-
-            responseObject = {
+            return conditional_response(lambda: {
                 'status': 'success',
-                'result': filter_results
-            }
-            return make_response(jsonify(responseObject)), 200
+                'result': active_provisions.for_controller(controller)
+            })
         except Exception as e:
             responseObject = {
                 'status': 'fail'
@@ -45,6 +91,27 @@ class SUTStatusForControllerAPI(MethodView):
             return make_response(jsonify(responseObject)), 500
 
 
+class SUTStatusRegistryStatsAPI(MethodView):
+    def get(self):
+        responseObject = {
+            'status': 'success',
+            'data': active_provisions.stats()
+        }
+        return make_response(jsonify(responseObject)), 200
+
+
+class DbPoolStatsAPI(MethodView):
+    def get(self):
+        """
+        Connection pool checkout waits and churn of the worker answering the request
+        """
+        responseObject = {
+            'status': 'success',
+            'data': pool_metrics.stats(db.engine.pool)
+        }
+        return make_response(jsonify(responseObject)), 200
+
+
 class OapProvisionResultAPI(MethodView):
     def post(self):
         post_data = request.get_json()
@@ -70,6 +137,15 @@ class OapProvisionResultAPI(MethodView):
                 break
 
         try:
+            if 'cursor' in post_data:
+                query = ManualProvision.query
+                if request_id:
+                    query = query.filter(ManualProvision.request_id.contains(request_id))
+                if user_id:
+                    query = query.filter(ManualProvision.external_id.contains(user_id))
+                return provision_cursor_page(query, sort_name, sort_order, per_page, post_data.get('cursor'),
+                                             post_data.get('with_total'), ('result', request_id, user_id))
+
             _result = None
 
             if sort_name == 'request_id':
@@ -114,24 +190,7 @@ class OapProvisionResultAPI(MethodView):
             prev_num = _result.prev_num if _result is not None else None
             next_num = _result.next_num if _result is not None else None
             _resp = _result.items if _result is not None else None
-            results = []
-            for m in _resp:
-                results.append(
-                    {'provision_id': m.provision_id, 'controller': m.controller, 'sut': m.sut, 'is_ifwi': m.is_ifwi,
-                     'tws_result_ifwi': m.tws_result_ifwi, 'is_bios': m.is_bios,
-                     'tws_result_bios': m.tws_result_bios,
-                     'is_os': m.is_os, 'tws_result_os': m.tws_result_os, 'request_id': m.request_id,
-                     'user_id': m.user_id,
-                     'create_At': m.create_At, 'location_type': m.location_type, 'wwid': m.wwid,
-                     'external_id': m.external_id, 'email': m.email,
-                     'kit_name': m.kit, 'ifwi_bin': m.ifwi,
-                     'wifi_name': m.wifi_name,
-                     'wifi_password': m.wifi_password,
-                     'share_path': m.share_path,
-                     'share_uid': m.share_uid,
-                     'share_pwd': m.share_pwd,
-                     'wim_name': m.wim_name, 'bios_file': m.bios_file, 'e2e_tws_result': m.e2e_tws_result,
-                     'is_e2e': m.is_e2e})
+            results = [provision_result_row(m) for m in _resp]
 
             responseObject = {
                 'status': 'success',
@@ -165,7 +224,18 @@ class OapProvisionNewResultAPI__TEST(MethodView):
                 sort_order = _sort['order']
                 break
         try:
-            _result = None        
+            if 'cursor' in post_data:
+                query = ManualProvision.query
+                if search:
+                    query = query.filter(ManualProvision.request_id.contains(search),
+                                         ManualProvision.external_id.contains(search),
+                                         ManualProvision.create_At.contains(search),
+                                         ManualProvision.controller.contains(search),
+                                         ManualProvision.sut.contains(search))
+                return provision_cursor_page(query, sort_name, sort_order, per_page, post_data.get('cursor'),
+                                             post_data.get('with_total'), ('search', search))
+
+            _result = None
             if sort_name == 'request_id':
                 if sort_order == 'asc':
                     # items = ["request_id", "external_id", "create_At", "controller", "sut"]
@@ -227,24 +297,7 @@ class OapProvisionNewResultAPI__TEST(MethodView):
             prev_num = _result.prev_num if _result is not None else None
             next_num = _result.next_num if _result is not None else None
             _resp = _result.items if _result is not None else None
-            results = []
-            for m in _resp:
-                results.append(
-                    {'provision_id': m.provision_id, 'controller': m.controller, 'sut': m.sut, 'is_ifwi': m.is_ifwi,
-                     'tws_result_ifwi': m.tws_result_ifwi, 'is_bios': m.is_bios,
-                     'tws_result_bios': m.tws_result_bios,
-                     'is_os': m.is_os, 'tws_result_os': m.tws_result_os, 'request_id': m.request_id,
-                     'user_id': m.user_id,
-                     'create_At': m.create_At, 'location_type': m.location_type, 'wwid': m.wwid,
-                     'external_id': m.external_id, 'email': m.email,
-                     'kit_name': m.kit, 'ifwi_bin': m.ifwi,
-                     'wifi_name': m.wifi_name,
-                     'wifi_password': m.wifi_password,
-                     'share_path': m.share_path,
-                     'share_uid': m.share_uid,
-                     'share_pwd': m.share_pwd,
-                     'wim_name': m.wim_name, 'bios_file': m.bios_file, 'e2e_tws_result': m.e2e_tws_result,
-                     'is_e2e': m.is_e2e})
+            results = [provision_result_row(m) for m in _resp]
 
             responseObject = {
                 'status': 'success',
@@ -263,6 +316,117 @@ class OapProvisionNewResultAPI__TEST(MethodView):
             return make_response(jsonify(responseObject)), 500
 
 
+class OapProvisionSearchAPI(MethodView):
+    def get(self):
+        """
+        Provisions matching every word of q, see provision_search_filter: words match external_id,
+        controller and sut, numbers also the request_id. Unlike the search of the POST listing,
+        create_At is not searched.
+        """
+        search = request.args.get('q', '')
+        try:
+            condition = provision_search_filter(search, db.engine.dialect.name)
+            if condition is None:
+                responseObject = {
+                    'status': 'fail',
+                    'message': 'Provide a search term.'
+                }
+                return make_response(jsonify(responseObject)), 400
+            return provision_cursor_page(ManualProvision.query.filter(condition), request.args.get('sort'),
+                                         request.args.get('order'), request.args.get('per_page', 10),
+                                         request.args.get('cursor'), request.args.get('with_total') == 'true',
+                                         ('fulltext', search))
+        except Exception as e:
+            responseObject = {
+                'status': 'fail',
+                'message': 'Unable to Search provision.'
+            }
+            return make_response(jsonify(responseObject)), 500
+
+
+class OapProvisionExportAPI(MethodView):
+    """
+    Full provision history joined with the requesting users, streamed row by row.
+    Rows are read in keyset batches of EXPORT_BATCH_SIZE so memory does not depend on the history size.
+    """
+    fields = [
+        ('provision_id', ManualProvision.provision_id), ('controller', ManualProvision.controller),
+        ('sut', ManualProvision.sut), ('is_ifwi', ManualProvision.is_ifwi),
+        ('tws_result_ifwi', ManualProvision.tws_result_ifwi), ('is_bios', ManualProvision.is_bios),
+        ('tws_result_bios', ManualProvision.tws_result_bios), ('is_os', ManualProvision.is_os),
+        ('tws_result_os', ManualProvision.tws_result_os), ('request_id', ManualProvision.request_id),
+        ('user_id', ManualProvision.user_id), ('create_At', ManualProvision.create_At),
+        ('location_type', ManualProvision.location_type), ('user_name', User.user_name), ('email', User.email),
+        ('first_name', User.first_name), ('user_group', User.user_group), ('wwid', User.wwid),
+        ('wifi_name', ManualProvision.wifi_name), ('wifi_password', ManualProvision.wifi_password),
+        ('share_path', ManualProvision.share_path), ('share_uid', ManualProvision.share_uid),
+        ('share_pwd', ManualProvision.share_pwd), ('last_name', User.last_name),
+        ('e2e_tws_result', ManualProvision.e2e_tws_result), ('is_e2e', ManualProvision.is_e2e)
+    ]
+
+    @staticmethod
+    def rows(batch_size):
+        """
+        Keyset pages over the provision primary key alone, then joins the users of just that page,
+        so every batch is an index range scan however long the history is
+        """
+        columns = [column.label(name) for name, column in OapProvisionExportAPI.fields]
+        last_id = None
+        while True:
+            query = db.session.query(ManualProvision.provision_id)
+            if last_id is not None:
+                query = query.filter(ManualProvision.provision_id > last_id)
+            provision_ids = [row.provision_id for row in
+                             query.order_by(ManualProvision.provision_id).limit(batch_size)]
+            if not provision_ids:
+                return
+            batch = db.session.query(*columns).filter(User.wwid == ManualProvision.wwid,
+                                                      ManualProvision.provision_id.in_(provision_ids)) \
+                .order_by(ManualProvision.provision_id, User.user_id)
+            for row in batch:
+                yield row
+            last_id = provision_ids[-1]
+
+    @staticmethod
+    def ndjson(rows):
+        names = [name for name, _ in OapProvisionExportAPI.fields]
+        for row in rows:
+            yield json.dumps({name: getattr(row, name) for name in names}) + '\n'
+
+    @staticmethod
+    def csv(rows):
+        names = [name for name, _ in OapProvisionExportAPI.fields]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        # the header goes out on its own, an empty history still gets it
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        for row in rows:
+            writer.writerow([getattr(row, name) for name in names])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    def get(self):
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            responseObject = {
+                'status': 'fail',
+                'message': 'Unsupported export format.'
+            }
+            return make_response(jsonify(responseObject)), 400
+        rows = OapProvisionExportAPI.rows(app.config.get('EXPORT_BATCH_SIZE', 1000))
+        if export_format == 'csv':
+            body, mimetype = OapProvisionExportAPI.csv(rows), 'text/csv'
+        else:
+            body, mimetype = OapProvisionExportAPI.ndjson(rows), 'application/x-ndjson'
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = 'attachment; filename=provision_history.{}'.format(export_format)
+        return response
+
+
 class OapProvisionAPI(MethodView):
     def post(self):
         post_data = request.get_json()
@@ -271,7 +435,10 @@ class OapProvisionAPI(MethodView):
             provision_objects = util.prepareObject()
 
             db.session.add_all(provision_objects)
+            db.session.flush()
+            tracked = [(p.provision_id, ActiveProvisionRegistry.entry(p), p.is_active) for p in provision_objects]
             db.session.commit()
+            active_provisions.track_entries(tracked)
             responseObject = {
                 'status': 'success',
                 'message': 'Successfully Added provision.'
@@ -290,6 +457,18 @@ class OapProvisionAPI(MethodView):
         if _type == 'new':
             per_page = 10
 
+            if 'cursor' in request.args:
+                try:
+                    return provision_cursor_page(ManualProvision.query, 'create_At', 'desc',
+                                                 request.args.get('per_page', per_page), request.args.get('cursor'),
+                                                 request.args.get('with_total') == 'true', ('new',))
+                except Exception as e:
+                    responseObject = {
+                        'status': 'fail',
+                        'message': 'Unable to Fetch provision.'
+                    }
+                    return make_response(jsonify(responseObject)), 500
+
             try:
                 results = []
                 _resp = None
@@ -309,24 +488,7 @@ class OapProvisionAPI(MethodView):
                     prev_num = _withmeta_result.prev_num
                     next_num = _withmeta_result.next_num
                     _resp = _withmeta_result.items
-                # for m in db.session.query(ManualProvision).all():
-                for m in _resp:
-                    results.append(
-                        {'provision_id': m.provision_id, 'controller': m.controller, 'sut': m.sut, 'is_ifwi': m.is_ifwi,
-                         'tws_result_ifwi': m.tws_result_ifwi, 'is_bios': m.is_bios,
-                         'tws_result_bios': m.tws_result_bios,
-                         'is_os': m.is_os, 'tws_result_os': m.tws_result_os, 'request_id': m.request_id,
-                         'user_id': m.user_id,
-                         'create_At': m.create_At, 'location_type': m.location_type, 'wwid': m.wwid,
-                         'external_id': m.external_id, 'email': m.email,
-                         'kit_name': m.kit, 'ifwi_bin': m.ifwi,
-                         'wifi_name': m.wifi_name,
-                         'wifi_password': m.wifi_password,
-												 'share_path': m.share_path,
-												 'share_uid': m.share_uid,
-												 'share_pwd': m.share_pwd,
-                         'wim_name': m.wim_name, 'bios_file': m.bios_file, 'e2e_tws_result': m.e2e_tws_result,
-                         'is_e2e': m.is_e2e})
+                results = [provision_result_row(m) for m in _resp]
 
                 responseObject = {
                     'status': 'success',
@@ -387,50 +549,19 @@ class OapProvisionAPI(MethodView):
             is_updated = False
             mapped_provision_type = ''
             tws_result = ''
-            if provision_type == 'is_e2e':
-                updated = db.session.query(ManualProvision).filter(
-                        # text("provision_id=:id and is_e2e!='PASS' and is_e2e!='FAIL' and is_e2e!=:status")).params(
-                        text("provision_id=:id and is_e2e!='PASS' and is_e2e!=:status")).params(
-                        id=provision_id, status=provision_status).first()
-                if updated:
-                    updated.is_e2e = provision_status
-                    db.session.commit()
-                    is_updated = True
-                    mapped_provision_type = 'E2E Provisioning'
-                    tws_result = updated.e2e_tws_result
-            elif provision_type == 'is_ifwi':
-                updated = db.session.query(ManualProvision).filter(
-                    text("provision_id=:id and is_ifwi!='PASS' and is_ifwi!='FAIL' and is_ifwi!=:status")).params(
-                    id=provision_id, status=provision_status).first()
-                if updated:
-                    updated.is_ifwi = provision_status
-                    db.session.commit()
-                    is_updated = True
-                    mapped_provision_type = 'IFWI Provisioning'
-                    tws_result = updated.tws_result_ifwi
-
-            elif provision_type == 'is_os':
+            if provision_type in PROVISION_STAGES:
                 updated = db.session.query(ManualProvision).filter(
-                    text("provision_id=:id and is_os!='PASS' and is_os!='FAIL' and is_os!=:status")).params(
-                    id=provision_id, status=provision_status).first()
+                    ManualProvision.provision_id == provision_id,
+                    stage_update_guard(provision_type, provision_status)).first()
                 if updated:
-                    updated.is_os = provision_status
+                    setattr(updated, provision_type, provision_status)
+                    updated.refresh_active_state()
                     db.session.commit()
                     is_updated = True
-                    mapped_provision_type = 'Imaging'
-                    tws_result = updated.tws_result_os
-
-            elif provision_type == 'is_bios':
-                updated = db.session.query(ManualProvision).filter(
-                    text("provision_id=:id and is_bios!='PASS' and is_bios!='FAIL' and is_bios!=:status")).params(
-                    id=provision_id, status=provision_status).first()
-                if updated:
-                    updated.is_bios = provision_status
-                    db.session.commit()
-                    is_updated = True
-                    mapped_provision_type = 'BIOS Update'
-                    tws_result = updated.tws_result_bios
+                    mapped_provision_type, tws_attribute, _ = PROVISION_STAGES[provision_type]
+                    tws_result = getattr(updated, tws_attribute)
             if is_updated:
+                active_provisions.track(updated)
                 self.triggerEmail(updated, mapped_provision_type, provision_status, tws_result)
                 responseObject = {
                     'status': 'success',
@@ -456,10 +587,9 @@ class OapProvisionAPI(MethodView):
             }
             return make_response(jsonify(responseObject)), 500
 
-    def triggerEmail(self, updated_object: ManualProvision, provision_type, provision_status, tws_result):
-        # Do changes as per sso route
-        user = User.query.filter_by(user_id=updated_object.user_id).first()
-        email_notifier = EmailNotifier(
+    @staticmethod
+    def status_notifier(updated_object: ManualProvision, provision_type, provision_status, tws_result):
+        return EmailNotifier(
             oap_req_id=updated_object.request_id,
             oap_provision_type=provision_type,
             to_list=updated_object.email,  # changed user to updated_object
@@ -468,25 +598,89 @@ class OapProvisionAPI(MethodView):
             oap_sut=updated_object.sut,
             oap_provision_status=provision_status,
             oap_tws_link=tws_result)
-        email_notifier.trigger_email_notification()
+
+    def triggerEmail(self, updated_object: ManualProvision, provision_type, provision_status, tws_result):
+        self.status_notifier(updated_object, provision_type, provision_status, tws_result) \
+            .trigger_email_notification()
+
+
+class OapProvisionStatusBulkAPI(MethodView):
+    def patch(self):
+        """
+        Applies a list of stage status updates in one transaction, the same guards as
+        OapProvisionAPI.patch keep PASS/FAIL stages from being overwritten
+        :return: one outcome per entry: updated, unchanged, superseded or invalid
+        """
+        post_data = request.get_json()
+        updates = post_data.get('updates') if isinstance(post_data, dict) else None
+        if not isinstance(updates, list) or len(updates) > app.config.get('PROVISION_BULK_STATUS_MAX', 500):
+            responseObject = {
+                'status': 'fail',
+                'message': 'updates must be a list of at most {} entries.'.format(
+                    app.config.get('PROVISION_BULK_STATUS_MAX', 500))
+            }
+            return make_response(jsonify(responseObject)), 400
+        try:
+            outcomes, applied = apply_status_updates(updates)
+            provisions = {}
+            if applied:
+                provisions = {m.provision_id: m for m in ManualProvision.query.filter(
+                    ManualProvision.provision_id.in_(set(item[0] for item in applied)))}
+            entries = [(m.provision_id, ActiveProvisionRegistry.entry(m), m.is_active) for m in provisions.values()]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            responseObject = {
+                'status': 'fail',
+                'message': 'Unable to Update provision status.'
+            }
+            return make_response(jsonify(responseObject)), 500
+        active_provisions.track_entries(entries)
+        notifiers = []
+        for provision_id, provision_type, provision_status in applied:
+            updated = provisions[provision_id]
+            mapped_provision_type, tws_attribute, _ = PROVISION_STAGES[provision_type]
+            notifiers.append(OapProvisionAPI.status_notifier(updated, mapped_provision_type, provision_status,
+                                                             getattr(updated, tws_attribute)))
+        try:
+            EmailNotifier.trigger_status_notifications(notifiers)
+        except Exception as e:
+            # the updates are committed, a lost notification does not undo them
+            db.session.rollback()
+            get_logger_instance().error("Notifications of a bulk status update failed: {}".format(e))
+        responseObject = {
+            'status': 'success',
+            'message': '{} of {} provision status updates applied.'.format(len(applied), len(outcomes)),
+            'data': outcomes
+        }
+        return make_response(jsonify(responseObject)), 201
 
 
 class OapProvisionMasterAPI(MethodView):
     def post(self):
+        """
+        Allocates one request id, or a block of `count` ids (at most PROVISION_ID_BLOCK_MAX) for
+        bulk provisioning, e.g. {"user_id": 1, "count": 20}. global_id is the first id of the block.
+        """
         post_data = request.get_json()
+        count = post_data.get('count', 1)
+        if not isinstance(count, int) or isinstance(count, bool) or \
+                not 1 <= count <= app.config.get('PROVISION_ID_BLOCK_MAX', 500):
+            responseObject = {
+                'status': 'fail',
+                'message': 'count must be a number between 1 and {}.'.format(
+                    app.config.get('PROVISION_ID_BLOCK_MAX', 500))
+            }
+            return make_response(jsonify(responseObject)), 400
         try:
-            provision_master = ManualProvisionMaster(
-                user_id=post_data.get('user_id')
-            )
-            db.session.add(provision_master)
-            db.session.commit()
-            master = db.session.query(ManualProvisionMaster).order_by(ManualProvisionMaster.global_id.desc()).first()
+            global_ids = allocate_request_ids(post_data.get('user_id'), count)
             db.session.commit()
 
             responseObject = {
                 'status': 'success',
                 'message': 'Successfully Added ManualProvisionMaster.',
-                'global_id': master.global_id
+                'global_id': global_ids[0],
+                'global_ids': global_ids
             }
             return make_response(jsonify(responseObject)), 201
         except Exception as e:
@@ -499,10 +693,9 @@ class OapProvisionMasterAPI(MethodView):
     def get(self):
         try:
             master = db.session.query(ManualProvisionMaster).order_by(ManualProvisionMaster.global_id.desc()).first()
-            json_string = json.dumps(master, cls=AlchemyEncoder)
             responseObject = {
                 'status': 'success',
-                'data': json.loads(json_string)
+                'data': serializer_for(ManualProvisionMaster).to_dict(master)
             }
             return make_response(jsonify(responseObject)), 200
         except Exception as e:
@@ -514,6 +707,45 @@ class OapProvisionMasterAPI(MethodView):
             return make_response(jsonify(responseObject)), 500
 
 
+class OapProvisionSubmitAPI(MethodView):
+    def post(self):
+        """
+        Creates a whole provisioning request in one transaction: allocates the request id and
+        inserts one OAP_MANUAL_PROVISION row per SUT. Fields next to provisions apply to every SUT
+        unless the SUT sets them, e.g. {"user_id": 1, "wwid": 123, "provisions": [{"controller": "c1",
+        "sut": "s1", "is_os": "In Progress"}, ...]}
+        :return: request_id and the provision_ids in the order of provisions
+        """
+        post_data = request.get_json()
+        rows, errors = validate_submission(post_data)
+        if errors:
+            responseObject = {
+                'status': 'fail',
+                'message': 'Invalid provisioning request.',
+                'errors': errors
+            }
+            return make_response(jsonify(responseObject)), 400
+        try:
+            request_id, provision_ids = submit_provisions(post_data.get('user_id'), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            responseObject = {
+                'status': 'fail',
+                'message': 'Unable to Add provision.'
+            }
+            return make_response(jsonify(responseObject)), 500
+        active_provisions.track_entries([(provision_id, ActiveProvisionRegistry.entry_from_mapping(row),
+                                          row['is_active']) for provision_id, row in zip(provision_ids, rows)])
+        responseObject = {
+            'status': 'success',
+            'message': 'Successfully Added provision.',
+            'request_id': request_id,
+            'provision_ids': provision_ids
+        }
+        return make_response(jsonify(responseObject)), 201
+
+
 class PingAPI(MethodView):
     def get(self):
         responseObject = {
@@ -546,15 +778,16 @@ class ControllerAPI(MethodView):
             }
             return make_response(jsonify(responseObject)), 500
 
+    @staticmethod
+    def listing():
+        return {
+            'status': 'success',
+            'data': serializer_for(Controller).to_list(Controller.query.all())
+        }
+
     def get(self):
         try:
-            controllers = Controller.query.all()
-            json_string = json.dumps([ob for ob in controllers], cls=AlchemyEncoder)
-            responseObject = {
-                'status': 'success',
-                'data': json.loads(json_string)
-            }
-            return make_response(jsonify(responseObject)), 200
+            return conditional_response(ControllerAPI.listing)
         except Exception as e:
             responseObject = {
                 'status': 'fail',
@@ -587,15 +820,16 @@ class PlatformAPI(MethodView):
             }
             return make_response(jsonify(responseObject)), 500
 
+    @staticmethod
+    def listing():
+        return {
+            'status': 'success',
+            'data': serializer_for(Platform).to_list(Platform.query.all())
+        }
+
     def get(self):
         try:
-            platforms = Platform.query.all()
-            json_string = json.dumps([ob for ob in platforms], cls=AlchemyEncoder)
-            responseObject = {
-                'status': 'success',
-                'data': json.loads(json_string)
-            }
-            return make_response(jsonify(responseObject)), 200
+            return conditional_response(PlatformAPI.listing)
         except Exception as e:
             responseObject = {
                 'status': 'fail',
@@ -613,13 +847,10 @@ class OapLastProvisionDetailsAPI(MethodView):
             _result = ManualProvision.query.filter(ManualProvision.sut.contains(sut1),
                                                            ManualProvision.controller.contains(controller1)).order_by(
                         ManualProvision.request_id.desc()).limit(1).all()
-            json_string = json.dumps(_result, cls=AlchemyEncoder)
-            print("json_string", json_string)
             responseObject = {
                 'status': 'success',
-                'data': json.loads(json_string)
+                'data': serializer_for(ManualProvision).to_list(_result)
             }
-            print("responseObject", responseObject)
             return make_response(jsonify(responseObject)), 200
         except Exception as e:
               responseObject = {
@@ -631,14 +862,26 @@ class OapLastProvisionDetailsAPI(MethodView):
         
 oap_blueprint = Blueprint('oap', __name__)
 
+
+@oap_blueprint.before_app_first_request
+def warm_active_provisions():
+    active_provisions.rebuild()
+
+
 ping_view = PingAPI.as_view('ping_view')
+db_pool_stats_view = DbPoolStatsAPI.as_view('db_pool_stats_view')
 controller_view = ControllerAPI.as_view('controller_view')
 platform_view = PlatformAPI.as_view('platform_view')
 provision_master_view = OapProvisionMasterAPI.as_view('provision_master_view')
 provision_view = OapProvisionAPI.as_view('provision_view')
+provision_submit_view = OapProvisionSubmitAPI.as_view('provision_submit_view')
+provision_status_bulk_view = OapProvisionStatusBulkAPI.as_view('provision_status_bulk_view')
 sutstatus_view = SUTStatusForControllerAPI.as_view('sutstatus_view')
+sutstatus_stats_view = SUTStatusRegistryStatsAPI.as_view('sutstatus_stats_view')
 provision_result_view = OapProvisionResultAPI.as_view('provision_result_view')
 provision_result_test = OapProvisionNewResultAPI__TEST.as_view('provision_result_test')
+provision_search_view = OapProvisionSearchAPI.as_view('provision_search_view')
+provision_export_view = OapProvisionExportAPI.as_view('provision_export_view')
 last_provision_details = OapLastProvisionDetailsAPI.as_view('last_provision_details')   
 # add Rules for API Endpoints OapProvisionResultAPI
 
@@ -657,6 +900,11 @@ oap_blueprint.add_url_rule(
     view_func=sutstatus_view,
     methods=['GET']
 )
+oap_blueprint.add_url_rule(
+    '/oap/controller/sutstatus/stats',
+    view_func=sutstatus_stats_view,
+    methods=['GET']
+)
 oap_blueprint.add_url_rule(
     '/',
     view_func=ping_view,
@@ -682,8 +930,33 @@ oap_blueprint.add_url_rule(
     view_func=provision_view,
     methods=['GET', 'POST', 'PATCH']
 )
+oap_blueprint.add_url_rule(
+    '/oap/provision/status',
+    view_func=provision_status_bulk_view,
+    methods=['PATCH']
+)
+oap_blueprint.add_url_rule(
+    '/oap/provision/submit',
+    view_func=provision_submit_view,
+    methods=['POST']
+)
+oap_blueprint.add_url_rule(
+    '/oap/provision/search',
+    view_func=provision_search_view,
+    methods=['GET']
+)
+oap_blueprint.add_url_rule(
+    '/oap/provision/export',
+    view_func=provision_export_view,
+    methods=['GET']
+)
 oap_blueprint.add_url_rule(
     '/oap/last_provision_details',
     view_func=last_provision_details,
     methods=['GET']
-)
\ No newline at end of file
+)
+oap_blueprint.add_url_rule(
+    '/oap/db/pool/stats',
+    view_func=db_pool_stats_view,
+    methods=['GET']
+)
@@ -0,0 +1,185 @@
+# project/server/oap/provision_registry.py
+
+import datetime
+import threading
+import time
+
+from sqlalchemy import func
+
+from project.server import app, db
+from project.server.models import ManualProvision
+
+
+class ActiveProvisionRegistry:
+    """
+    Process local view of the active ManualProvision rows, keyed by controller and sut.
+    Every gunicorn worker keeps its own copy. Writes handled by this worker are tracked directly,
+    writes handled by the others are picked up from updated_At at most every
+    ACTIVE_PROVISION_SYNC_INTERVAL seconds, and the whole view is reloaded every
+    ACTIVE_PROVISION_REGISTRY_TTL seconds.
+    """
+    columns = (ManualProvision.provision_id, ManualProvision.controller, ManualProvision.sut,
+               ManualProvision.is_ifwi, ManualProvision.is_bios, ManualProvision.is_os, ManualProvision.is_e2e,
+               ManualProvision.is_active, ManualProvision.updated_At)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        # provision_id -> (controller, sut) it is filed under
+        self._keys = {}
+        self._built_at = None
+        self._synced_at = None
+        self._synced_to = None
+        # entries tracked while a load runs, replayed over its result
+        self._sequence = 0
+        self._loading = 0
+        self._journal = []
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.syncs = 0
+        self.last_rebuild_ms = 0.0
+        self.total_rebuild_ms = 0.0
+
+    # entry key -> ManualProvision column
+    entry_fields = (('controller', 'controller'), ('sut', 'sut'), ('ifwi_status', 'is_ifwi'),
+                    ('bios_status', 'is_bios'), ('os_status', 'is_os'), ('e2e_status', 'is_e2e'))
+
+    @staticmethod
+    def entry(provision):
+        return dict((key, getattr(provision, name)) for key, name in ActiveProvisionRegistry.entry_fields)
+
+    @staticmethod
+    def entry_from_mapping(row):
+        """
+        :param row: dict of OAP_MANUAL_PROVISION column values, as inserted with Core
+        """
+        return dict((key, row.get(name)) for key, name in ActiveProvisionRegistry.entry_fields)
+
+    def _is_stale(self):
+        if self._built_at is None:
+            return True
+        return time.monotonic() - self._built_at > app.config.get('ACTIVE_PROVISION_REGISTRY_TTL', 300)
+
+    def _sync_due(self):
+        return time.monotonic() - self._synced_at >= app.config.get('ACTIVE_PROVISION_SYNC_INTERVAL', 1)
+
+    def _put(self, provision_id, entry, is_active):
+        key = self._keys.pop(provision_id, None)
+        if key is not None:
+            # drop the entry where it was filed, controller or sut may have changed
+            suts = self._active[key[0]]
+            suts[key[1]].pop(provision_id, None)
+            if not suts[key[1]]:
+                del suts[key[1]]
+            if not suts:
+                del self._active[key[0]]
+        if is_active:
+            self._active.setdefault(entry['controller'], {}).setdefault(entry['sut'], {})[provision_id] = entry
+            self._keys[provision_id] = (entry['controller'], entry['sut'])
+
+    def _load(self, query, replace):
+        """
+        Applies the rows of query, replacing the whole view or on top of it. Entries tracked
+        while the query ran are newer than its rows and are applied again afterwards.
+        :return: latest updated_At among the rows
+        """
+        with self._lock:
+            started = self._sequence
+            self._loading += 1
+        try:
+            rows = [(row.provision_id, self.entry(row), row.is_active, row.updated_At) for row in query]
+            with self._lock:
+                if replace:
+                    self._active = {}
+                    self._keys = {}
+                for provision_id, entry, is_active, _ in rows:
+                    self._put(provision_id, entry, is_active)
+                for sequence, entries in self._journal:
+                    if sequence > started:
+                        for provision_id, entry, is_active in entries:
+                            self._put(provision_id, entry, is_active)
+        finally:
+            with self._lock:
+                self._loading -= 1
+                if not self._loading:
+                    self._journal = []
+        return max([updated for _, _, _, updated in rows if updated is not None] or [None])
+
+    def rebuild(self):
+        """
+        Reloads every active row from the database
+        """
+        started = time.monotonic()
+        synced_to = db.session.query(func.max(ManualProvision.updated_At)).scalar()
+        self._load(ManualProvision.query.filter(ManualProvision.is_active == True).with_entities(*self.columns),
+                   replace=True)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._built_at = self._synced_at = time.monotonic()
+            self._synced_to = synced_to
+            self.rebuilds += 1
+            self.last_rebuild_ms = elapsed_ms
+            self.total_rebuild_ms += elapsed_ms
+
+    def sync(self):
+        """
+        Applies the rows changed since the last rebuild or sync, by any worker. The window reaches
+        ACTIVE_PROVISION_SYNC_OVERLAP seconds back so rows committed after a newer one are not missed.
+        """
+        query = ManualProvision.query.with_entities(*self.columns)
+        if self._synced_to is not None:
+            query = query.filter(ManualProvision.updated_At >= self._synced_to - datetime.timedelta(
+                seconds=app.config.get('ACTIVE_PROVISION_SYNC_OVERLAP', 5)))
+        synced_to = self._load(query, replace=False)
+        with self._lock:
+            self._synced_at = time.monotonic()
+            if synced_to is not None and (self._synced_to is None or synced_to > self._synced_to):
+                self._synced_to = synced_to
+            self.syncs += 1
+
+    def track(self, provision):
+        """
+        Records an inserted or updated ManualProvision
+        :param provision: ManualProvision with provision_id assigned
+        """
+        self.track_entries([(provision.provision_id, self.entry(provision), provision.is_active)])
+
+    def track_entries(self, entries):
+        """
+        :param entries: iterable of (provision_id, entry, is_active) captured before commit
+        """
+        entries = list(entries)
+        with self._lock:
+            self._sequence += 1
+            if self._loading:
+                self._journal.append((self._sequence, entries))
+            for provision_id, entry, is_active in entries:
+                self._put(provision_id, entry, is_active)
+
+    def for_controller(self, controller):
+        """
+        :return: list of sut status dicts for the controller, ordered by provision_id
+        """
+        if self._is_stale():
+            with self._lock:
+                self.misses += 1
+            self.rebuild()
+        else:
+            with self._lock:
+                self.hits += 1
+            if self._sync_due():
+                self.sync()
+        with self._lock:
+            rows = [item for by_id in self._active.get(controller, {}).values() for item in by_id.items()]
+        return [entry for _, entry in sorted(rows, key=lambda item: item[0])]
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'rebuilds': self.rebuilds, 'syncs': self.syncs,
+                    'last_rebuild_ms': round(self.last_rebuild_ms, 3),
+                    'total_rebuild_ms': round(self.total_rebuild_ms, 3),
+                    'controllers': len(self._active)}
+
+
+active_provisions = ActiveProvisionRegistry()
@@ -0,0 +1,60 @@
+# project/server/oap/provision_search.py
+
+import re
+
+from sqlalchemy import or_, and_, text, bindparam
+
+from project.server.models import ManualProvision
+
+# innodb_ft_min_token_size, shorter words are not in the FULLTEXT index
+FULLTEXT_MIN_TOKEN = 3
+FULLTEXT_COLUMNS = ('external_id', 'controller', 'sut')
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def search_tokens(search):
+    """
+    Splits the search the way the FULLTEXT parser splits host and user names
+    """
+    return _TOKEN.findall(search or '')
+
+
+def _fulltext_match(tokens):
+    against = ' '.join('+{}*'.format(token) for token in tokens)
+    return text("MATCH ({}) AGAINST (:terms IN BOOLEAN MODE)".format(', '.join(FULLTEXT_COLUMNS))).bindparams(
+        bindparam('terms', against, unique=True))
+
+
+def _like_match(table, token):
+    # words the FULLTEXT index cannot answer, scanned with LIKE over any searchable column
+    return or_(*[table.c[name].contains(token) for name in FULLTEXT_COLUMNS])
+
+
+def provision_search_filter(search, dialect_name, table=None):
+    """
+    Builds the WHERE clause for a provision search. Every word of the search has to match,
+    each one as the prefix of a word in external_id, controller or sut, or as the request_id.
+    :param dialect_name: 'mysql' uses the FULLTEXT index, other databases and words shorter
+        than FULLTEXT_MIN_TOKEN fall back to a substring LIKE
+    :return: clause, or None when the search has no words
+    """
+    table = ManualProvision.__table__ if table is None else table
+    tokens = search_tokens(search)
+    if not tokens:
+        return None
+    use_fulltext = dialect_name == 'mysql'
+    clauses = []
+    words = [token for token in tokens if use_fulltext and len(token) >= FULLTEXT_MIN_TOKEN and not token.isdigit()]
+    if words:
+        clauses.append(_fulltext_match(words))
+    for token in tokens:
+        if token in words:
+            continue
+        if use_fulltext and len(token) >= FULLTEXT_MIN_TOKEN:
+            match = _fulltext_match([token])
+        else:
+            match = _like_match(table, token)
+        if token.isdigit():
+            match = or_(match, table.c.request_id == int(token))
+        clauses.append(match)
+    return and_(*clauses)
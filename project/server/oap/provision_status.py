@@ -0,0 +1,92 @@
+# project/server/oap/provision_status.py
+
+from collections import OrderedDict
+
+from sqlalchemy import and_, or_, case
+
+from project.server import db
+from project.server.models import ManualProvision, ACTIVE_PROVISION_STATES
+
+# provision_type -> (mail label, tws result attribute, final statuses that are never overwritten)
+PROVISION_STAGES = {
+    'is_ifwi': ('IFWI Provisioning', 'tws_result_ifwi', ('PASS', 'FAIL')),
+    'is_bios': ('BIOS Update', 'tws_result_bios', ('PASS', 'FAIL')),
+    'is_os': ('Imaging', 'tws_result_os', ('PASS', 'FAIL')),
+    # a failed E2E run can be retried on the same provision
+    'is_e2e': ('E2E Provisioning', 'e2e_tws_result', ('PASS',)),
+}
+
+
+def stage_update_guard(provision_type, provision_status):
+    """
+    Rows whose stage may move to provision_status: not final yet and not already in that status
+    """
+    column = getattr(ManualProvision, provision_type)
+    statuses = PROVISION_STAGES[provision_type][2]
+    if provision_status not in statuses:
+        statuses += (provision_status,)
+    return and_(*[column != status for status in statuses])
+
+
+def active_state_after(provision_type, provision_status):
+    """
+    is_active of a row once provision_type is set to provision_status, as a SQL expression
+    """
+    if provision_status in ACTIVE_PROVISION_STATES:
+        return True
+    others = [getattr(ManualProvision, name) for name in PROVISION_STAGES if name != provision_type]
+    return case([(or_(*[column.in_(ACTIVE_PROVISION_STATES) for column in others]), True)], else_=False)
+
+
+def apply_status_updates(updates):
+    """
+    Applies stage status updates with one guarded UPDATE per (provision_type, provision_status),
+    inside the caller's transaction. When an entry repeats a provision_id and provision_type
+    the last one wins.
+    :param updates: list of dicts with provision_id, provision_type and provision_status
+    :return: (outcomes, applied) where outcomes holds one dict per entry, in order, and applied
+        lists the (provision_id, provision_type, provision_status) entries that changed a row
+    """
+    outcomes = []
+    latest = OrderedDict()
+    for index, update in enumerate(updates):
+        update = update if isinstance(update, dict) else {}
+        provision_id = update.get('provision_id')
+        provision_type = update.get('provision_type')
+        provision_status = update.get('provision_status')
+        outcomes.append({'provision_id': provision_id, 'provision_type': provision_type,
+                         'provision_status': provision_status, 'outcome': 'invalid'})
+        if provision_type not in PROVISION_STAGES or not provision_status:
+            continue
+        try:
+            provision_id = int(provision_id)
+        except (TypeError, ValueError):
+            continue
+        key = (provision_id, provision_type)
+        if key in latest:
+            outcomes[latest[key][0]]['outcome'] = 'superseded'
+        latest[key] = (index, provision_status)
+
+    groups = OrderedDict()
+    for (provision_id, provision_type), (index, provision_status) in latest.items():
+        groups.setdefault((provision_type, provision_status), {})[provision_id] = index
+
+    applied = []
+    for (provision_type, provision_status), indexes in groups.items():
+        guard = and_(ManualProvision.provision_id.in_(list(indexes)),
+                     stage_update_guard(provision_type, provision_status))
+        # lock the rows passing the guard, so the UPDATE below changes exactly these
+        matched = set(provision_id for (provision_id,) in db.session.query(
+            ManualProvision.provision_id).filter(guard).with_for_update())
+        if matched:
+            ManualProvision.query.filter(ManualProvision.provision_id.in_(list(matched))).update(
+                {provision_type: provision_status,
+                 'is_active': active_state_after(provision_type, provision_status)},
+                synchronize_session=False)
+        for provision_id, index in indexes.items():
+            if provision_id in matched:
+                outcomes[index]['outcome'] = 'updated'
+                applied.append((provision_id, provision_type, provision_status))
+            else:
+                outcomes[index]['outcome'] = 'unchanged'
+    return outcomes, applied
@@ -0,0 +1,59 @@
+# project/server/oap/provision_submit.py
+
+import datetime
+
+from project.server import app
+from project.server.bulk_insert import insert_rows
+from project.server.models import ManualProvision
+from project.server.oap.provision_status import PROVISION_STAGES
+from project.server.oap.request_ids import allocate_request_ids
+
+# columns a submission may set, on the request for every SUT or on a single SUT
+PROVISION_SUBMIT_FIELDS = tuple(name for name in ManualProvision.__table__.columns.keys()
+                                if name not in ('provision_id', 'request_id', 'create_At', 'is_active', 'updated_At'))
+
+
+def validate_submission(submission):
+    """
+    :param submission: {<shared fields>, 'provisions': [{'controller', 'sut', <fields>}, ...]}
+    :return: (rows ready for OAP_MANUAL_PROVISION without request_id, errors) where errors holds
+        one {'index', 'message'} per rejected SUT, index None for the request itself
+    """
+    if not isinstance(submission, dict) or not isinstance(submission.get('provisions'), list) \
+            or not submission['provisions']:
+        return [], [{'index': None, 'message': 'provisions must be a non empty list.'}]
+    limit = app.config.get('PROVISION_SUBMIT_MAX', 500)
+    if len(submission['provisions']) > limit:
+        return [], [{'index': None, 'message': 'at most {} provisions per request.'.format(limit)}]
+    shared = dict((name, submission.get(name)) for name in PROVISION_SUBMIT_FIELDS)
+    rows = []
+    errors = []
+    now = datetime.datetime.now()
+    for index, provision in enumerate(submission['provisions']):
+        if not isinstance(provision, dict):
+            errors.append({'index': index, 'message': 'provision must be an object.'})
+            continue
+        row = dict((name, provision.get(name, shared[name])) for name in PROVISION_SUBMIT_FIELDS)
+        if not row['controller'] or not row['sut']:
+            errors.append({'index': index, 'message': 'controller and sut are required.'})
+            continue
+        row['create_At'] = row['updated_At'] = now
+        row['is_active'] = ManualProvision.active_state(row[name] for name in PROVISION_STAGES)
+        rows.append(row)
+    return rows, errors
+
+
+def submit_provisions(user_id, rows, session=None):
+    """
+    Allocates the request id and inserts every row with one multi-row INSERT, both inside the
+    session's transaction, so the caller's commit makes the whole request visible at once.
+    Provision ids come from the INSERT like the request ids, see insert_rows.
+    :param user_id: owner of the request
+    :param rows: rows from validate_submission, request_id is set on them
+    :param session: db.session when None
+    :return: (request_id, list of provision_id in the order of rows)
+    """
+    request_id = allocate_request_ids(user_id, session=session)[0]
+    for row in rows:
+        row['request_id'] = request_id
+    return request_id, insert_rows(ManualProvision.__table__, rows, session)
@@ -0,0 +1,17 @@
+# project/server/oap/request_ids.py
+
+from project.server.bulk_insert import insert_rows
+from project.server.models import ManualProvisionMaster
+
+
+def allocate_request_ids(user_id, count=1, session=None):
+    """
+    Allocates count request ids (MANUAL_PROVISION_MASTER.global_id) for user_id with a single
+    INSERT inside the session's transaction and takes them from that INSERT itself, so no other
+    submission can hand out or read back the same id, see insert_rows
+    :param user_id: owner of the requests
+    :param count: size of the block
+    :param session: db.session when None
+    :return: list of global_id, ascending
+    """
+    return insert_rows(ManualProvisionMaster.__table__, [{'user_id': user_id}] * count, session)
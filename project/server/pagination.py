@@ -0,0 +1,122 @@
+# project/server/pagination.py
+
+import base64
+import datetime
+import json
+import threading
+import time
+
+from sqlalchemy import DateTime, Integer, and_, or_
+
+from project.server import app
+
+
+def encode_cursor(values):
+    """
+    Packs the sort key of the last row of a page into an opaque string
+    """
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    :return: list of sort key values, or None for the first page
+    :raises ValueError: on a cursor that was not produced by encode_cursor
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid cursor.')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor.')
+    return values
+
+
+def _after(column, value, descending):
+    # NULL sorts lowest on MariaDB and SQLite, so it comes first ascending and last descending
+    if value is None:
+        if descending:
+            return None
+        return column.isnot(None)
+    if descending:
+        return or_(column < value, column.is_(None))
+    return column > value
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _coerce(column, value):
+    # a cursor issued for another sort column does not fit this one
+    if value is not None and isinstance(column.type, DateTime):
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor.')
+    if value is not None and isinstance(column.type, Integer) and \
+            (not isinstance(value, int) or isinstance(value, bool)):
+        raise ValueError('Invalid cursor.')
+    return value
+
+
+def keyset_page(query, sort_column, tie_column, per_page, cursor=None, descending=True):
+    """
+    Returns one page ordered by (sort_column, tie_column) starting after the cursor, without OFFSET
+    :param query: filtered query, not yet ordered
+    :param tie_column: unique column breaking ties, usually the primary key
+    :return: (items, next_cursor) where next_cursor is None on the last page
+    """
+    values = decode_cursor(cursor)
+    if values is not None:
+        if len(values) != 2:
+            raise ValueError('Invalid cursor.')
+        sort_value, tie_value = _coerce(sort_column, values[0]), values[1]
+        tie_after = tie_column < tie_value if descending else tie_column > tie_value
+        condition = and_(_equal(sort_column, sort_value), tie_after)
+        after = _after(sort_column, sort_value, descending)
+        if after is not None:
+            condition = or_(after, condition)
+        query = query.filter(condition)
+    if descending:
+        query = query.order_by(sort_column.desc(), tie_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), tie_column.asc())
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, sort_column.key), getattr(last, tie_column.key)])
+    return items, next_cursor
+
+
+class CountCache:
+    """
+    Remembers COUNT(*) results per filter for PAGINATION_COUNT_TTL seconds
+    """
+    max_entries = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def count(self, key, query):
+        ttl = app.config.get('PAGINATION_COUNT_TTL', 60)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._counts.get(key)
+            if hit is not None and now - hit[0] <= ttl:
+                return hit[1]
+        total = query.order_by(None).count()
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                self._counts.clear()
+            self._counts[key] = (now, total)
+        return total
+
+
+count_cache = CountCache()
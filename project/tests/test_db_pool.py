@@ -0,0 +1,54 @@
+# project/tests/test_db_pool.py
+
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.url import make_url
+
+from project.server.db_pool import configure_pool, pool_metrics
+
+
+class TestDbPool(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        database = 'sqlite:///' + self.path
+        options = configure_pool({'SQLALCHEMY_POOL_PRE_PING': True},
+                                 {'pool_size': 1, 'max_overflow': 0, 'pool_timeout': 1},
+                                 make_url(database).drivername)
+        self.engine = create_engine(database, **options)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.unlink(self.path)
+
+    def test_stale_connection_replaced_on_checkout(self):
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            dbapi_connection = connection.connection.connection
+        # the server side goes away while the connection sits in the pool
+        dbapi_connection.close()
+        invalidations, connects = pool_metrics.invalidations, pool_metrics.connects
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text('SELECT 1')).scalar(), 1)
+        self.assertEqual(pool_metrics.invalidations, invalidations + 1)
+        self.assertEqual(pool_metrics.connects, connects + 1)
+
+    def test_connection_of_parent_process_not_reused(self):
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            # as if opened by the gunicorn master before this worker was forked
+            connection.connection._connection_record.info['pid'] = os.getpid() + 1
+        resets, checkouts = pool_metrics.fork_resets, pool_metrics.checkouts
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text('SELECT 1')).scalar(), 1)
+        self.assertEqual(pool_metrics.fork_resets, resets + 1)
+        self.assertGreater(pool_metrics.checkouts, checkouts)
+        self.assertEqual(pool_metrics.stats(self.engine.pool)['checked_out'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
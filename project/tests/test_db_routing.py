@@ -0,0 +1,66 @@
+# project/tests/test_db_routing.py
+
+import json
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from project.server import app, db
+from project.server.models import NickelResult
+from project.tests.base import BaseTestCase
+
+
+class TestDbRouting(BaseTestCase):
+
+    def setUp(self):
+        self.paths = {}
+        for name in ('primary', 'replica'):
+            handle, self.paths[name] = tempfile.mkstemp(suffix='.db')
+            os.close(handle)
+            engine = create_engine('sqlite:///' + self.paths[name])
+            if name == 'primary':
+                db.metadata.create_all(engine)
+            else:
+                NickelResult.__table__.create(engine)
+            engine.execute(NickelResult.__table__.insert(), profile_name='from-' + name, sut='sut-01')
+            engine.dispose()
+        db.session.remove()
+        app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + self.paths['primary'],
+                          SQLALCHEMY_BINDS={'replica': 'sqlite:///' + self.paths['replica']},
+                          SQLALCHEMY_READ_BINDS=('replica',))
+
+    def tearDown(self):
+        db.session.remove()
+        for bind in (None, 'replica'):
+            db.get_engine(app, bind=bind).dispose()
+        app.config.update(SQLALCHEMY_BINDS={}, SQLALCHEMY_READ_BINDS=())
+        for path in self.paths.values():
+            os.unlink(path)
+
+    def profile_names(self, **kwargs):
+        with self.client:
+            response = self.client.get('/oap/nic/result', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return [row['profile_name'] for row in json.loads(response.data.decode())['data']]
+
+    def test_listed_get_reads_replica(self):
+        self.assertEqual(self.profile_names(), ['from-replica'])
+        self.assertEqual(self.profile_names(headers={'X-Read-Primary': '1'}), ['from-primary'])
+
+    def test_writes_stay_on_primary(self):
+        db.session().read_from('replica')
+        db.session.add(NickelResult(profile_name='written', sut='sut-02'))
+        db.session.commit()
+        NickelResult.query.filter_by(sut='sut-01').update({'result_status': 'PASS'})
+        db.session.commit()
+        db.session().read_from(None)
+        self.assertEqual(sorted((r.profile_name, r.result_status) for r in NickelResult.query.all()),
+                         [('from-primary', 'PASS'), ('written', None)])
+        replica = db.get_engine(app, bind='replica')
+        self.assertEqual(replica.execute(NickelResult.__table__.select()).fetchall()[0]['result_status'], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
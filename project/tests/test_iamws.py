@@ -0,0 +1,114 @@
+# project/tests/test_iamws.py
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from project.common.iamws import Iamws
+from project.server import app
+from project.server.auth.sso_resolver import SsoResolver
+
+
+class StubIamHandler(BaseHTTPRequestHandler):
+    """ Local stand-in for the IAM WS endpoints used by Iamws """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.client_address))
+        if self.path == '/token':
+            # slow enough for concurrent callers to pile up behind the first one
+            time.sleep(0.2)
+            body = {'access_token': 'token-{}'.format(len(server.requests)), 'expires_in': server.expires_in}
+        elif self.path == '/windows/auth':
+            body = {'IntelUserExtension': {'id': '11918760', 'displayName': 'Vishal'}}
+        else:
+            body = {'memberships': [{'name': 'CN=CCG Cloud Admin', 'isMember': True}]}
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestIamws(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubIamHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.expires_in = 3600
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.iamws = Iamws('http://127.0.0.1:{}'.format(self.server.server_port), timeout=(1, 5))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def token_requests(self):
+        return [path for path, _ in self.server.requests if path == '/token']
+
+    def test_access_token_is_requested_once_under_concurrency(self):
+        tokens = []
+        callers = [threading.Thread(target=lambda: tokens.append(self.iamws.get_access_token('sys_app', 'pwd')))
+                   for _ in range(10)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        self.assertEqual(len(self.token_requests()), 1)
+        self.assertEqual(len(set(token.access_token for token in tokens)), 1)
+
+    def test_access_token_renewed_before_expiry(self):
+        self.server.expires_in = 30
+        self.iamws = Iamws('http://127.0.0.1:{}'.format(self.server.server_port), token_refresh_margin=30)
+        first = self.iamws.get_access_token('sys_app', 'pwd')
+        second = self.iamws.get_access_token('sys_app', 'pwd')
+        self.assertNotEqual(first.access_token, second.access_token)
+        self.assertEqual(len(self.token_requests()), 2)
+
+    def test_calls_reuse_the_connection(self):
+        access_token = self.iamws.get_access_token('sys_app', 'pwd').access_token
+        user_data = self.iamws.get_user_data('user-token', access_token)
+        self.iamws.verify_memberships(user_data['id'], access_token)
+        self.assertEqual(user_data['displayName'], 'Vishal')
+        self.assertEqual(len(set(address for _, address in self.server.requests)), 1)
+
+    def test_sso_resolution_is_cached(self):
+        resolver = SsoResolver(self.iamws, 'sys_app', 'pwd', [{'name': 'CN=CCG Cloud Admin', 'type': 'CORPAD'}])
+        cold = resolver.resolve('user-token')
+        self.assertEqual(cold['user_data']['id'], '11918760')
+        self.assertEqual(cold['memberships'][0]['isMember'], True)
+        self.assertIn('memberships_ms', cold['timings'])
+        calls = len(self.server.requests)
+        warm = resolver.resolve('user-token')
+        self.assertEqual(warm['memberships'], cold['memberships'])
+        self.assertEqual(len(self.server.requests), calls)
+
+    def test_stale_memberships_refreshed_in_background(self):
+        resolver = SsoResolver(self.iamws, 'sys_app', 'pwd', [])
+        resolver.resolve('user-token')
+        calls = len(self.server.requests)
+        ttl = app.config['SSO_MEMBERSHIP_TTL']
+        app.config['SSO_MEMBERSHIP_TTL'] = 0
+        try:
+            stale = resolver.resolve('user-token')
+        finally:
+            app.config['SSO_MEMBERSHIP_TTL'] = ttl
+        self.assertIsNotNone(stale['memberships'])
+        deadline = time.time() + 5
+        while len(self.server.requests) == calls and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.server.requests[-1][0], '/Authorizations')
+
+
+if __name__ == '__main__':
+    unittest.main()
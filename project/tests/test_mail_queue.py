@@ -0,0 +1,138 @@
+# project/tests/test_mail_queue.py
+
+import asyncore
+import smtpd
+import threading
+import time
+import unittest
+from unittest import mock
+
+from project.notification.oap_email_notofier import EmailNotifier, flush_status_digests
+from project.server import app, db
+from project.server.models import EmailSpool, EmailDigestItem
+from project.tests.base import BaseTestCase
+
+
+class LocalSMTPServer(smtpd.SMTPServer):
+    """ Debugging SMTP stand-in keeping the received mails in memory """
+
+    def __init__(self, address):
+        self.sockets = {}
+        super().__init__(address, None, map=self.sockets)
+        self.received = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while not self.stopped.is_set():
+            asyncore.loop(timeout=0.05, map=self.sockets, count=1)
+
+    def stop(self):
+        # also drops the sessions the queue workers keep open, the next test's mails reach its own server
+        self.stopped.set()
+        self.thread.join()
+        asyncore.close_all(map=self.sockets)
+
+    def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+        self.received.append((mailfrom, rcpttos, data))
+
+
+class TestMailQueue(BaseTestCase):
+
+    def setUp(self):
+        self.smtp = LocalSMTPServer(('127.0.0.1', 0))
+        app.config['MAIL_SERVER'] = '127.0.0.1'
+        app.config['MAIL_PORT'] = self.smtp.socket.getsockname()[1]
+        self.digest_window = app.config['MAIL_DIGEST_WINDOW']
+
+    def tearDown(self):
+        self.smtp.stop()
+        app.config['MAIL_DIGEST_WINDOW'] = self.digest_window
+
+    def wait_for_delivery(self, count, timeout=10):
+        deadline = time.time() + timeout
+        while len(self.smtp.received) < count and time.time() < deadline:
+            time.sleep(0.1)
+
+    def trigger_status(self, sut, status):
+        EmailNotifier(oap_req_id=2,
+                      oap_provision_type='IFWI Provisioning',
+                      to_list='vishal.kumar.singh@intel.com',
+                      oap_user_fullname='vishal',
+                      notification_type='trigger_status',
+                      oap_sut=sut,
+                      oap_provision_status=status,
+                      oap_tws_link='http://ifwi-url.com').trigger_email_notification()
+
+    def test_status_notifications_are_coalesced_per_request(self):
+        app.config['MAIL_DIGEST_WINDOW'] = 60
+        self.trigger_status('test-sut-1', 'In Progress')
+        self.trigger_status('test-sut-2', 'In Progress')
+        self.trigger_status('test-sut-1', 'PASS')
+        self.assertEqual(EmailDigestItem.query.filter_by(request_id=2).count(), 3)
+        # still inside the window
+        flush_status_digests()
+        self.assertEqual(EmailDigestItem.query.filter_by(request_id=2).count(), 3)
+        app.config['MAIL_DIGEST_WINDOW'] = 0.001
+        time.sleep(0.01)
+        flush_status_digests()
+        self.assertEqual(EmailDigestItem.query.filter_by(request_id=2).count(), 0)
+        self.wait_for_delivery(1)
+        self.assertEqual(len(self.smtp.received), 1)
+        self.assertIn(b'3 status update(s)', self.smtp.received[0][2])
+
+    def test_status_digest_is_retried_after_failure(self):
+        app.config['MAIL_DIGEST_WINDOW'] = 0.001
+        self.trigger_status('test-sut-3', 'In Progress')
+        self.trigger_status('test-sut-3', 'PASS')
+        time.sleep(0.01)
+        spooled = EmailSpool.query.count()
+        with mock.patch.object(EmailNotifier, 'send_email', side_effect=OSError('relay down')):
+            flush_status_digests()
+        items = EmailDigestItem.query.filter_by(request_id=2).all()
+        self.assertEqual(len(items), 2)
+        self.assertEqual(set(item.batch for item in items), {None})
+        self.assertEqual(EmailSpool.query.count(), spooled)
+        flush_status_digests()
+        self.assertEqual(EmailDigestItem.query.filter_by(request_id=2).count(), 0)
+        self.wait_for_delivery(1)
+        self.assertIn(b'2 status update(s)', self.smtp.received[-1][2])
+
+    def test_bulk_status_notifications_commit_once(self):
+        app.config['MAIL_DIGEST_WINDOW'] = 60
+        notifiers = [EmailNotifier(oap_req_id=3,
+                                   oap_provision_type='BIOS Update',
+                                   to_list='vishal.kumar.singh@intel.com',
+                                   oap_user_fullname='vishal',
+                                   notification_type='trigger_status',
+                                   oap_sut='test-sut-{}'.format(i),
+                                   oap_provision_status='PASS',
+                                   oap_tws_link='http://bios-url.com') for i in range(3)]
+        with mock.patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+            EmailNotifier.trigger_status_notifications(notifiers)
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(EmailDigestItem.query.filter_by(request_id=3).count(), 3)
+        EmailDigestItem.query.filter_by(request_id=3).delete()
+        db.session.commit()
+
+    def test_status_notification_is_spooled_and_delivered(self):
+        app.config['MAIL_DIGEST_WINDOW'] = 0
+        email = EmailNotifier(oap_req_id=1,
+                              oap_provision_type='IFWI Provisioning',
+                              to_list='vishal.kumar.singh@intel.com',
+                              oap_user_fullname='vishal',
+                              notification_type='trigger_status',
+                              oap_sut='test-sut',
+                              oap_provision_status='PASS',
+                              oap_tws_link='http://ifwi-url.com')
+        email.trigger_email_notification()
+        self.wait_for_delivery(1)
+        self.assertEqual(len(self.smtp.received), 1)
+        self.assertEqual(self.smtp.received[0][1], ['vishal.kumar.singh@intel.com'])
+        spooled = EmailSpool.query.order_by(EmailSpool.id.desc()).first()
+        self.assertEqual(spooled.status, 'sent')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,15 @@
+import datetime
 import json
+import random
+import string
 import unittest
+from unittest import mock
 
+from project.notification.oap_email_notofier import EmailNotifier
+from project.server import db
+from project.server.models import NickelProfile, User
+from project.server.oap.nickel.profile_cache import NickelProfileCache
+from project.server.oap.oapviews import OapProvisionExportAPI
 from project.tests.base import BaseTestCase
 
 
@@ -31,6 +40,21 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(resp_controller.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_fetch_controller_not_modified(self):
+        with self.client:
+            response = self.client.get(
+                '/oap/controller',
+                content_type='application/json',
+            )
+            self.assertTrue(response.headers.get('ETag'))
+            response = self.client.get(
+                '/oap/controller',
+                headers={'If-None-Match': response.headers.get('ETag')},
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 304)
+            self.assertFalse(response.data)
+
     def test_add_platform(self):
         """ test_add_controller """
         with self.client:
@@ -107,6 +131,29 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_submit_provision(self):
+        with self.client:
+            response = self.client.post(
+                '/oap/provision/submit',
+                data=json.dumps(dict(user_id=1, wwid=11918760, location_type='local', provisions=[
+                    dict(controller='test-controller', sut='test-sut-{}'.format(i), is_os='In Progress',
+                         tws_result_os='http://os-url.com') for i in range(3)])),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(set(data['provision_ids'])), 3)
+            response = self.client.get('/oap/provision?type=new&cursor=&per_page=3')
+            provisions = json.loads(response.data.decode())['data']
+            self.assertEqual(set(p['request_id'] for p in provisions), {data['request_id']})
+            response = self.client.post(
+                '/oap/provision/submit',
+                data=json.dumps(dict(user_id=1, provisions=[dict(controller='test-controller')])),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(json.loads(response.data.decode())['errors'][0]['index'], 0)
+
     def test_add_profile(self):
         """ test_add_controller """
         with self.client:
@@ -235,6 +282,92 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_fetch_profile_after_update(self):
+        with self.client:
+            self.client.get('/oap/nic/profile', content_type='application/json')
+            response = self.client.post(
+                '/oap/nic/profile?type=new',
+                data=json.dumps(dict(profile_name='gs-cache-test', owner=11918760, share_pwd='share_pwd',
+                                     jarvis_pwd='jarvis_pwd')),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 201)
+            response = self.client.get('/oap/nic/profile', content_type='application/json')
+            data = json.loads(response.data.decode())
+            profile = [profile for profile in data['profiles'] if profile['profile_name'] == 'gs-cache-test'][0]
+            self.assertNotIn('share_pwd', profile)
+            self.assertNotIn('jarvis_pwd', profile)
+
+    def test_update_profile_read_back_keeps_secrets(self):
+        with self.client:
+            self.client.post(
+                '/oap/nic/profile?type=new',
+                data=json.dumps(dict(profile_name='gs-secret-test', owner=11918760, share_pwd='share-secret',
+                                     jarvis_pwd='jarvis-secret')),
+                content_type='application/json',
+            )
+            response = self.client.get('/oap/nic/profile', content_type='application/json')
+            profile = [profile for profile in json.loads(response.data.decode())['profiles']
+                       if profile['profile_name'] == 'gs-secret-test'][0]
+            response = self.client.patch(
+                '/oap/nic/profile',
+                data=json.dumps(dict(profile, owner=profile['wwid'], profile_desc='edited')),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 200)
+            stored = NickelProfile.query.get(profile['profile_id'])
+            self.assertEqual(stored.profile_desc, 'edited')
+            self.assertEqual((stored.share_pwd, stored.jarvis_pwd), ('share-secret', 'jarvis-secret'))
+
+    def test_fetch_profile_while_first_load_is_overtaken(self):
+        with self.client:
+            self.client.post(
+                '/oap/nic/profile?type=new',
+                data=json.dumps(dict(profile_name='gs-overtaken-test', owner=11918760)),
+                content_type='application/json',
+            )
+            cache = NickelProfileCache()
+            # every reload is discarded by a concurrent write
+            with mock.patch.object(cache, 'reload'):
+                body, _ = cache.listing()
+            data = json.loads(body)
+            self.assertIn('gs-overtaken-test', [profile['profile_name'] for profile in data['profiles']])
+            self.assertIsNone(cache._listing)
+
+    def test_fetch_profiles_by_option(self):
+        with self.client:
+            response = self.client.post(
+                '/oap/nic/profile?type=new',
+                data=json.dumps(dict(profile_name='gs-option-test', owner=11918760,
+                                     wake_mode_list=['S3', 'S4'])),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 201)
+            response = self.client.get('/oap/nic/profile/options?kind=wake_mode&value=S4',
+                                       content_type='application/json')
+            data = json.loads(response.data.decode())
+            profile = [profile for profile in data['profiles'] if profile['profile_name'] == 'gs-option-test'][0]
+            self.assertEqual(profile['wake_mode_list'], 'S3#S4')
+            self.assertEqual(profile['sx_wake_mode'], 'S3')
+            self.assertNotIn('share_pwd', profile)
+
+    def test_fetch_profile_page(self):
+        with self.client:
+            for name in ('gs-page-1', 'gs-page-2', 'gs-page-3'):
+                self.client.post(
+                    '/oap/nic/profile?type=new',
+                    data=json.dumps(dict(profile_name=name, owner=11918761, share_pwd='share_pwd')),
+                    content_type='application/json',
+                )
+            response = self.client.get('/oap/nic/profile?owner=11918761&fields=profile_id,profile_name&per_page=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual([sorted(profile) for profile in data['profiles']], [['profile_id', 'profile_name']] * 2)
+            response = self.client.get('/oap/nic/profile?owner=11918761&per_page=2&cursor=' + data['next_cursor'])
+            data = json.loads(response.data.decode())
+            self.assertEqual([profile['profile_name'] for profile in data['profiles']], ['gs-page-3'])
+            self.assertNotIn('share_pwd', data['profiles'][0])
+            self.assertIsNone(data['next_cursor'])
+
     def test_delete_profile(self):
         with self.client:
             response = self.client.delete(
@@ -253,6 +386,32 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_export_provision(self):
+        # no `with self.client`, a preserved context would outlive the streamed response
+        response = self.client.get('/oap/provision/export?format=ndjson')
+        self.assertEqual(response.status_code, 200)
+        for line in response.data.decode().splitlines():
+            self.assertTrue('provision_id' in json.loads(line))
+        response = self.client.get('/oap/provision/export?format=csv')
+        self.assertTrue(response.data.decode().startswith('provision_id,controller,sut'))
+
+    def test_export_provision_batches(self):
+        db.session.add(User(wwid='990077', email='export-test@intel.com', user_password='intel@123'))
+        db.session.commit()
+        users = User.query.filter_by(wwid='990077').count()
+        with self.client:
+            response = self.client.post(
+                '/oap/provision/submit',
+                data=json.dumps(dict(user_id=1, wwid=990077, provisions=[
+                    dict(controller='export-controller', sut='export-sut-{}'.format(i)) for i in range(5)])),
+                content_type='application/json',
+            )
+            provision_ids = json.loads(response.data.decode())['provision_ids']
+        exported = [row.provision_id for row in OapProvisionExportAPI.rows(2) if str(row.wwid) == '990077']
+        self.assertEqual(exported, sorted(provision_ids * users))
+        first_ids = [row.provision_id for row in OapProvisionExportAPI.rows(2)]
+        self.assertEqual(first_ids, sorted(first_ids))
+
     def test_fetch_provision_result(self):
         """ test_add_controller """
         with self.client:
@@ -281,6 +440,105 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_fetch_provision_result_cursor(self):
+        with self.client:
+            response = self.client.post(
+                '/oap/provision_result',
+                data=json.dumps(dict(per_page=5,
+                                     cursor='')
+                                ),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertTrue(data['status'] == 'success')
+            self.assertTrue(len(data['data']) <= 5)
+            if data['next_cursor']:
+                response = self.client.post(
+                    '/oap/provision_result',
+                    data=json.dumps(dict(per_page=5,
+                                         cursor=data['next_cursor'])
+                                    ),
+                    content_type='application/json',
+                )
+                next_page = json.loads(response.data.decode())
+                self.assertTrue(next_page['status'] == 'success')
+                self.assertFalse({m['provision_id'] for m in data['data']} &
+                                 {m['provision_id'] for m in next_page['data']})
+
+    def test_bulk_update_provision_status_survives_notification_failure(self):
+        with self.client:
+            response = self.client.post(
+                '/oap/provision/submit',
+                data=json.dumps(dict(user_id=1, provisions=[dict(controller='bulk-controller', sut='bulk-sut-%d' % i,
+                                                                 is_bios='In Progress') for i in range(2)])),
+                content_type='application/json',
+            )
+            provision_ids = json.loads(response.data.decode())['provision_ids']
+            with mock.patch.object(EmailNotifier, 'trigger_status_notifications', side_effect=OSError('relay down')):
+                response = self.client.patch(
+                    '/oap/provision/status',
+                    data=json.dumps(dict(updates=[dict(provision_id=provision_id, provision_type='is_bios',
+                                                       provision_status='PASS') for provision_id in provision_ids])),
+                    content_type='application/json',
+                )
+            self.assertEqual(response.status_code, 201)
+            data = json.loads(response.data.decode())
+            self.assertEqual([item['outcome'] for item in data['data']], ['updated', 'updated'])
+
+    def test_fetch_provision_cursor_arguments(self):
+        with self.client:
+            self.client.post(
+                '/oap/provision/submit',
+                data=json.dumps(dict(user_id=1, provisions=[dict(controller='test-controller', sut='sut-%d' % i)
+                                                            for i in range(2)])),
+                content_type='application/json',
+            )
+            for per_page in ('0', '100000'):
+                response = self.client.get('/oap/provision?type=new&cursor=&per_page=' + per_page)
+                self.assertEqual(response.status_code, 200)
+            response = self.client.get('/oap/provision?type=new&cursor=&per_page=abc')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.get('/oap/provision?type=new&cursor=&per_page=1')
+            cursor = json.loads(response.data.decode())['next_cursor']
+            # a create_At cursor handed to the request_id sort
+            response = self.client.post(
+                '/oap/provision_result',
+                data=json.dumps(dict(per_page=1, cursor=cursor, sorts=[dict(name='request_id', order='desc')])),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_search_provision(self):
+        tag = ''.join(random.choice(string.ascii_lowercase) for _ in range(10))
+        with self.client:
+            response = self.client.post(
+                '/oap/provision/submit',
+                data=json.dumps(dict(user_id=1, provisions=[
+                    dict(controller=tag + '-alpha-host', sut='sut-a', external_id='user-a'),
+                    dict(controller='plain-host', sut=tag + '-bravo-zq', external_id='user-b'),
+                    dict(controller='plain-host', sut='sut-c', external_id=tag + '-charlie')])),
+                content_type='application/json',
+            )
+            submitted = json.loads(response.data.decode())
+            controller_id, sut_id, external_id = submitted['provision_ids']
+
+            def search(q):
+                response = self.client.get('/oap/provision/search', query_string=dict(q=q, per_page=10))
+                data = json.loads(response.data.decode())
+                self.assertTrue(data['status'] == 'success')
+                return {m['provision_id'] for m in data['data']}
+
+            self.assertEqual(search(tag), {controller_id, sut_id, external_id})
+            self.assertEqual(search(tag + ' alpha'), {controller_id})
+            self.assertEqual(search(tag + ' bravo'), {sut_id})
+            self.assertEqual(search(tag + ' charlie'), {external_id})
+            # shorter than FULLTEXT_MIN_TOKEN, matched with LIKE
+            self.assertEqual(search(tag + ' zq'), {sut_id})
+            self.assertEqual(search('{} {}'.format(tag, submitted['request_id'])),
+                             {controller_id, sut_id, external_id})
+            # create_At is not searched
+            self.assertEqual(search('{} {}'.format(tag, datetime.date.today().year)), set())
+
     def test_fetch_sut_status(self):
         with self.client:
             response = self.client.get(
@@ -290,6 +548,20 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_fetch_sut_status_stats(self):
+        with self.client:
+            self.client.get(
+                '/oap/controller/sutstatus?controller=UST-AF2-TWS-01.gar.corp.intel.com',
+                content_type='application/json',
+            )
+            response = self.client.get(
+                '/oap/controller/sutstatus/stats',
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertTrue(data['status'] == 'success')
+            self.assertTrue(data['data']['hits'] + data['data']['misses'] >= 1)
+
     def test_update_provision(self):
         """ test_add_controller """
         with self.client:
@@ -305,6 +577,23 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'PASS')
 
+    def test_bulk_update_provision_status(self):
+        """ test_bulk_update_provision_status """
+        with self.client:
+            response = self.client.patch(
+                '/oap/provision/status',
+                data=json.dumps(dict(updates=[
+                    dict(provision_id=1, provision_type='is_ifwi', provision_status='PASS'),
+                    dict(provision_id=1, provision_type='is_bios', provision_status='In Progress'),
+                    dict(provision_id=1, provision_type='is_unknown', provision_status='PASS')
+                ])),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertTrue(data['status'] == 'success')
+            self.assertEqual(len(data['data']), 3)
+            self.assertEqual(data['data'][2]['outcome'], 'invalid')
+
     def test_add_project_profile_mapping(self):
         """ test_add_controller """
         with self.client:
@@ -328,6 +617,9 @@ class TestOapFlows(BaseTestCase):
             )
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
+            for row in data['data']:
+                self.assertNotIn('share_pwd', row)
+                self.assertNotIn('jarvis_pwd', row)
 
     def test_delete_project_profile_mapping(self):
         with self.client:
@@ -368,6 +660,54 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_summarize_nickel_results(self):
+        with self.client:
+            for status in ('PASS', 'PASS', 'FAIL'):
+                self.client.post(
+                    '/oap/nic/result',
+                    data=json.dumps(dict(profile_name='gs-summary-test', sut='sut-summary', result_status=status)),
+                    content_type='application/json',
+                )
+            response = self.client.get('/oap/nic/result?profile_name=gs-summary-test&per_page=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(len(data['data']), 2)
+            self.assertIsNotNone(data['next_cursor'])
+            response = self.client.get('/oap/nic/result/summary?profile_name=gs-summary-test&group_by=sut')
+            data = json.loads(response.data.decode())
+            self.assertEqual(data['data'], [{'sut': 'sut-summary', 'total': 3, 'pass': 2, 'fail': 1, 'other': 0}])
+
+    def test_add_nickel_result_retry(self):
+        with self.client:
+            responses = [self.client.post(
+                '/oap/nic/result',
+                data=json.dumps(dict(profile_name='gs-retry-test', result_status='Running')),
+                headers={'Idempotency-Key': 'gs-retry-test-1'},
+                content_type='application/json',
+            ) for _ in range(2)]
+            self.assertEqual([response.status_code for response in responses], [201, 200])
+            trigger_ids = [json.loads(response.data.decode())['trigger_id'] for response in responses]
+            self.assertEqual(trigger_ids[0], trigger_ids[1])
+            messages = [json.loads(self.client.patch(
+                '/oap/nic/result',
+                data=json.dumps(dict(trigger_id=trigger_ids[0], status='PASS')),
+                content_type='application/json',
+            ).data.decode())['message'] for _ in range(2)]
+            self.assertEqual(messages, ['Successfully Updated.', 'No Row To Update.'])
+            response = self.client.post(
+                '/oap/nic/result',
+                data=json.dumps(dict(profile_name='gs-retry-test', result_status='Running')),
+                headers={'Idempotency-Key': 'gs-retry-test-1'},
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post(
+                '/oap/nic/result',
+                data=json.dumps(dict(profile_name='gs-other-test', result_status='Running')),
+                headers={'Idempotency-Key': 'gs-retry-test-1'},
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 409)
+
     def test_update_nickel_result(self):
         """ test_add_controller """
         with self.client:
@@ -382,6 +722,32 @@ class TestOapFlows(BaseTestCase):
             data = json.loads(response.data.decode())
             self.assertTrue(data['status'] == 'success')
 
+    def test_add_nickel_executions(self):
+        with self.client:
+            self.client.post(
+                '/oap/nic/profile?type=new',
+                data=json.dumps(dict(profile_name='gs-execution-test', owner=11918760)),
+                content_type='application/json',
+            )
+            response = self.client.get('/oap/nic/profile?fields=profile_id&order=desc&per_page=1')
+            profile_id = json.loads(response.data.decode())['profiles'][0]['profile_id']
+            response = self.client.post(
+                '/oap/nic/execution',
+                data=json.dumps(dict(executions=[dict(profile_id=profile_id, executor=11918760,
+                                                      fanout_attr='sut', fanout_value=str(i)) for i in range(3)])),
+                content_type='application/json',
+            )
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(set(data['execution_ids'])), 3)
+            response = self.client.post(
+                '/oap/nic/execution',
+                data=json.dumps([dict(profile_id=profile_id, executor='nobody')]),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(json.loads(response.data.decode())['errors'][0]['index'], 0)
+
 
         if __name__ == '__main__':
             unittest.main()
@@ -0,0 +1,61 @@
+# project/tests/test_password_pool.py
+
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import ExitStack
+
+from flask_bcrypt import Bcrypt
+
+from project.server import app
+from project.server.auth.password_pool import PasswordHasher, PasswordPoolBusy, hash_rounds
+
+
+class TestPasswordHasher(unittest.TestCase):
+
+    def setUp(self):
+        self.config = dict((name, app.config.get(name)) for name in (
+            'BCRYPT_LOG_ROUNDS', 'PASSWORD_HASH_SLOTS', 'PASSWORD_HASH_QUEUE', 'PASSWORD_HASH_WAIT',
+            'PASSWORD_HASH_LOCK_DIR'))
+        self.lock_dir = tempfile.TemporaryDirectory()
+        app.config.update(BCRYPT_LOG_ROUNDS=4, PASSWORD_HASH_SLOTS=2, PASSWORD_HASH_QUEUE=1,
+                          PASSWORD_HASH_WAIT=0.5, PASSWORD_HASH_LOCK_DIR=self.lock_dir.name)
+        self.hasher = PasswordHasher()
+
+    def tearDown(self):
+        app.config.update(self.config)
+        self.lock_dir.cleanup()
+
+    def test_rehash_when_cost_changes(self):
+        old_hash = Bcrypt().generate_password_hash('intel@123', 5).decode()
+        matches, rehashed = self.hasher.verify(old_hash, 'intel@123')
+        self.assertTrue(matches)
+        self.assertEqual(hash_rounds(rehashed), 4)
+        self.assertEqual(self.hasher.verify(rehashed, 'intel@123'), (True, None))
+        self.assertEqual(self.hasher.verify(rehashed, 'wrong'), (False, None))
+
+    def test_busy_when_slots_and_queue_are_taken(self):
+        with ExitStack() as stack:
+            stack.enter_context(self.hasher.slot())
+            stack.enter_context(self.hasher.slot())
+            queued = []
+            waiter = threading.Thread(target=lambda: queued.append(self._try_generate()))
+            waiter.start()
+            time.sleep(0.1)
+            started = time.monotonic()
+            self.assertRaises(PasswordPoolBusy, self.hasher.generate, 'intel@123')
+            self.assertLess(time.monotonic() - started, 0.2)
+            waiter.join()
+            self.assertEqual(queued, ['busy'])
+        self.assertEqual(hash_rounds(self.hasher.generate('intel@123')), 4)
+
+    def _try_generate(self):
+        try:
+            return self.hasher.generate('intel@123')
+        except PasswordPoolBusy:
+            return 'busy'
+
+
+if __name__ == '__main__':
+    unittest.main()
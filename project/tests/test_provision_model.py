@@ -0,0 +1,31 @@
+# project/tests/test_provision_model.py
+
+import unittest
+
+from project.server.models import ManualProvision, serializer_for
+from project.tests.base import BaseTestCase
+
+
+class TestProvisionModel(BaseTestCase):
+
+    def test_active_state_on_create(self):
+        provision = ManualProvision(controller='test-controller', sut='test-sut',
+                                    is_ifwi='PASS', is_bios='Blocked', is_os='NA')
+        self.assertTrue(provision.is_active)
+
+    def test_active_state_after_status_change(self):
+        provision = ManualProvision(controller='test-controller', sut='test-sut', is_os='In Progress')
+        self.assertTrue(provision.is_active)
+        provision.is_os = 'PASS'
+        self.assertFalse(provision.refresh_active_state())
+
+    def test_serializer_uses_table_columns(self):
+        provision = ManualProvision(controller='test-controller', sut='test-sut', is_ifwi='PASS')
+        data = serializer_for(ManualProvision).to_dict(provision)
+        self.assertEqual(set(data), set(ManualProvision.__table__.columns.keys()))
+        self.assertEqual(data['sut'], 'test-sut')
+        self.assertTrue(serializer_for(ManualProvision) is serializer_for(ManualProvision))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# project/tests/test_provision_registry.py
+
+import unittest
+
+from project.server import app, db
+from project.server.models import ManualProvision
+from project.server.oap.provision_registry import ActiveProvisionRegistry
+from project.tests.base import BaseTestCase
+
+
+class TestProvisionRegistry(BaseTestCase):
+
+    def setUp(self):
+        self.interval = app.config['ACTIVE_PROVISION_SYNC_INTERVAL']
+        app.config['ACTIVE_PROVISION_SYNC_INTERVAL'] = 0
+        self.registry = ActiveProvisionRegistry()
+
+    def tearDown(self):
+        app.config['ACTIVE_PROVISION_SYNC_INTERVAL'] = self.interval
+
+    def insert(self, sut, **kwargs):
+        provision = ManualProvision(controller='registry-controller', sut=sut, **kwargs)
+        db.session.add(provision)
+        db.session.commit()
+        return provision
+
+    def suts(self, controller='registry-controller'):
+        return [entry['sut'] for entry in self.registry.for_controller(controller)]
+
+    def test_write_of_another_worker_is_synced(self):
+        self.registry.rebuild()
+        provision = self.insert('registry-sut-1', is_os='In Progress')
+        self.assertIn('registry-sut-1', self.suts())
+        provision.is_os = 'PASS'
+        provision.refresh_active_state()
+        db.session.commit()
+        self.assertNotIn('registry-sut-1', self.suts())
+
+    def test_entry_tracked_during_rebuild_is_kept(self):
+        provision = self.insert('registry-sut-2', is_os='In Progress')
+
+        def rows():
+            # a PATCH on this worker lands while the rebuild reads
+            self.registry.track_entries([(provision.provision_id, {
+                'controller': 'registry-controller', 'sut': 'registry-sut-2', 'ifwi_status': None,
+                'bios_status': None, 'os_status': 'Blocked', 'e2e_status': None}, True)])
+            for row in ManualProvision.query.filter(ManualProvision.is_active == True).with_entities(
+                    *ActiveProvisionRegistry.columns):
+                yield row
+
+        self.registry._load(rows(), replace=True)
+        entries = self.registry._active['registry-controller']['registry-sut-2']
+        self.assertEqual(entries[provision.provision_id]['os_status'], 'Blocked')
+
+    def test_moved_entry_leaves_old_key(self):
+        entry = ActiveProvisionRegistry.entry(ManualProvision(controller='registry-old', sut='s', is_os='Blocked'))
+        self.registry.track_entries([(-1, entry, True)])
+        self.registry.track_entries([(-1, dict(entry, controller='registry-new'), True)])
+        self.assertEqual(self.registry._active.get('registry-old'), None)
+        self.assertEqual(list(self.registry._active['registry-new']['s']), [-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
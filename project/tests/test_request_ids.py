@@ -0,0 +1,69 @@
+# project/tests/test_request_ids.py
+
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from project.server.models import ManualProvisionMaster
+from project.server.oap.request_ids import allocate_request_ids
+
+
+class TestRequestIds(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.engine = create_engine('sqlite:///' + self.path, connect_args={'timeout': 30})
+        ManualProvisionMaster.__table__.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.unlink(self.path)
+
+    def allocate(self, user_id, count):
+        session = Session(bind=self.engine)
+        try:
+            global_ids = allocate_request_ids(user_id, count, session)
+            session.commit()
+            return global_ids
+        finally:
+            session.close()
+
+    def test_block_is_consecutive(self):
+        self.assertEqual(self.allocate(1, 1), [1])
+        self.assertEqual(self.allocate(2, 3), [2, 3, 4])
+        self.assertEqual(self.allocate(1, 1), [5])
+
+    def test_unique_under_parallel_submissions(self):
+        allocated = {}
+        errors = []
+
+        def submit(user_id):
+            try:
+                for _ in range(25):
+                    allocated.setdefault(user_id, []).append(self.allocate(user_id, random.randint(1, 5)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=submit, args=(user_id,)) for user_id in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        owners = dict(self.engine.execute(ManualProvisionMaster.__table__.select()).fetchall())
+        ids = [global_id for blocks in allocated.values() for block in blocks for global_id in block]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(sorted(ids), sorted(owners))
+        for user_id, blocks in allocated.items():
+            for block in blocks:
+                self.assertEqual(set(owners[global_id] for global_id in block), {user_id})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
 # project/tests/test_user_model.py
 
+import datetime
 import unittest
 
-from project.server import db
-from project.server.models import User
+import jwt
+
+from sqlalchemy import func
+
+from project.server import app, db
+from project.server.auth.token_cache import TokenBlacklist, auth_tokens, token_blacklist, token_hash
+from project.server.models import User, BlacklistToken
 from project.tests.base import BaseTestCase
 
 
@@ -29,6 +35,56 @@ class TestUserModel(BaseTestCase):
         self.assertTrue(User.decode_auth_token(
             auth_token.decode("utf-8")) >= 1)
 
+    def test_decode_auth_token_cached_until_blacklisted(self):
+        user = User(
+            email='vishal.kumar.singh@intel.com',
+            user_password='intel@123'
+        )
+        db.session.add(user)
+        db.session.commit()
+        auth_token = user.encode_auth_token(user.user_id).decode("utf-8")
+        self.assertEqual(User.decode_auth_token(auth_token), user.user_id)
+        hits = auth_tokens.stats()['hits']
+        self.assertEqual(User.decode_auth_token(auth_token), user.user_id)
+        self.assertEqual(auth_tokens.stats()['hits'], hits + 1)
+        db.session.add(BlacklistToken(token=auth_token))
+        db.session.commit()
+        token_blacklist.reload()
+        self.assertEqual(User.decode_auth_token(auth_token), 'Token blacklisted. Please log in again.')
+
+    def test_blacklist_refresh_reads_late_lower_ids(self):
+        blacklist = TokenBlacklist()
+        blacklist.reload()
+        last_id = db.session.query(func.max(BlacklistToken.id)).scalar() or 0
+        early = BlacklistToken(token='refresh-early-token')
+        early.id = last_id + 10
+        db.session.add(early)
+        db.session.commit()
+        blacklist.refresh()
+        # another writer commits an id below the one already read
+        late = BlacklistToken(token='refresh-late-token')
+        late.id = last_id + 5
+        db.session.add(late)
+        db.session.commit()
+        blacklist.refresh()
+        self.assertIn(token_hash('refresh-late-token'), blacklist._filter)
+        self.assertEqual(blacklist._filter.count, BlacklistToken.query.count())
+
+    def test_prune_expired_blacklist_tokens(self):
+        expired = jwt.encode({'exp': datetime.datetime.utcnow() - datetime.timedelta(minutes=1), 'sub': 1},
+                             app.config.get('SECRET_KEY'), algorithm='HS256')
+        db.session.add(BlacklistToken(token=expired))
+        db.session.commit()
+        self.assertTrue(BlacklistToken.check_blacklist(expired))
+        db.session.commit()
+        # the prune commits on its own, not the pending changes of the request it runs in
+        pending = BlacklistToken(token='prune-pending-token')
+        db.session.add(pending)
+        self.assertTrue(BlacklistToken.prune_expired() >= 1)
+        db.session.rollback()
+        self.assertEqual(BlacklistToken.query.filter_by(token_hash=pending.token_hash).count(), 0)
+        self.assertFalse(BlacklistToken.check_blacklist(expired))
+
 
 if __name__ == '__main__':
     unittest.main()